@@ -2,18 +2,16 @@ import sys
 import os
 import logging
 import json
-import shutil
 import uuid
 import subprocess
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import threading
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 
-from fastapi import FastAPI, UploadFile, File, Form, BackgroundTasks, HTTPException, Request
+from fastapi import FastAPI, UploadFile, File, Form, BackgroundTasks, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from dotenv import load_dotenv
@@ -28,8 +26,15 @@ class TaskResponse(BaseModel):
     task_id: str
     message: str
 
+# 分片上传会话请求
+class UploadSessionRequest(BaseModel):
+    filename: str
+    total_size: Optional[int] = None  # 文件总大小（字节），用于校验上传是否完整
+
 # 添加项目根目录到系统路径
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+# 添加python-backend目录，用于导入api包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 # 添加audio-text模块路径
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../audio-text")))
 
@@ -55,21 +60,23 @@ else:
 
 # 导入配置
 from config import OUTPUT_DIR, UPLOADS_DIR
+from utils.config import EMBEDDED_WORKERS, JIEBA_WARMUP, EVENTS_KEEPALIVE_SECONDS, JOB_INDEX_REBUILD_ON_START
 
-# 创建线程池执行器
-thread_pool = ThreadPoolExecutor(max_workers=4)
-
-# 创建任务跟踪系统
-background_tasks = {}
-
-# 导入音频处理模块
-from audio_processing.speech_to_text import SpeechToText
-from text_processing.segmenter import TextSegmenter
-from text_processing.tagger import TextTagger
-from ai_generation.content_creator import ContentCreator
+# 导入任务处理流水线
+from api.pipeline import (
+    job_index, job_queue, status_store, save_job_status, read_job_status, enqueue_job, stream_scripts_for_job,
+    audio_pipeline_stats, JobWorker
+)
+from utils.stage_executor import stage_executor
+from ai_generation.generation_client import generation_client
+from ai_generation.content_creator import response_cache
+from utils.upload_writer import UploadWriter, UploadSessionStore
+from audio_processing.transcript_writer import read_sentences
+from text_processing.jieba_loader import warm_up_in_background
 
 # 导入直播流API
 from utils.live_recorder import live_recorder
+from utils.event_bus import event_bus
 
 # 设置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -85,6 +92,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # 允许所有 HTTP 方法
     allow_headers=["*"],  # 允许所有 headers
+    expose_headers=["X-Total-Count"],
 )
 
 # 输出和上传目录
@@ -98,64 +106,187 @@ jobs: Dict[str, Dict[str, Any]] = {}
 os.makedirs(output_dir, exist_ok=True)
 os.makedirs(uploads_dir, exist_ok=True)
 
+# 任务索引（首次启动或索引由旧版本创建时从输出目录扫描补全，JOB_INDEX_REBUILD_ON_START时每次启动都扫描）
+job_index.ensure_built(force=JOB_INDEX_REBUILD_ON_START)
+
+# 进程内Worker线程（EMBEDDED_WORKERS=0时API只负责入队，由 run_worker.py 处理任务）
+worker_stop_event = threading.Event()
+embedded_workers: List[threading.Thread] = []
+
+# 分片上传会话
+upload_sessions = UploadSessionStore(uploads_dir)
+
 # API Routes
 @app.get("/")
 async def root():
     return {"message": "API 服务正常运行"}
 
+def start_uploaded_job(job_id: str, filename: str, file_path: str, content_hash: str, size: int) -> str:
+    """为已上传的文件创建任务状态并加入处理队列，返回队列任务ID"""
+    status = {
+        "status": "processing",
+        "filename": filename,
+        "message": "文件已上传，开始处理",
+        "content_hash": content_hash,
+        "size": size,
+        "created_at": datetime.now().isoformat(),
+        "updated_at": datetime.now().isoformat()
+    }
+    
+    save_job_status(job_id, status)
+    
+    # 加入任务队列，由Worker处理音频文件
+    return enqueue_job(job_id, "process_audio", file_path=file_path, content_hash=content_hash)
+
+def upload_response(job_id: str, task_id: str, writer_stats: Dict[str, Any]) -> Dict[str, Any]:
+    """构造上传完成的响应"""
+    return {
+        "job_id": job_id,
+        "task_id": task_id,
+        "status": "processing",
+        "message": "文件已上传，开始处理",
+        **writer_stats
+    }
+
 @app.post("/api/upload")
-async def upload_file(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
-    """上传音频文件并开始处理"""
+async def upload_file(file: UploadFile = File(...)):
+    """上传音频文件并开始处理（multipart表单上传）"""
     try:
         # 生成唯一的任务ID
         job_id = str(uuid.uuid4())
+        filename = os.path.basename(file.filename)
         
         # 创建任务目录
         job_folder = os.path.join(output_dir, job_id)
         os.makedirs(job_folder, exist_ok=True)
         
-        # 保存上传的文件
-        file_path = os.path.join(uploads_dir, f"{job_id}_{file.filename}")
-        with open(file_path, "wb") as f:
-            shutil.copyfileobj(file.file, f)
-            
-        # 创建并保存任务状态
-        status = {
-            "status": "processing",
-            "filename": file.filename,
-            "message": "文件已上传，开始处理",
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat()
-        }
+        # 分块异步读取并写入上传目录，同时计算内容哈希
+        file_path = os.path.join(uploads_dir, f"{job_id}_{filename}")
+        writer = UploadWriter(file_path)
+        try:
+            await writer.write_upload_file(file)
+        finally:
+            await writer.close()
+        logger.info(f"文件上传完成: {filename}, {writer.bytes_written} 字节, {writer.bytes_per_sec / 1024 / 1024:.1f} MB/s")
         
-        with open(os.path.join(job_folder, "status.json"), "w") as f:
-            json.dump(status, f, ensure_ascii=False)
-            
-        # 在后台开始处理音频文件
-        background_tasks.add_task(process_audio_file, job_id, file_path)
+        task_id = start_uploaded_job(job_id, filename, file_path, writer.hexdigest, writer.bytes_written)
+        
+        return upload_response(job_id, task_id, {
+            "size": writer.bytes_written,
+            "content_hash": writer.hexdigest,
+            "bytes_per_sec": round(writer.bytes_per_sec)
+        })
+        
+    except Exception as e:
+        logging.error(f"上传文件时出错: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/upload/stream")
+async def upload_file_stream(request: Request, filename: str):
+    """以原始请求体流式上传音频文件，数据直接写入上传目录，不经过临时文件"""
+    try:
+        job_id = str(uuid.uuid4())
+        filename = os.path.basename(filename)
+        os.makedirs(os.path.join(output_dir, job_id), exist_ok=True)
+        
+        file_path = os.path.join(uploads_dir, f"{job_id}_{filename}")
+        writer = UploadWriter(file_path)
+        try:
+            await writer.write_stream(request.stream())
+        finally:
+            await writer.close()
+        logger.info(f"文件上传完成: {filename}, {writer.bytes_written} 字节, {writer.bytes_per_sec / 1024 / 1024:.1f} MB/s")
+        
+        task_id = start_uploaded_job(job_id, filename, file_path, writer.hexdigest, writer.bytes_written)
         
+        return upload_response(job_id, task_id, {
+            "size": writer.bytes_written,
+            "content_hash": writer.hexdigest,
+            "bytes_per_sec": round(writer.bytes_per_sec)
+        })
+        
+    except Exception as e:
+        logging.error(f"上传文件时出错: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/uploads")
+async def create_upload_session(request: UploadSessionRequest):
+    """创建分片上传会话，用于大文件的断点续传"""
+    session = upload_sessions.create(request.filename, request.total_size)
+    return session
+
+@app.get("/api/uploads/{upload_id}")
+async def get_upload_session(upload_id: str):
+    """获取分片上传会话状态，offset为已接收的字节数，续传时从该位置开始"""
+    session = upload_sessions.get(upload_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="上传会话不存在")
+    return session
+
+@app.put("/api/uploads/{upload_id}")
+async def upload_chunk(upload_id: str, request: Request, offset: int):
+    """上传一个分片（原始请求体），offset必须等于已接收的字节数"""
+    try:
+        new_offset, bytes_per_sec = await upload_sessions.append(upload_id, offset, request.stream())
         return {
-            "job_id": job_id,
-            "status": "processing",
-            "message": "文件已上传，开始处理"
+            "upload_id": upload_id,
+            "offset": new_offset,
+            "bytes_per_sec": round(bytes_per_sec)
         }
+    except KeyError:
+        raise HTTPException(status_code=404, detail="上传会话不存在")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/api/uploads/{upload_id}/complete")
+async def complete_upload(upload_id: str):
+    """完成分片上传，创建任务并开始处理"""
+    try:
+        session = upload_sessions.get(upload_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="上传会话不存在")
+        
+        job_id = str(uuid.uuid4())
+        file_path = os.path.join(uploads_dir, f"{job_id}_{session['filename']}")
+        
+        size, content_hash = await upload_sessions.complete(upload_id, file_path)
+        os.makedirs(os.path.join(output_dir, job_id), exist_ok=True)
+        task_id = start_uploaded_job(job_id, session["filename"], file_path, content_hash, size)
         
+        return upload_response(job_id, task_id, {
+            "size": size,
+            "content_hash": content_hash
+        })
+        
+    except HTTPException:
+        raise
+    except KeyError:
+        raise HTTPException(status_code=404, detail="上传会话不存在")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
-        logging.error(f"上传文件时出错: {str(e)}")
+        logging.error(f"完成分片上传时出错: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/jobs")
-async def list_jobs():
-    """获取所有任务的列表"""
+async def list_jobs(
+    response: Response,
+    page: int = 1,
+    page_size: int = 50,
+    status: Optional[str] = None,
+    order: str = "desc"
+):
+    """分页获取任务列表，按更新时间排序，可按状态过滤（总数通过X-Total-Count返回）"""
     try:
-        jobs = []
-        for job_id in os.listdir(output_dir):
-            status_file = os.path.join(output_dir, job_id, "status.json")
-            if os.path.exists(status_file):
-                with open(status_file, "r") as f:
-                    status = json.load(f)
-                    status["job_id"] = job_id
-                    jobs.append(status)
+        page = max(page, 1)
+        page_size = min(max(page_size, 1), 500)
+        jobs, total = job_index.list(
+            status=status,
+            limit=page_size,
+            offset=(page - 1) * page_size,
+            descending=order.lower() != "asc"
+        )
+        response.headers["X-Total-Count"] = str(total)
         return jobs
     except Exception as e:
         logging.error(f"获取任务列表时出错: {str(e)}")
@@ -165,34 +296,29 @@ async def list_jobs():
 async def get_job_status(job_id: str):
     """获取指定任务的状态"""
     try:
-        status_file = os.path.join(output_dir, job_id, "status.json")
-        if not os.path.exists(status_file):
+        status = read_job_status(job_id)
+        if status is None:
             raise HTTPException(status_code=404, detail="任务不存在")
             
-        with open(status_file, "r") as f:
-            status = json.load(f)
-            status["job_id"] = job_id
-            return status
+        status["job_id"] = job_id
+        return status
             
     except Exception as e:
         logging.error(f"获取任务状态时出错: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/jobs/{job_id}/retry")
-async def retry_job(job_id: str, background_tasks: BackgroundTasks):
+async def retry_job(job_id: str):
     """重试失败的任务"""
     try:
         # 检查任务是否存在
         job_folder = os.path.join(output_dir, job_id)
-        status_file = os.path.join(job_folder, "status.json")
         transcript_file = os.path.join(job_folder, "transcript.txt")
         
-        if not os.path.exists(status_file):
-            raise HTTPException(status_code=404, detail="任务不存在")
-            
         # 读取当前状态
-        with open(status_file, "r") as f:
-            status = json.load(f)
+        status = read_job_status(job_id)
+        if status is None:
+            raise HTTPException(status_code=404, detail="任务不存在")
             
         # 检查任务是否处于错误状态
         if status["status"] != "error":
@@ -203,23 +329,19 @@ async def retry_job(job_id: str, background_tasks: BackgroundTasks):
         status["message"] = "正在重新处理"
         status["updated_at"] = datetime.now().isoformat()
         
-        with open(status_file, "w") as f:
-            json.dump(status, f, ensure_ascii=False)
+        save_job_status(job_id, status)
         
         # 检查是否已有转写结果
         if os.path.exists(transcript_file) and os.path.getsize(transcript_file) > 0:
             # 如果已有转写结果，只重新生成标签和脚本
             logging.info(f"找到转写结果，只重新生成标签和脚本: {job_id}")
             
-            # 读取转写结果
-            with open(transcript_file, "r", encoding="utf-8") as f:
-                transcript = f.read()
-                
-            # 在后台生成标签和脚本
-            background_tasks.add_task(generate_tags_and_scripts_for_job, job_id, transcript)
+            # 加入任务队列，生成标签和脚本
+            task_id = enqueue_job(job_id, "generate_tags_and_scripts")
             
             return {
                 "job_id": job_id,
+                "task_id": task_id,
                 "status": "processing",
                 "message": "正在重新生成标签和脚本"
             }
@@ -232,11 +354,12 @@ async def retry_job(job_id: str, background_tasks: BackgroundTasks):
             file_path = os.path.join(uploads_dir, f"{job_id}_{original_filename}")
             
             if os.path.exists(file_path):
-                # 在后台重新处理音频文件
-                background_tasks.add_task(process_audio_file, job_id, file_path)
+                # 加入任务队列，重新处理音频文件
+                task_id = enqueue_job(job_id, "process_audio", file_path=file_path)
                 
                 return {
                     "job_id": job_id,
+                    "task_id": task_id,
                     "status": "processing",
                     "message": "正在重新处理音频文件"
                 }
@@ -311,14 +434,10 @@ async def get_job_transcript(job_id: str):
     """获取指定任务的转写结果"""
     try:
         # 检查任务是否存在
-        status_file = os.path.join(output_dir, job_id, "status.json")
-        if not os.path.exists(status_file):
+        status = read_job_status(job_id)
+        if status is None:
             raise HTTPException(status_code=404, detail="任务不存在")
             
-        # 读取当前状态
-        with open(status_file, "r") as f:
-            status = json.load(f)
-            
         # 检查任务是否已完成
         if status["status"] != "completed":
             raise HTTPException(status_code=400, detail=f"任务尚未完成，当前状态: {status['status']}")
@@ -342,19 +461,46 @@ async def get_job_transcript(job_id: str):
         logging.error(f"获取转写结果时出错: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/jobs/{job_id}/transcript/partial")
+async def get_job_partial_transcript(job_id: str, offset: int = 0):
+    """
+    增量获取转写进度（任务处理中也可调用）
+
+    首次调用传 offset=0，之后传上次返回的 next_offset，只返回新识别出的句子。
+    """
+    try:
+        status = read_job_status(job_id)
+        if status is None:
+            raise HTTPException(status_code=404, detail="任务不存在")
+        if offset < 0:
+            raise HTTPException(status_code=400, detail="offset不能为负数")
+
+        transcript_file = os.path.join(output_dir, job_id, "transcript.txt")
+        sentences, next_offset = read_sentences(transcript_file, offset)
+
+        return {
+            "job_id": job_id,
+            "status": status.get("status"),
+            "sentences": sentences,
+            "text": " ".join(sentence["text"] for sentence in sentences),
+            "next_offset": next_offset
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"获取转写进度时出错: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/jobs/{job_id}/tags")
 async def get_job_tags(job_id: str):
     """获取指定任务的标签"""
     try:
         # 检查任务是否存在
-        status_file = os.path.join(output_dir, job_id, "status.json")
-        if not os.path.exists(status_file):
+        status = read_job_status(job_id)
+        if status is None:
             raise HTTPException(status_code=404, detail="任务不存在")
             
-        # 读取当前状态
-        with open(status_file, "r") as f:
-            status = json.load(f)
-            
         # 检查任务是否已完成
         if status["status"] != "completed":
             raise HTTPException(status_code=400, detail=f"任务尚未完成，当前状态: {status['status']}")
@@ -380,14 +526,10 @@ async def get_job_scripts(job_id: str):
     """获取指定任务的脚本"""
     try:
         # 检查任务是否存在
-        status_file = os.path.join(output_dir, job_id, "status.json")
-        if not os.path.exists(status_file):
+        status = read_job_status(job_id)
+        if status is None:
             raise HTTPException(status_code=404, detail="任务不存在")
             
-        # 读取当前状态
-        with open(status_file, "r") as f:
-            status = json.load(f)
-            
         # 检查任务是否已完成
         if status["status"] != "completed":
             raise HTTPException(status_code=400, detail=f"任务尚未完成，当前状态: {status['status']}")
@@ -409,18 +551,14 @@ async def get_job_scripts(job_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/jobs/{job_id}/generate-tags")
-async def generate_tags(job_id: str, background_tasks: BackgroundTasks):
+async def generate_tags(job_id: str):
     """手动为指定任务生成标签"""
     try:
         # 检查任务是否存在
-        status_file = os.path.join(output_dir, job_id, "status.json")
-        if not os.path.exists(status_file):
+        status = read_job_status(job_id)
+        if status is None:
             raise HTTPException(status_code=404, detail="任务不存在")
             
-        # 读取当前状态
-        with open(status_file, "r") as f:
-            status = json.load(f)
-            
         # 检查任务是否已完成
         if status["status"] != "completed":
             raise HTTPException(status_code=400, detail=f"任务尚未完成，当前状态: {status['status']}")
@@ -435,14 +573,14 @@ async def generate_tags(job_id: str, background_tasks: BackgroundTasks):
         status["message"] = "正在生成标签"
         status["updated_at"] = datetime.now().isoformat()
         
-        with open(status_file, "w") as f:
-            json.dump(status, f, ensure_ascii=False)
+        save_job_status(job_id, status)
             
-        # 在后台生成标签
-        background_tasks.add_task(generate_tags_for_job, job_id)
+        # 加入任务队列，生成标签
+        task_id = enqueue_job(job_id, "generate_tags")
         
         return {
             "job_id": job_id,
+            "task_id": task_id,
             "status": "processing",
             "message": "正在生成标签"
         }
@@ -453,244 +591,21 @@ async def generate_tags(job_id: str, background_tasks: BackgroundTasks):
         logging.error(f"生成标签时出错: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-# 添加后台任务处理函数
-def run_in_background(func, *args, **kwargs):
-    """在后台线程中运行函数"""
-    task_id = str(uuid.uuid4())
-    task_name = func.__name__
-    
-    # 创建任务记录
-    background_tasks[task_id] = {
-        "id": task_id,
-        "name": task_name,
-        "status": "pending",
-        "start_time": datetime.now().isoformat(),
-        "end_time": None,
-        "args": str(args),
-        "kwargs": str(kwargs),
-        "result": None,
-        "error": None
-    }
-    
-    def task_wrapper(*args, **kwargs):
-        try:
-            # 更新状态为运行中
-            background_tasks[task_id]["status"] = "running"
-            
-            # 执行任务
-            result = func(*args, **kwargs)
-            
-            # 更新状态为完成
-            background_tasks[task_id]["status"] = "completed"
-            background_tasks[task_id]["end_time"] = datetime.now().isoformat()
-            background_tasks[task_id]["result"] = "成功完成"
-            
-            return result
-        except Exception as e:
-            # 更新状态为错误
-            background_tasks[task_id]["status"] = "error"
-            background_tasks[task_id]["end_time"] = datetime.now().isoformat()
-            background_tasks[task_id]["error"] = str(e)
-            
-            # 重新抛出异常
-            raise
-    
-    # 提交任务到线程池
-    future = thread_pool.submit(task_wrapper, *args, **kwargs)
-    
-    # 清理已完成的任务（保留最近50个任务）
-    if len(background_tasks) > 50:
-        # 找出最早的已完成任务
-        completed_tasks = [
-            (task_id, task) for task_id, task in background_tasks.items()
-            if task["status"] in ["completed", "error"] and task["end_time"] is not None
-        ]
-        
-        # 按结束时间排序
-        completed_tasks.sort(key=lambda x: x[1]["end_time"])
-        
-        # 删除最早的任务，直到总数不超过50
-        for old_task_id, _ in completed_tasks[:len(background_tasks) - 50]:
-            del background_tasks[old_task_id]
-    
-    return future, task_id
-
-# 同步版本的脚本生成函数
-def generate_scripts_for_job_sync(job_id: str, num_scripts: int, custom_prompt: str = None, overwrite: bool = False):
-    """为指定任务生成脚本（同步版本）"""
-    try:
-        job_folder = os.path.join(output_dir, job_id)
-        status_file = os.path.join(job_folder, "status.json")
-        transcript_file = os.path.join(job_folder, "transcript.txt")
-        tags_file = os.path.join(job_folder, "tags.json")
-        scripts_file = os.path.join(job_folder, "scripts.json")
-        
-        logging.info(f"开始生成脚本: {job_id}")
-        
-        # 读取转写结果
-        with open(transcript_file, "r", encoding="utf-8") as f:
-            transcript = f.read()
-            
-        # 读取标签（如果存在）
-        tags = []
-        if os.path.exists(tags_file):
-            try:
-                with open(tags_file, "r", encoding="utf-8") as f:
-                    tags = json.load(f)
-            except Exception as e:
-                logging.warning(f"读取标签文件失败: {str(e)}")
-        
-        # 创建脚本生成对象
-        logging.info("创建脚本生成对象")
-        content_creator = ContentCreator()
-        
-        # 开始生成脚本
-        logging.info("开始生成脚本")
-        try:
-            new_scripts = content_creator.generate_multiple_scripts(
-                transcript, 
-                tags=tags, 
-                num_scripts=num_scripts,
-                custom_prompt=custom_prompt
-            )
-        except Exception as e:
-            import traceback
-            logging.error(f"生成脚本过程中出错: {str(e)}")
-            logging.error(f"错误详情: {traceback.format_exc()}")
-            raise
-        
-        # 检查生成结果
-        if new_scripts is None:
-            raise ValueError("生成结果为空")
-            
-        logging.info(f"生成脚本完成，结果长度: {len(new_scripts) if new_scripts else 0}")
-        
-        # 处理现有脚本（如果存在）
-        existing_scripts = None
-        original_format = None
-        if os.path.exists(scripts_file):
-            try:
-                with open(scripts_file, "r", encoding="utf-8") as f:
-                    existing_scripts = json.load(f)
-                    
-                # 确定原始格式
-                if isinstance(existing_scripts, list):
-                    original_format = "array"
-                elif isinstance(existing_scripts, dict) and "scripts" in existing_scripts:
-                    original_format = "object_with_scripts"
-                elif isinstance(existing_scripts, dict):
-                    original_format = "object"
-            except Exception as e:
-                logging.warning(f"读取现有脚本文件失败: {str(e)}")
-        
-        if overwrite:
-            # 覆盖模式：使用新生成的脚本，但保持原始格式
-            logging.info("使用覆盖模式，替换现有脚本")
-            if original_format == "object_with_scripts":
-                # 如果原始格式是包含scripts字段的对象
-                if isinstance(existing_scripts, dict):
-                    # 保留原始对象的其他字段
-                    combined_scripts = existing_scripts.copy()
-                    combined_scripts["scripts"] = new_scripts
-                    # 确保有原文
-                    combined_scripts["original_text"] = transcript
-                else:
-                    combined_scripts = {"scripts": new_scripts, "original_text": transcript}
-            elif original_format == "object":
-                # 如果原始格式是其他类型的对象
-                combined_scripts = {"scripts": new_scripts, "original_text": transcript}
-            else:
-                # 默认使用对象格式，即使原始格式是数组或没有原始格式
-                combined_scripts = {"scripts": new_scripts, "original_text": transcript}
-        else:
-            # 追加模式：读取现有脚本并追加
-            logging.info("使用追加模式，保留现有脚本")
-            # 读取现有脚本（如果存在）
-            existing_scripts = []
-            if os.path.exists(scripts_file):
-                try:
-                    with open(scripts_file, "r", encoding="utf-8") as f:
-                        existing_scripts = json.load(f)
-                except Exception as e:
-                    logging.warning(f"读取现有脚本文件失败，将创建新文件: {str(e)}")
-            
-            # 合并脚本
-            if isinstance(existing_scripts, list):
-                # 如果现有脚本是数组，直接追加
-                combined_scripts = {"scripts": existing_scripts + new_scripts, "original_text": transcript}
-            elif isinstance(existing_scripts, dict) and "scripts" in existing_scripts:
-                # 如果现有脚本是包含scripts数组的对象
-                combined_scripts = existing_scripts.copy()
-                combined_scripts["scripts"] = combined_scripts["scripts"] + new_scripts
-                # 确保有原文
-                combined_scripts["original_text"] = transcript
-            else:
-                # 如果没有现有脚本或格式不正确，使用新脚本并包装成对象格式
-                combined_scripts = {"scripts": new_scripts, "original_text": transcript}
-        
-        # 保存生成结果
-        with open(scripts_file, "w", encoding="utf-8") as f:
-            json.dump(combined_scripts, f, ensure_ascii=False)
-            
-        # 更新状态为完成
-        with open(status_file, "w") as f:
-            json.dump({
-                "status": "completed",
-                "filename": os.path.basename(transcript_file).replace(f"{job_id}_", ""),
-                "message": "脚本生成完成",
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }, f)
-            
-        return combined_scripts
-            
-    except Exception as e:
-        import traceback
-        logging.error(f"生成脚本时出错: {str(e)}")
-        logging.error(f"错误详情: {traceback.format_exc()}")
-        # 更新状态为错误
-        with open(status_file, "w") as f:
-            json.dump({
-                "status": "error",
-                "filename": os.path.basename(transcript_file).replace(f"{job_id}_", ""),
-                "message": str(e),
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }, f, ensure_ascii=False)
-        raise
-
-# 异步版本的脚本生成函数
-async def generate_scripts_for_job(job_id: str, num_scripts: int, custom_prompt: str = None, overwrite: bool = False):
-    """为指定任务生成脚本（异步版本）"""
-    # 在后台线程中运行同步函数
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(
-        None,
-        generate_scripts_for_job_sync,
-        job_id,
-        num_scripts,
-        custom_prompt,
-        overwrite
-    )
-
 @app.post("/api/jobs/{job_id}/generate-scripts")
 async def generate_scripts_api(
     job_id: str, 
     num_scripts: int = 5, 
     custom_prompt: str = None,
-    overwrite: bool = False
+    overwrite: bool = False,
+    fresh: bool = False
 ):
-    """手动为指定任务生成脚本"""
+    """手动为指定任务生成脚本（只有覆盖模式且fresh为False时才使用缓存的生成结果）"""
     try:
         # 检查任务是否存在
-        status_file = os.path.join(output_dir, job_id, "status.json")
-        if not os.path.exists(status_file):
+        status = read_job_status(job_id)
+        if status is None:
             raise HTTPException(status_code=404, detail="任务不存在")
             
-        # 读取当前状态
-        with open(status_file, "r") as f:
-            status = json.load(f)
-            
         # 检查任务是否已完成
         if status["status"] != "completed":
             raise HTTPException(status_code=400, detail=f"任务尚未完成，当前状态: {status['status']}")
@@ -705,11 +620,17 @@ async def generate_scripts_api(
         status["message"] = "正在生成脚本"
         status["updated_at"] = datetime.now().isoformat()
         
-        with open(status_file, "w") as f:
-            json.dump(status, f, ensure_ascii=False)
+        save_job_status(job_id, status)
             
-        # 在后台线程中生成脚本
-        future, task_id = run_in_background(generate_scripts_for_job_sync, job_id, num_scripts, custom_prompt, overwrite)
+        # 加入任务队列，生成脚本
+        task_id = enqueue_job(
+            job_id,
+            "generate_scripts",
+            num_scripts=num_scripts,
+            custom_prompt=custom_prompt,
+            overwrite=overwrite,
+            fresh=fresh
+        )
         
         return {
             "job_id": job_id,
@@ -724,294 +645,78 @@ async def generate_scripts_api(
         logging.error(f"生成脚本时出错: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-async def generate_tags_and_scripts_for_job(job_id: str, transcript: str):
-    """为指定任务生成标签和脚本"""
-    try:
-        job_folder = os.path.join(output_dir, job_id)
-        status_file = os.path.join(job_folder, "status.json")
-        transcript_file = os.path.join(job_folder, "transcript.txt")
-        tags_file = os.path.join(job_folder, "tags.json")
-        scripts_file = os.path.join(job_folder, "scripts.json")
-        
-        logging.info(f"开始生成标签和脚本: {job_id}")
-        
-        # 创建标签生成对象
-        logging.info("创建标签生成对象")
-        tagger = TextTagger(topK=10)
-        
-        # 开始生成标签
-        logging.info("开始生成标签")
-        try:
-            tags = tagger.extract_tags(transcript)
-        except Exception as e:
-            import traceback
-            logging.error(f"生成标签过程中出错: {str(e)}")
-            logging.error(f"错误详情: {traceback.format_exc()}")
-            raise
-        
-        # 检查生成结果
-        if tags is None:
-            raise ValueError("生成结果为空")
-            
-        logging.info(f"生成标签完成，结果长度: {len(tags) if tags else 0}")
-        
-        # 保存生成结果
-        with open(tags_file, "w", encoding="utf-8") as f:
-            json.dump(tags, f, ensure_ascii=False)
-            
-        # 创建脚本生成对象
-        logging.info("创建脚本生成对象")
-        content_creator = ContentCreator()
-        
-        # 开始生成脚本
-        logging.info("开始生成脚本")
-        try:
-            scripts = content_creator.generate_multiple_scripts(transcript, tags=tags, num_scripts=5)
-        except Exception as e:
-            import traceback
-            logging.error(f"生成脚本过程中出错: {str(e)}")
-            logging.error(f"错误详情: {traceback.format_exc()}")
-            raise
+@app.get("/api/jobs/{job_id}/generate-scripts")
+async def stream_scripts_api(
+    job_id: str,
+    num_scripts: int = 5,
+    custom_prompt: str = None,
+    overwrite: bool = False,
+    fresh: bool = False
+):
+    """流式生成脚本（Server-Sent Events），生成过程中逐段推送文本，结束后保存结果"""
+    # 检查任务是否存在
+    status = read_job_status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
         
-        # 检查生成结果
-        if scripts is None:
-            raise ValueError("生成结果为空")
-            
-        logging.info(f"生成脚本完成，结果长度: {len(scripts) if scripts else 0}")
+    if status["status"] != "completed":
+        raise HTTPException(status_code=400, detail=f"任务尚未完成，当前状态: {status['status']}")
         
-        # 保存生成结果
-        result = {
-            "original_text": transcript,
-            "scripts": scripts
-        }
+    transcript_file = os.path.join(output_dir, job_id, "transcript.txt")
+    if not os.path.exists(transcript_file):
+        raise HTTPException(status_code=404, detail="转写结果文件不存在")
         
-        with open(scripts_file, "w", encoding="utf-8") as f:
-            json.dump(result, f, ensure_ascii=False)
-            
-        # 更新状态为完成
-        with open(status_file, "w") as f:
-            json.dump({
-                "status": "completed",
-                "filename": os.path.basename(transcript_file).replace(f"{job_id}_", ""),
-                "message": "标签和脚本生成完成",
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }, f)
-            
-    except Exception as e:
-        import traceback
-        logging.error(f"生成标签和脚本时出错: {str(e)}")
-        logging.error(f"错误详情: {traceback.format_exc()}")
-        # 更新状态为错误
-        with open(status_file, "w") as f:
-            json.dump({
-                "status": "error",
-                "filename": os.path.basename(transcript_file).replace(f"{job_id}_", ""),
-                "message": str(e),
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }, f, ensure_ascii=False)
+    status["status"] = "processing"
+    status["message"] = "正在生成脚本"
+    status["updated_at"] = datetime.now().isoformat()
+    save_job_status(job_id, status)
+    
+    def event_stream():
+        for event in stream_scripts_for_job(job_id, num_scripts, custom_prompt, overwrite, fresh):
+            name = event.pop("event")
+            yield f"event: {name}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-async def process_audio_file(job_id: str, file_path: str):
-    """在后台处理音频文件"""
-    try:
-        job_folder = os.path.join(output_dir, job_id)
-        status_file = os.path.join(job_folder, "status.json")
-        transcript_file = os.path.join(job_folder, "transcript.txt")
-        tags_file = os.path.join(job_folder, "tags.json")
-        scripts_file = os.path.join(job_folder, "scripts.json")
-        
-        logging.info(f"开始处理音频文件: {file_path}")
-        
-        # 检查文件是否存在
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"音频文件不存在: {file_path}")
-            
-        # 创建语音转文字对象
-        logging.info("创建语音转文字对象")
-        transcriber = SpeechToText()
-        
-        # 更新状态为转写中
-        with open(status_file, "w") as f:
-            json.dump({
-                "status": "processing",
-                "filename": os.path.basename(file_path).replace(f"{job_id}_", ""),
-                "message": "正在转写音频",
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }, f, ensure_ascii=False)
-        
-        # 开始转写 - 注意：transcribe_file 返回 (transcript, output_file)
-        logging.info("开始转写音频")
-        try:
-            transcript_result = transcriber.transcribe_file(file_path, transcript_file)
-            # 检查返回值类型
-            if isinstance(transcript_result, tuple) and len(transcript_result) == 2:
-                transcript, _ = transcript_result
-            else:
-                # 如果不是元组，可能是直接返回了转写结果
-                transcript = transcript_result
-                logging.warning("transcribe_file 没有返回预期的元组，使用单一返回值作为转写结果")
-        except Exception as e:
-            import traceback
-            logging.error(f"转写过程中出错: {str(e)}")
-            logging.error(f"错误详情: {traceback.format_exc()}")
-            raise
-        
-        # 检查转写结果
-        if transcript is None:
-            raise ValueError("转写结果为空")
-            
-        logging.info(f"转写完成，结果长度: {len(transcript) if transcript else 0}")
-        
-        # 更新状态为生成标签中
-        with open(status_file, "w") as f:
-            json.dump({
-                "status": "processing",
-                "filename": os.path.basename(file_path).replace(f"{job_id}_", ""),
-                "message": "正在生成标签",
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }, f, ensure_ascii=False)
-        
-        # 生成标签
-        logging.info("开始生成标签")
-        try:
-            tagger = TextTagger(topK=10)
-            tags = tagger.extract_tags(transcript)
-            
-            # 保存标签
-            with open(tags_file, "w", encoding="utf-8") as f:
-                json.dump(tags, f, ensure_ascii=False)
-                
-            logging.info(f"标签生成完成，共 {len(tags)} 个标签")
-        except Exception as e:
-            import traceback
-            logging.error(f"生成标签过程中出错: {str(e)}")
-            logging.error(f"错误详情: {traceback.format_exc()}")
-            # 继续执行，不中断流程
-        
-        # 更新状态为生成脚本中
-        with open(status_file, "w") as f:
-            json.dump({
-                "status": "processing",
-                "filename": os.path.basename(file_path).replace(f"{job_id}_", ""),
-                "message": "正在生成脚本",
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }, f, ensure_ascii=False)
-        
-        # 生成脚本
-        logging.info("开始生成脚本")
-        try:
-            creator = ContentCreator()
-            scripts = creator.generate_multiple_scripts(transcript, tags=tags, num_scripts=5)
-            
-            # 保存脚本
-            result = {
-                "original_text": transcript,
-                "scripts": scripts
-            }
-            
-            with open(scripts_file, "w", encoding="utf-8") as f:
-                json.dump(result, f, ensure_ascii=False)
-                
-            logging.info(f"脚本生成完成，共 {len(scripts)} 份脚本")
-        except Exception as e:
-            import traceback
-            logging.error(f"生成脚本过程中出错: {str(e)}")
-            logging.error(f"错误详情: {traceback.format_exc()}")
-            # 继续执行，不中断流程
-        
-        # 更新状态为完成
-        with open(status_file, "w") as f:
-            json.dump({
-                "status": "completed",
-                "filename": os.path.basename(file_path).replace(f"{job_id}_", ""),
-                "message": "处理完成",
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }, f, ensure_ascii=False)
-            
-    except Exception as e:
-        import traceback
-        logging.error(f"处理音频文件时出错: {str(e)}")
-        logging.error(f"错误详情: {traceback.format_exc()}")
-        # 更新状态为错误
-        with open(status_file, "w") as f:
-            json.dump({
-                "status": "error",
-                "filename": os.path.basename(file_path).replace(f"{job_id}_", ""),
-                "message": str(e),
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }, f, ensure_ascii=False)
+@app.get("/api/events")
+async def stream_events(request: Request, types: str = None, job_id: str = None, last_event_id: int = None):
+    """
+    推送任务和录制事件（Server-Sent Events），代替轮询任务列表和录制状态
 
-async def generate_tags_for_job(job_id: str):
-    """为指定任务生成标签"""
-    try:
-        job_folder = os.path.join(output_dir, job_id)
-        status_file = os.path.join(job_folder, "status.json")
-        transcript_file = os.path.join(job_folder, "transcript.txt")
-        tags_file = os.path.join(job_folder, "tags.json")
-        
-        logging.info(f"开始生成标签: {job_id}")
-        
-        # 检查文件是否存在
-        if not os.path.exists(transcript_file):
-            raise FileNotFoundError(f"转写结果文件不存在: {transcript_file}")
-            
-        # 读取转写结果
-        with open(transcript_file, "r", encoding="utf-8") as f:
-            transcript = f.read()
-            
-        # 创建标签生成对象
-        logging.info("创建标签生成对象")
-        tagger = TextTagger(topK=10)
-        
-        # 开始生成标签
-        logging.info("开始生成标签")
+    types 为逗号分隔的事件类型（job、transcription、recording、recording_segment），默认全部；
+    job_id 只推送指定任务的事件。断线重连时浏览器会带上 Last-Event-ID 请求头，期间错过的最近事件会先补发。
+    """
+    if last_event_id is None:
+        header_id = request.headers.get("last-event-id")
+        if header_id and header_id.isdigit():
+            last_event_id = int(header_id)
+    event_types = [t.strip() for t in types.split(",") if t.strip()] if types else None
+    subscription = event_bus.subscribe(types=event_types, job_id=job_id, last_event_id=last_event_id)
+    
+    async def event_stream():
         try:
-            tags = tagger.extract_tags(transcript)
-        except Exception as e:
-            import traceback
-            logging.error(f"生成标签过程中出错: {str(e)}")
-            logging.error(f"错误详情: {traceback.format_exc()}")
-            raise
-        
-        # 检查生成结果
-        if tags is None:
-            raise ValueError("生成结果为空")
-            
-        logging.info(f"生成标签完成，结果长度: {len(tags) if tags else 0}")
-        
-        # 保存生成结果
-        with open(tags_file, "w", encoding="utf-8") as f:
-            json.dump(tags, f, ensure_ascii=False)
-            
-        # 更新状态为完成
-        with open(status_file, "w") as f:
-            json.dump({
-                "status": "completed",
-                "filename": os.path.basename(transcript_file).replace(f"{job_id}_", ""),
-                "message": "标签生成完成",
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }, f)
-            
-    except Exception as e:
-        import traceback
-        logging.error(f"生成标签时出错: {str(e)}")
-        logging.error(f"错误详情: {traceback.format_exc()}")
-        # 更新状态为错误
-        with open(status_file, "w") as f:
-            json.dump({
-                "status": "error",
-                "filename": os.path.basename(transcript_file).replace(f"{job_id}_", ""),
-                "message": str(e),
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }, f, ensure_ascii=False)
+            # 告知浏览器断线后的重连间隔
+            yield "retry: 3000\n\n"
+            while True:
+                event = await subscription.get(timeout=EVENTS_KEEPALIVE_SECONDS)
+                if event is None:
+                    # 心跳注释，避免空闲连接被代理断开
+                    yield ": keep-alive\n\n"
+                    continue
+                payload = {**event["data"], "time": event["time"]}
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+        finally:
+            subscription.close()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/api/status")
 async def get_api_status():
@@ -1038,49 +743,62 @@ async def get_api_status():
             "lastCheck": datetime.now().isoformat()
         }
 
+def format_queue_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    """将队列任务转换为后台任务接口的返回格式"""
+    return {
+        "id": task["id"],
+        "name": task["kind"],
+        "job_id": task["job_id"],
+        "status": "pending" if task["state"] == "queued" else task["state"],
+        "start_time": task["started_at"] or task["created_at"],
+        "end_time": task["finished_at"],
+        "args": task["job_id"],
+        "kwargs": json.dumps(task["payload"], ensure_ascii=False),
+        "result": "成功完成" if task["state"] == "completed" else None,
+        "error": task["error"],
+        "attempts": task["attempts"]
+    }
+
 @app.get("/api/system/tasks")
-async def get_background_tasks():
-    """获取所有后台任务的状态"""
-    # 按开始时间倒序排序
-    sorted_tasks = sorted(
-        background_tasks.values(),
-        key=lambda x: x["start_time"],
-        reverse=True
-    )
-    return {"tasks": sorted_tasks}
+async def get_background_tasks(limit: int = 50):
+    """获取队列中任务的状态（按创建时间倒序）"""
+    return {"tasks": [format_queue_task(task) for task in job_queue.list(limit=limit)]}
 
 @app.get("/api/system/tasks/{task_id}")
 async def get_task_status(task_id: str):
     """获取指定后台任务的状态"""
-    if task_id not in background_tasks:
+    task = job_queue.get(task_id)
+    if not task:
         raise HTTPException(status_code=404, detail="任务不存在")
     
-    return background_tasks[task_id]
+    return format_queue_task(task)
 
 @app.get("/api/system/status")
 async def get_system_status():
     """获取系统状态"""
-    # 计算活跃任务数量
-    active_tasks = sum(1 for task in background_tasks.values() if task["status"] in ["pending", "running"])
+    counts = job_queue.counts()
     
-    # 计算线程池状态
+    # 进程内Worker状态
     thread_stats = {
-        "max_workers": thread_pool._max_workers,
-        "active_threads": len([t for t in thread_pool._threads if t is not None and t.is_alive()]),
-        "tasks_completed": thread_pool._work_queue.qsize()
+        "max_workers": EMBEDDED_WORKERS,
+        "active_threads": sum(1 for t in embedded_workers if t.is_alive()),
+        "tasks_completed": counts["completed"]
     }
     
     # 获取最近的任务
-    recent_tasks = sorted(
-        background_tasks.values(),
-        key=lambda x: x["start_time"],
-        reverse=True
-    )[:10]  # 只返回最近10个任务
+    recent_tasks = [format_queue_task(task) for task in job_queue.list(limit=10)]
     
     return {
-        "active_tasks": active_tasks,
-        "total_tasks": len(background_tasks),
+        "active_tasks": counts["queued"] + counts["running"],
+        "total_tasks": sum(counts.values()),
         "thread_pool": thread_stats,
+        "queue": counts,
+        "stages": stage_executor.stats(),
+        "pipeline": audio_pipeline_stats(),
+        "status_store": status_store.stats(),
+        "events": event_bus.stats(),
+        "generation": generation_client.stats(),
+        "response_cache": response_cache.stats() if response_cache else None,
         "recent_tasks": recent_tasks
     }
 
@@ -1176,6 +894,35 @@ async def stop_recording(task_id: str):
     status = live_recorder.get_recording_status(task_id)
     return {"success": True, "message": "录制已停止", "status": status}
 
+@app.on_event("startup")
+async def warm_up_text_processing():
+    """后台预热jieba词典，使第一次生成标签时不必等待词典加载"""
+    if JIEBA_WARMUP:
+        warm_up_in_background()
+
+@app.on_event("startup")
+async def start_embedded_workers():
+    """启动进程内Worker线程"""
+    for i in range(EMBEDDED_WORKERS):
+        worker = JobWorker()
+        thread = threading.Thread(
+            target=worker.run_forever,
+            args=(worker_stop_event,),
+            name=f"embedded-worker-{i}",
+            daemon=True
+        )
+        thread.start()
+        embedded_workers.append(thread)
+    logger.info(f"已启动 {EMBEDDED_WORKERS} 个进程内Worker")
+
+@app.on_event("shutdown")
+async def shutdown_executors():
+    """停止进程内Worker，写入尚未落盘的任务状态，关闭阶段执行器和生成客户端连接池"""
+    worker_stop_event.set()
+    status_store.flush()
+    stage_executor.shutdown(wait=False)
+    generation_client.close()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,875 @@
+"""
+任务处理流水线 - API进程和独立Worker进程共用的任务执行逻辑
+"""
+import os
+import sys
+import json
+import socket
+import logging
+import functools
+import threading
+from datetime import datetime
+from typing import Dict, Any, List
+
+# 添加项目根目录到系统路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+# 添加audio-text模块路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../audio-text")))
+
+# 导入配置
+from config import OUTPUT_DIR, UPLOADS_DIR
+from utils.config import (
+    QUEUE_LEASE_SECONDS,
+    QUEUE_MAX_ATTEMPTS,
+    AUDIO_PIPELINE_ENABLED,
+    PIPELINE_TRANSCRIBE_WORKERS,
+    PIPELINE_TAG_WORKERS,
+    PIPELINE_GENERATE_WORKERS,
+    PIPELINE_QUEUE_SIZE,
+    STATUS_FLUSH_INTERVAL,
+    STATUS_CACHE_MAX_JOBS
+)
+
+# 导入音频处理模块
+from audio_processing.speech_to_text import SpeechToText
+from text_processing.tagger import TextTagger
+from ai_generation.content_creator import get_content_creator
+from ai_generation.summarizer import SUMMARY_CACHE_FILENAME
+
+from utils.job_index import JobIndex
+from utils.job_queue import JobQueue, QUEUE_FILENAME
+from utils.stage_executor import stage_executor
+from utils.stage_pipeline import StagePipeline
+from utils.status_store import JobStatusStore
+from utils.event_bus import event_bus
+
+logger = logging.getLogger('pipeline')
+
+# 输出和上传目录
+output_dir = OUTPUT_DIR
+uploads_dir = UPLOADS_DIR
+
+os.makedirs(output_dir, exist_ok=True)
+os.makedirs(uploads_dir, exist_ok=True)
+
+# 任务索引
+job_index = JobIndex(output_dir)
+
+# 任务状态存储（内存缓存 + 合并写入status.json）
+status_store = JobStatusStore(
+    output_dir,
+    index=job_index,
+    flush_interval=STATUS_FLUSH_INTERVAL,
+    max_cached=STATUS_CACHE_MAX_JOBS
+)
+
+# 持久化任务队列
+job_queue = JobQueue(
+    os.path.join(output_dir, QUEUE_FILENAME),
+    lease_seconds=QUEUE_LEASE_SECONDS,
+    max_attempts=QUEUE_MAX_ATTEMPTS
+)
+
+def save_job_status(job_id: str, status: Dict[str, Any]):
+    """保存任务状态（立即更新内存，稍后合并写入status.json并同步任务索引；保留原有的created_at），并推送job事件"""
+    current = status_store.save(job_id, status)
+    event_bus.publish("job", {"job_id": job_id, **current})
+
+def read_job_status(job_id: str) -> Dict[str, Any]:
+    """读取任务状态，任务不存在时返回None"""
+    return status_store.get(job_id)
+
+def read_job_tags(job_id: str) -> List[str]:
+    """读取任务的标签，不存在或读取失败时返回空列表"""
+    tags_file = os.path.join(output_dir, job_id, "tags.json")
+    if not os.path.exists(tags_file):
+        return []
+    try:
+        with open(tags_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logging.warning(f"读取标签文件失败: {str(e)}")
+        return []
+
+def save_generated_scripts(job_id: str, new_scripts: List[str], transcript: str, overwrite: bool = False):
+    """
+    将新生成的脚本合并到任务的scripts.json
+
+    Args:
+        job_id: 任务ID
+        new_scripts: 新生成的脚本列表
+        transcript: 转写原文
+        overwrite: 是否覆盖现有脚本，False表示追加
+
+    Returns:
+        合并后的脚本对象
+    """
+    scripts_file = os.path.join(output_dir, job_id, "scripts.json")
+    
+    # 处理现有脚本（如果存在）
+    existing_scripts = None
+    original_format = None
+    if os.path.exists(scripts_file):
+        try:
+            with open(scripts_file, "r", encoding="utf-8") as f:
+                existing_scripts = json.load(f)
+                
+            # 确定原始格式
+            if isinstance(existing_scripts, list):
+                original_format = "array"
+            elif isinstance(existing_scripts, dict) and "scripts" in existing_scripts:
+                original_format = "object_with_scripts"
+            elif isinstance(existing_scripts, dict):
+                original_format = "object"
+        except Exception as e:
+            logging.warning(f"读取现有脚本文件失败: {str(e)}")
+    
+    if overwrite:
+        # 覆盖模式：使用新生成的脚本，但保持原始格式
+        logging.info("使用覆盖模式，替换现有脚本")
+        if original_format == "object_with_scripts":
+            # 如果原始格式是包含scripts字段的对象
+            if isinstance(existing_scripts, dict):
+                # 保留原始对象的其他字段
+                combined_scripts = existing_scripts.copy()
+                combined_scripts["scripts"] = new_scripts
+                # 确保有原文
+                combined_scripts["original_text"] = transcript
+            else:
+                combined_scripts = {"scripts": new_scripts, "original_text": transcript}
+        elif original_format == "object":
+            # 如果原始格式是其他类型的对象
+            combined_scripts = {"scripts": new_scripts, "original_text": transcript}
+        else:
+            # 默认使用对象格式，即使原始格式是数组或没有原始格式
+            combined_scripts = {"scripts": new_scripts, "original_text": transcript}
+    else:
+        # 追加模式：读取现有脚本并追加
+        logging.info("使用追加模式，保留现有脚本")
+        # 读取现有脚本（如果存在）
+        existing_scripts = []
+        if os.path.exists(scripts_file):
+            try:
+                with open(scripts_file, "r", encoding="utf-8") as f:
+                    existing_scripts = json.load(f)
+            except Exception as e:
+                logging.warning(f"读取现有脚本文件失败，将创建新文件: {str(e)}")
+        
+        # 追加时跳过与已有脚本完全相同的内容
+        if isinstance(existing_scripts, dict):
+            existing_list = existing_scripts.get("scripts") or []
+        else:
+            existing_list = existing_scripts if isinstance(existing_scripts, list) else []
+        new_scripts = [script for script in new_scripts if script not in existing_list]
+        
+        # 合并脚本
+        if isinstance(existing_scripts, list):
+            # 如果现有脚本是数组，直接追加
+            combined_scripts = {"scripts": existing_scripts + new_scripts, "original_text": transcript}
+        elif isinstance(existing_scripts, dict) and "scripts" in existing_scripts:
+            # 如果现有脚本是包含scripts数组的对象
+            combined_scripts = existing_scripts.copy()
+            combined_scripts["scripts"] = combined_scripts["scripts"] + new_scripts
+            # 确保有原文
+            combined_scripts["original_text"] = transcript
+        else:
+            # 如果没有现有脚本或格式不正确，使用新脚本并包装成对象格式
+            combined_scripts = {"scripts": new_scripts, "original_text": transcript}
+    
+    # 保存生成结果
+    with open(scripts_file, "w", encoding="utf-8") as f:
+        json.dump(combined_scripts, f, ensure_ascii=False)
+    
+    return combined_scripts
+
+def generate_scripts_for_job(job_id: str, num_scripts: int = 5, custom_prompt: str = None, overwrite: bool = False,
+                             fresh: bool = False):
+    """
+    为指定任务生成脚本
+
+    只有覆盖模式才使用生成结果缓存（例如重试任务时重新生成相同的脚本）；追加模式要的是新的变体，
+    fresh为True时同样跳过缓存
+    """
+    try:
+        job_folder = os.path.join(output_dir, job_id)
+        status_file = os.path.join(job_folder, "status.json")
+        transcript_file = os.path.join(job_folder, "transcript.txt")
+        
+        logging.info(f"开始生成脚本: {job_id}")
+        
+        # 读取转写结果
+        with open(transcript_file, "r", encoding="utf-8") as f:
+            transcript = f.read()
+            
+        # 读取标签（如果存在）
+        tags = read_job_tags(job_id)
+        
+        # 创建脚本生成对象
+        logging.info("创建脚本生成对象")
+        content_creator = get_content_creator()
+        
+        # 开始生成脚本
+        logging.info("开始生成脚本")
+        try:
+            new_scripts = stage_executor.submit(
+                "generate",
+                content_creator.generate_multiple_scripts,
+                transcript,
+                tags=tags,
+                num_scripts=num_scripts,
+                custom_prompt=custom_prompt,
+                use_cache=overwrite and not fresh,
+                summary_cache_file=os.path.join(job_folder, SUMMARY_CACHE_FILENAME)
+            ).result()
+        except Exception as e:
+            import traceback
+            logging.error(f"生成脚本过程中出错: {str(e)}")
+            logging.error(f"错误详情: {traceback.format_exc()}")
+            raise
+        
+        # 检查生成结果
+        if not new_scripts:
+            raise ValueError("生成结果为空")
+            
+        logging.info(f"生成脚本完成，结果长度: {len(new_scripts) if new_scripts else 0}")
+        
+        # 合并并保存生成结果
+        combined_scripts = save_generated_scripts(job_id, new_scripts, transcript, overwrite)
+            
+        # 更新状态为完成
+        save_job_status(job_id, {
+            "status": "completed",
+            "filename": os.path.basename(transcript_file).replace(f"{job_id}_", ""),
+            "message": "脚本生成完成",
+            "created_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat()
+        })
+            
+        return combined_scripts
+            
+    except Exception as e:
+        import traceback
+        logging.error(f"生成脚本时出错: {str(e)}")
+        logging.error(f"错误详情: {traceback.format_exc()}")
+        # 更新状态为错误
+        save_job_status(job_id, {
+            "status": "error",
+            "filename": os.path.basename(transcript_file).replace(f"{job_id}_", ""),
+            "message": str(e),
+            "created_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat()
+        })
+        raise
+
+
+def stream_scripts_for_job(job_id: str, num_scripts: int = 5, custom_prompt: str = None, overwrite: bool = False,
+                           fresh: bool = False):
+    """
+    流式为指定任务生成脚本，边生成边返回事件，全部结束后保存到scripts.json
+    （与generate_scripts_for_job相同，只有覆盖模式且fresh为False时才使用生成结果缓存）
+    
+    Yields:
+        事件字典（start/token/script/error，见ContentCreator.stream_multiple_scripts），
+        最后一个事件为done（含保存的脚本数量）或failed（含错误信息）
+    """
+    job_folder = os.path.join(output_dir, job_id)
+    transcript_file = os.path.join(job_folder, "transcript.txt")
+    filename = os.path.basename(transcript_file).replace(f"{job_id}_", "")
+    finished = False
+    
+    try:
+        with open(transcript_file, "r", encoding="utf-8") as f:
+            transcript = f.read()
+        tags = read_job_tags(job_id)
+        
+        logging.info(f"开始流式生成脚本: {job_id}")
+        scripts = {}
+        for event in get_content_creator().stream_multiple_scripts(
+            transcript,
+            tags=tags,
+            num_scripts=num_scripts,
+            custom_prompt=custom_prompt,
+            use_cache=overwrite and not fresh,
+            summary_cache_file=os.path.join(job_folder, SUMMARY_CACHE_FILENAME)
+        ):
+            if event["event"] == "script" and event["script"]:
+                scripts[event["index"]] = event["script"]
+            yield event
+        
+        new_scripts = [scripts[i] for i in sorted(scripts)]
+        save_generated_scripts(job_id, new_scripts, transcript, overwrite)
+        save_job_status(job_id, {
+            "status": "completed",
+            "filename": filename,
+            "message": "脚本生成完成",
+            "created_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat()
+        })
+        finished = True
+        yield {"event": "done", "count": len(new_scripts)}
+        
+    except Exception as e:
+        import traceback
+        logging.error(f"流式生成脚本时出错: {str(e)}")
+        logging.error(f"错误详情: {traceback.format_exc()}")
+        finished = True
+        save_job_status(job_id, {
+            "status": "error",
+            "filename": filename,
+            "message": str(e),
+            "created_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat()
+        })
+        yield {"event": "failed", "message": str(e)}
+        
+    finally:
+        if not finished:
+            # 客户端中途断开，已生成的部分不保存，任务恢复为完成状态
+            logging.warning(f"流式生成脚本被中断: {job_id}")
+            save_job_status(job_id, {
+                "status": "completed",
+                "filename": filename,
+                "message": "脚本生成已中断",
+                "created_at": datetime.now().isoformat(),
+                "updated_at": datetime.now().isoformat()
+            })
+
+def generate_tags_and_scripts_for_job(job_id: str):
+    """为指定任务生成标签和脚本（基于已有的转写结果）"""
+    try:
+        job_folder = os.path.join(output_dir, job_id)
+        status_file = os.path.join(job_folder, "status.json")
+        transcript_file = os.path.join(job_folder, "transcript.txt")
+        tags_file = os.path.join(job_folder, "tags.json")
+        scripts_file = os.path.join(job_folder, "scripts.json")
+        
+        logging.info(f"开始生成标签和脚本: {job_id}")
+        
+        # 读取转写结果
+        with open(transcript_file, "r", encoding="utf-8") as f:
+            transcript = f.read()
+        
+        # 创建标签生成对象
+        logging.info("创建标签生成对象")
+        tagger = TextTagger(topK=10)
+        
+        # 开始生成标签
+        logging.info("开始生成标签")
+        try:
+            tags = stage_executor.submit("tag", tagger.extract_tags, transcript).result()
+        except Exception as e:
+            import traceback
+            logging.error(f"生成标签过程中出错: {str(e)}")
+            logging.error(f"错误详情: {traceback.format_exc()}")
+            raise
+        
+        # 检查生成结果
+        if tags is None:
+            raise ValueError("生成结果为空")
+            
+        logging.info(f"生成标签完成，结果长度: {len(tags) if tags else 0}")
+        
+        # 保存生成结果
+        with open(tags_file, "w", encoding="utf-8") as f:
+            json.dump(tags, f, ensure_ascii=False)
+            
+        # 创建脚本生成对象
+        logging.info("创建脚本生成对象")
+        content_creator = get_content_creator()
+        
+        # 开始生成脚本
+        logging.info("开始生成脚本")
+        try:
+            scripts = stage_executor.submit(
+                "generate",
+                content_creator.generate_multiple_scripts,
+                transcript,
+                tags=tags,
+                num_scripts=5,
+                summary_cache_file=os.path.join(job_folder, SUMMARY_CACHE_FILENAME)
+            ).result()
+        except Exception as e:
+            import traceback
+            logging.error(f"生成脚本过程中出错: {str(e)}")
+            logging.error(f"错误详情: {traceback.format_exc()}")
+            raise
+        
+        # 检查生成结果
+        if not scripts:
+            raise ValueError("生成结果为空")
+            
+        logging.info(f"生成脚本完成，结果长度: {len(scripts) if scripts else 0}")
+        
+        # 保存生成结果
+        result = {
+            "original_text": transcript,
+            "scripts": scripts
+        }
+        
+        with open(scripts_file, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False)
+            
+        # 更新状态为完成
+        save_job_status(job_id, {
+            "status": "completed",
+            "filename": os.path.basename(transcript_file).replace(f"{job_id}_", ""),
+            "message": "标签和脚本生成完成",
+            "created_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat()
+        })
+            
+    except Exception as e:
+        import traceback
+        logging.error(f"生成标签和脚本时出错: {str(e)}")
+        logging.error(f"错误详情: {traceback.format_exc()}")
+        # 更新状态为错误
+        save_job_status(job_id, {
+            "status": "error",
+            "filename": os.path.basename(transcript_file).replace(f"{job_id}_", ""),
+            "message": str(e),
+            "created_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat()
+        })
+        raise
+
+def _audio_stage(func):
+    """音频处理阶段的装饰器：阶段出错时将错误写入status.json后继续抛出"""
+    @functools.wraps(func)
+    def wrapper(job: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return func(job)
+        except Exception as e:
+            import traceback
+            logging.error(f"处理音频文件时出错: {str(e)}")
+            logging.error(f"错误详情: {traceback.format_exc()}")
+            # 更新状态为错误
+            save_job_status(job["job_id"], {
+                "status": "error",
+                "filename": job["filename"],
+                "message": str(e),
+                "created_at": datetime.now().isoformat(),
+                "updated_at": datetime.now().isoformat()
+            })
+            raise
+    return wrapper
+
+def new_audio_job(job_id: str, file_path: str, content_hash: str = None) -> Dict[str, Any]:
+    """创建在各音频处理阶段之间传递的任务上下文"""
+    job_folder = os.path.join(output_dir, job_id)
+    return {
+        "job_id": job_id,
+        "file_path": file_path,
+        "content_hash": content_hash,
+        "filename": os.path.basename(file_path).replace(f"{job_id}_", ""),
+        "job_folder": job_folder,
+        "transcript": None,
+        "tags": []
+    }
+
+@_audio_stage
+def transcribe_audio_stage(job: Dict[str, Any]) -> Dict[str, Any]:
+    """音频处理第一阶段：转写音频"""
+    job_id = job["job_id"]
+    file_path = job["file_path"]
+    transcript_file = os.path.join(job["job_folder"], "transcript.txt")
+    
+    logging.info(f"开始处理音频文件: {file_path}")
+    
+    # 检查文件是否存在
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"音频文件不存在: {file_path}")
+        
+    # 创建语音转文字对象
+    logging.info("创建语音转文字对象")
+    transcriber = SpeechToText()
+    
+    # 更新状态为转写中
+    save_job_status(job_id, {
+        "status": "processing",
+        "filename": job["filename"],
+        "message": "正在转写音频",
+        "created_at": datetime.now().isoformat(),
+        "updated_at": datetime.now().isoformat()
+    })
+    
+    # 推送转写进度：音频发送进度和已识别的句子数
+    sentence_count = 0
+    
+    def on_sentence(text):
+        nonlocal sentence_count
+        sentence_count += 1
+        event_bus.publish("transcription", {"job_id": job_id, "sentences": sentence_count, "text": text})
+    
+    def on_progress(sent_bytes, total_bytes):
+        event_bus.publish("transcription", {
+            "job_id": job_id,
+            "sent_bytes": sent_bytes,
+            "total_bytes": total_bytes,
+            "progress": int(sent_bytes * 100 / total_bytes) if total_bytes else 100
+        })
+    
+    # 开始转写 - 注意：transcribe_file 返回 (transcript, output_file)
+    logging.info("开始转写音频")
+    try:
+        transcript_result = transcriber.transcribe_file(
+            file_path,
+            transcript_file,
+            content_hash=job["content_hash"],
+            on_sentence=on_sentence,
+            on_progress=on_progress
+        )
+        # 检查返回值类型
+        if isinstance(transcript_result, tuple) and len(transcript_result) == 2:
+            transcript, _ = transcript_result
+        else:
+            # 如果不是元组，可能是直接返回了转写结果
+            transcript = transcript_result
+            logging.warning("transcribe_file 没有返回预期的元组，使用单一返回值作为转写结果")
+    except Exception as e:
+        import traceback
+        logging.error(f"转写过程中出错: {str(e)}")
+        logging.error(f"错误详情: {traceback.format_exc()}")
+        raise
+    
+    # 检查转写结果
+    if transcript is None:
+        raise ValueError("转写结果为空")
+        
+    logging.info(f"转写完成，结果长度: {len(transcript) if transcript else 0}")
+    job["transcript"] = transcript
+    return job
+
+@_audio_stage
+def tag_audio_stage(job: Dict[str, Any]) -> Dict[str, Any]:
+    """音频处理第二阶段：生成标签"""
+    tags_file = os.path.join(job["job_folder"], "tags.json")
+    
+    # 更新状态为生成标签中
+    save_job_status(job["job_id"], {
+        "status": "processing",
+        "filename": job["filename"],
+        "message": "正在生成标签",
+        "created_at": datetime.now().isoformat(),
+        "updated_at": datetime.now().isoformat()
+    })
+    
+    # 生成标签
+    logging.info("开始生成标签")
+    try:
+        tagger = TextTagger(topK=10)
+        tags = tagger.extract_tags(job["transcript"])
+        
+        # 保存标签
+        with open(tags_file, "w", encoding="utf-8") as f:
+            json.dump(tags, f, ensure_ascii=False)
+            
+        job["tags"] = tags
+        logging.info(f"标签生成完成，共 {len(tags)} 个标签")
+    except Exception as e:
+        import traceback
+        logging.error(f"生成标签过程中出错: {str(e)}")
+        logging.error(f"错误详情: {traceback.format_exc()}")
+        # 继续执行，不中断流程
+    return job
+
+@_audio_stage
+def generate_audio_stage(job: Dict[str, Any]) -> Dict[str, Any]:
+    """音频处理第三阶段：生成脚本，完成后将任务标记为完成"""
+    job_id = job["job_id"]
+    transcript = job["transcript"]
+    scripts_file = os.path.join(job["job_folder"], "scripts.json")
+    
+    # 更新状态为生成脚本中
+    save_job_status(job_id, {
+        "status": "processing",
+        "filename": job["filename"],
+        "message": "正在生成脚本",
+        "created_at": datetime.now().isoformat(),
+        "updated_at": datetime.now().isoformat()
+    })
+    
+    # 生成脚本（失败时由阶段装饰器将任务标记为错误）
+    logging.info("开始生成脚本")
+    creator = get_content_creator()
+    scripts = creator.generate_multiple_scripts(
+        transcript,
+        tags=job["tags"],
+        num_scripts=5,
+        summary_cache_file=os.path.join(job["job_folder"], SUMMARY_CACHE_FILENAME)
+    )
+    if not scripts:
+        raise ValueError("生成结果为空")
+    
+    # 保存脚本
+    result = {
+        "original_text": transcript,
+        "scripts": scripts
+    }
+    
+    with open(scripts_file, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False)
+        
+    logging.info(f"脚本生成完成，共 {len(scripts)} 份脚本")
+    
+    # 更新状态为完成
+    save_job_status(job_id, {
+        "status": "completed",
+        "filename": job["filename"],
+        "message": "处理完成",
+        "created_at": datetime.now().isoformat(),
+        "updated_at": datetime.now().isoformat()
+    })
+    return job
+
+# 音频处理的各阶段，按执行顺序排列
+AUDIO_STAGES = [
+    ("transcribe", transcribe_audio_stage),
+    ("tag", tag_audio_stage),
+    ("generate", generate_audio_stage),
+]
+
+def process_audio_file(job_id: str, file_path: str, content_hash: str = None):
+    """在后台处理音频文件，依次执行各阶段（每个阶段在阶段执行器的线程池中运行）"""
+    job = new_audio_job(job_id, file_path, content_hash)
+    for stage, func in AUDIO_STAGES:
+        job = stage_executor.submit(stage, func, job).result()
+
+_audio_pipeline = None
+_audio_pipeline_lock = threading.Lock()
+
+def _run_in_stage_executor(stage: str, func):
+    """
+    包装流水线阶段函数，使其在阶段执行器的同名线程池中运行
+
+    流水线的工作线程只负责排队和等待，实际执行受 *_CONCURRENCY 限制，
+    与手动触发的标签、脚本生成共用同一并发上限，运行状态也统计在 stages 中
+    """
+    @functools.wraps(func)
+    def run(job: Dict[str, Any]) -> Dict[str, Any]:
+        return stage_executor.submit(stage, func, job).result()
+    return run
+
+def get_audio_pipeline() -> StagePipeline:
+    """
+    获取音频处理流水线（首次调用时创建并启动各阶段的工作线程）
+
+    各阶段通过有界队列串联，一个任务生成脚本时后面的任务可以同时转写，
+    同时用满语音识别和文本生成的配额；各阶段函数在阶段执行器中运行，并发数不超过阶段执行器的限制
+    """
+    global _audio_pipeline
+    with _audio_pipeline_lock:
+        if _audio_pipeline is None:
+            workers = {
+                "transcribe": PIPELINE_TRANSCRIBE_WORKERS,
+                "tag": PIPELINE_TAG_WORKERS,
+                "generate": PIPELINE_GENERATE_WORKERS,
+            }
+            _audio_pipeline = StagePipeline(
+                [(stage, _run_in_stage_executor(stage, func), workers[stage]) for stage, func in AUDIO_STAGES],
+                queue_size=PIPELINE_QUEUE_SIZE,
+                name="audio"
+            )
+    return _audio_pipeline
+
+def audio_pipeline_stats():
+    """音频处理流水线各阶段的运行状态，流水线未启动时返回None"""
+    return _audio_pipeline.stats() if _audio_pipeline is not None else None
+
+def generate_tags_for_job(job_id: str):
+    """为指定任务生成标签"""
+    try:
+        job_folder = os.path.join(output_dir, job_id)
+        status_file = os.path.join(job_folder, "status.json")
+        transcript_file = os.path.join(job_folder, "transcript.txt")
+        tags_file = os.path.join(job_folder, "tags.json")
+        
+        logging.info(f"开始生成标签: {job_id}")
+        
+        # 检查文件是否存在
+        if not os.path.exists(transcript_file):
+            raise FileNotFoundError(f"转写结果文件不存在: {transcript_file}")
+            
+        # 读取转写结果
+        with open(transcript_file, "r", encoding="utf-8") as f:
+            transcript = f.read()
+            
+        # 创建标签生成对象
+        logging.info("创建标签生成对象")
+        tagger = TextTagger(topK=10)
+        
+        # 开始生成标签
+        logging.info("开始生成标签")
+        try:
+            tags = stage_executor.submit("tag", tagger.extract_tags, transcript).result()
+        except Exception as e:
+            import traceback
+            logging.error(f"生成标签过程中出错: {str(e)}")
+            logging.error(f"错误详情: {traceback.format_exc()}")
+            raise
+        
+        # 检查生成结果
+        if tags is None:
+            raise ValueError("生成结果为空")
+            
+        logging.info(f"生成标签完成，结果长度: {len(tags) if tags else 0}")
+        
+        # 保存生成结果
+        with open(tags_file, "w", encoding="utf-8") as f:
+            json.dump(tags, f, ensure_ascii=False)
+            
+        # 更新状态为完成
+        save_job_status(job_id, {
+            "status": "completed",
+            "filename": os.path.basename(transcript_file).replace(f"{job_id}_", ""),
+            "message": "标签生成完成",
+            "created_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat()
+        })
+            
+    except Exception as e:
+        import traceback
+        logging.error(f"生成标签时出错: {str(e)}")
+        logging.error(f"错误详情: {traceback.format_exc()}")
+        # 更新状态为错误
+        save_job_status(job_id, {
+            "status": "error",
+            "filename": os.path.basename(transcript_file).replace(f"{job_id}_", ""),
+            "message": str(e),
+            "created_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat()
+        })
+        raise
+
+# 队列任务类型与处理函数的对应关系
+TASK_HANDLERS = {
+    "process_audio": process_audio_file,
+    "generate_tags_and_scripts": generate_tags_and_scripts_for_job,
+    "generate_tags": generate_tags_for_job,
+    "generate_scripts": generate_scripts_for_job,
+}
+
+def enqueue_job(job_id: str, kind: str, **payload) -> str:
+    """
+    将任务加入持久化队列
+
+    Args:
+        job_id: 任务ID
+        kind: 任务类型，见TASK_HANDLERS
+
+    Returns:
+        队列任务ID
+    """
+    if kind not in TASK_HANDLERS:
+        raise ValueError(f"未知的任务类型: {kind}")
+    return job_queue.enqueue(job_id, kind, payload)
+
+class JobWorker:
+    """从持久化队列领取并执行任务的Worker"""
+
+    def __init__(self, queue: JobQueue = None, worker_id: str = None, poll_interval: float = 1.0, kinds=None,
+                 use_pipeline: bool = AUDIO_PIPELINE_ENABLED):
+        """
+        初始化Worker
+
+        Args:
+            queue: 任务队列，None表示使用默认队列
+            worker_id: Worker标识，None表示自动生成
+            poll_interval: 队列为空时的轮询间隔（秒）
+            kinds: 只处理指定类型的任务，None表示处理所有类型
+            use_pipeline: 音频处理任务是否交给进程内的音频处理流水线执行（领取后立即返回，继续领取下一个任务）
+        """
+        self.queue = queue or job_queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{threading.get_ident()}"
+        self.poll_interval = poll_interval
+        self.kinds = kinds
+        self.pipeline = get_audio_pipeline() if use_pipeline else None
+
+    def run_once(self) -> bool:
+        """
+        领取并执行一个任务
+
+        Returns:
+            是否执行了任务
+        """
+        kinds = self.kinds
+        if self.pipeline is not None and not self.pipeline.has_capacity():
+            # 流水线的转写队列已满时暂不领取音频处理任务，留给其他Worker
+            kinds = [kind for kind in (kinds or TASK_HANDLERS) if kind != "process_audio"]
+            if not kinds:
+                return False
+
+        task = self.queue.claim(self.worker_id, kinds=kinds, on_dead=self._mark_dead)
+        if task is None:
+            return False
+
+        logger.info(f"[{self.worker_id}] 开始执行任务: {task['kind']} (job_id={task['job_id']}, 第{task['attempts']}次尝试)")
+
+        # 在后台线程中定期续约，避免长时间转写被误判为崩溃
+        stop_heartbeat = threading.Event()
+
+        def heartbeat():
+            while not stop_heartbeat.wait(self.queue.lease_seconds / 3):
+                if not self.queue.heartbeat(task["id"], self.worker_id):
+                    logger.warning(f"[{self.worker_id}] 任务续约失败: {task['id']}")
+
+        heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+        heartbeat_thread.start()
+
+        def finish(error):
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+            if error is None:
+                if self.queue.complete(task["id"], self.worker_id):
+                    logger.info(f"[{self.worker_id}] 任务执行完成: {task['id']}")
+                else:
+                    logger.warning(f"[{self.worker_id}] 任务租约已失效，已被其他Worker重新领取，本次结果不再标记完成: {task['id']}")
+            else:
+                # 处理函数已将错误写入status.json，业务错误不自动重试，可通过 /retry 接口手动重试
+                self.queue.fail(task["id"], self.worker_id, str(error), retry=False)
+
+        if self.pipeline is not None and task["kind"] == "process_audio":
+            # 交给流水线执行，全部阶段结束后再完成队列任务，期间持续续约
+            job = new_audio_job(task["job_id"], **task["payload"])
+            self.pipeline.submit(job, lambda result, error: finish(error))
+            return True
+
+        try:
+            handler = TASK_HANDLERS[task["kind"]]
+            handler(task["job_id"], **task["payload"])
+        except Exception as e:
+            finish(e)
+        else:
+            finish(None)
+
+        return True
+
+    def _mark_dead(self, task: Dict[str, Any]):
+        """执行任务的Worker崩溃且已达最大尝试次数时，将任务状态改为错误，以便通过 /retry 接口手动重试"""
+        save_job_status(task["job_id"], {
+            "status": "error",
+            "message": task["error"],
+            "updated_at": datetime.now().isoformat()
+        })
+
+    def run_forever(self, stop_event: threading.Event = None):
+        """
+        持续领取并执行任务，直到stop_event被设置
+
+        Args:
+            stop_event: 停止信号，None表示一直运行
+        """
+        stop_event = stop_event or threading.Event()
+        logger.info(f"Worker已启动: {self.worker_id}")
+        while not stop_event.is_set():
+            try:
+                if not self.run_once():
+                    stop_event.wait(self.poll_interval)
+            except Exception as e:
+                logger.error(f"[{self.worker_id}] Worker循环出错: {str(e)}")
+                stop_event.wait(self.poll_interval)
+        if self.pipeline is not None:
+            # 等待已交给流水线的任务执行完
+            self.pipeline.wait_idle()
+        # 立即写入最后的任务状态：run_worker.py的fork子进程通过os._exit退出，不会执行atexit中的写入
+        status_store.flush()
+        logger.info(f"Worker已停止: {self.worker_id}")
@@ -4,52 +4,110 @@ AI内容创作模块 - 使用阿里云DeepSeek模型
 import os
 import json
 import time
+import queue
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('content_creator')
 
-# 尝试导入dashscope
-try:
-    import dashscope
-    from dashscope import Generation
-    USE_DASHSCOPE = True
-    logger.info("成功导入阿里云DashScope SDK")
-except ImportError as e:
-    USE_DASHSCOPE = False
-    logger.error(f"阿里云DashScope SDK导入失败: {str(e)}")
-    logger.error("请确保已安装阿里云DashScope SDK: pip install dashscope")
+from utils.config import (
+    ALIYUN_DASHSCOPE_API_KEY,
+    SCRIPT_GENERATION_MODE,
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_DIR,
+    RESPONSE_CACHE_MAX_MB,
+    RESPONSE_CACHE_TTL,
+    SEGMENT_WORKERS,
+    SEGMENT_MAX_RETRIES,
+    SEGMENT_RATE_LIMIT,
+    SUMMARY_THRESHOLD_CHARS,
+    SUMMARY_CHUNK_CHARS,
+    SUMMARY_MAX_TOKENS
+)
+from ai_generation.generation_client import generation_client, GenerationError, USE_REQUESTS, USE_DASHSCOPE
+from ai_generation.response_cache import ResponseCache
+from ai_generation.rate_limiter import TokenBucket
+from ai_generation.summarizer import TranscriptSummarizer
 
-from utils.config import ALIYUN_DASHSCOPE_API_KEY
+# 并发生成多个脚本时，依次为每个脚本指定的风格
+SCRIPT_STYLES = [
+    ("热情带货", "节奏快、情绪饱满，突出卖点和优惠"),
+    ("故事叙述", "用一个贴近生活的小故事引出主题"),
+    ("专业讲解", "条理清晰，多用数据和细节建立信任"),
+    ("幽默互动", "轻松风趣，穿插玩笑和弹幕互动"),
+    ("情感共鸣", "从观众的痛点和感受出发，真诚走心"),
+    ("问答互动", "以观众常问的问题串联内容"),
+    ("简洁干练", "短句为主，直击重点"),
+    ("限时促销", "营造紧迫感，强调限时限量"),
+    ("对比测评", "通过前后对比或同类对比突出优势"),
+    ("闺蜜聊天", "像和朋友聊天一样亲切自然")
+]
+
+# 并发生成时单个脚本的最大token数
+SCRIPT_MAX_TOKENS = 1200
+
+# 生成结果缓存（进程内共享，多进程通过缓存目录共享）
+response_cache = ResponseCache(RESPONSE_CACHE_DIR, RESPONSE_CACHE_MAX_MB * 1024 * 1024, RESPONSE_CACHE_TTL) if RESPONSE_CACHE_ENABLED else None
+
+# 共享的内容创作器，按模型名缓存
+_shared_creators = {}
+_shared_creators_lock = threading.Lock()
+
+def get_content_creator(model="qwen-max"):
+    """
+    获取进程内共享的内容创作器（所有任务复用同一个生成客户端和连接池）
+    
+    Args:
+        model: 使用的模型名称，默认为qwen-max
+        
+    Returns:
+        ContentCreator实例
+    """
+    with _shared_creators_lock:
+        creator = _shared_creators.get(model)
+        if creator is None:
+            creator = ContentCreator(model)
+            _shared_creators[model] = creator
+        return creator
 
 class ContentCreator:
     """AI内容创作类，使用阿里云DeepSeek模型"""
     
-    def __init__(self, model="qwen-max"):
+    def __init__(self, model="qwen-max", client=None):
         """
         初始化内容创作器
         
         Args:
             model: 使用的模型名称，默认为qwen-max
+            client: 文本生成客户端，None表示使用进程内共享的客户端
         """
         self.model = model
+        self.client = client or generation_client
+        self.cache = response_cache
+        self.summarizer = TranscriptSummarizer(
+            self,
+            threshold_chars=SUMMARY_THRESHOLD_CHARS,
+            chunk_chars=SUMMARY_CHUNK_CHARS,
+            max_tokens=SUMMARY_MAX_TOKENS
+        )
         logger.info(f"初始化内容创作器，使用模型: {model}")
-        logger.info(f"ALIYUN_DASHSCOPE_API_KEY: {ALIYUN_DASHSCOPE_API_KEY[:3]}...{ALIYUN_DASHSCOPE_API_KEY[-3:] if ALIYUN_DASHSCOPE_API_KEY else 'None'}")
         
-        if not ALIYUN_DASHSCOPE_API_KEY:
-            logger.error("API密钥未正确配置，请检查.env文件")
-            raise ValueError("API密钥未正确配置，请检查.env文件")
+        # 传入的客户端自带密钥和请求方式，只有使用进程内共享的客户端时才检查配置和依赖
+        if client is None:
+            if not ALIYUN_DASHSCOPE_API_KEY:
+                logger.error("API密钥未正确配置，请检查.env文件")
+                raise ValueError("API密钥未正确配置，请检查.env文件")
+            logger.info(f"ALIYUN_DASHSCOPE_API_KEY: {ALIYUN_DASHSCOPE_API_KEY[:3]}...{ALIYUN_DASHSCOPE_API_KEY[-3:]}")
             
-        if USE_DASHSCOPE:
-            logger.info("使用阿里云DashScope SDK进行内容创作")
-            dashscope.api_key = ALIYUN_DASHSCOPE_API_KEY
-        else:
-            logger.error("阿里云DashScope SDK不可用，请安装SDK")
-            raise ImportError("阿里云DashScope SDK不可用，请安装SDK")
+            if not USE_REQUESTS and not USE_DASHSCOPE:
+                logger.error("requests和阿里云DashScope SDK均不可用，请安装依赖")
+                raise ImportError("requests和阿里云DashScope SDK均不可用，请安装依赖")
     
-    def generate_content(self, prompt, max_tokens=1000, temperature=0.7, top_p=0.8):
+    def generate_content(self, prompt, max_tokens=1000, temperature=0.7, top_p=0.8, use_cache=True):
         """
         生成内容
         
@@ -58,35 +116,87 @@ class ContentCreator:
             max_tokens: 最大生成token数
             temperature: 温度参数
             top_p: top-p参数
+            use_cache: 是否使用生成结果缓存，False表示重新生成（需要新的变体时）
             
         Returns:
             生成的内容
         """
         logger.info(f"生成内容，提示词: {prompt[:50]}...")
         
+        cache_key = None
+        if use_cache and self.cache is not None:
+            cache_key = ResponseCache.make_key(self.model, prompt, max_tokens, temperature, top_p)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
         try:
-            # 使用DashScope SDK生成内容
-            response = Generation.call(
-                model=self.model,
-                prompt=prompt,
+            # 通过共享的生成客户端调用（复用连接，限制并发）
+            result = self.client.call(
+                self.model,
+                prompt,
                 max_tokens=max_tokens,
                 temperature=temperature,
                 top_p=top_p
             )
+            logger.info(f"生成成功，结果: {result[:50]}...")
             
-            # 检查响应
-            if response.status_code == 200:
-                result = response.output.text
-                logger.info(f"生成成功，结果: {result[:50]}...")
-                return result
-            else:
-                logger.error(f"生成失败: {response.code}, {response.message}")
-                raise Exception(f"生成失败: {response.message}")
+            # 无论是否读取缓存，都写入最新结果，供之后的重试复用
+            if self.cache is not None:
+                self._save_to_cache(cache_key or ResponseCache.make_key(self.model, prompt, max_tokens, temperature, top_p), result)
+            return result
                 
         except Exception as e:
             logger.error(f"生成内容出错: {str(e)}")
             raise
     
+    def stream_content(self, prompt, max_tokens=1000, temperature=0.7, top_p=0.8, use_cache=True):
+        """
+        流式生成内容，命中缓存时一次性返回缓存的完整结果
+        
+        Args:
+            prompt: 提示词
+            max_tokens: 最大生成token数
+            temperature: 温度参数
+            top_p: top-p参数
+            use_cache: 是否使用生成结果缓存，False表示重新生成
+            
+        Yields:
+            新增的文本片段
+        """
+        logger.info(f"流式生成内容，提示词: {prompt[:50]}...")
+        
+        cache_key = None
+        if self.cache is not None:
+            cache_key = ResponseCache.make_key(self.model, prompt, max_tokens, temperature, top_p)
+            if use_cache:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    yield cached
+                    return
+        
+        parts = []
+        for delta in self.client.stream(
+            self.model,
+            prompt,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            top_p=top_p
+        ):
+            parts.append(delta)
+            yield delta
+        
+        # 完整生成结束后才写入缓存（中途断开的结果不缓存）
+        if cache_key is not None:
+            self._save_to_cache(cache_key, "".join(parts))
+    
+    def _save_to_cache(self, cache_key, result):
+        """写入生成结果缓存，失败时只记录日志"""
+        try:
+            self.cache.put(cache_key, result)
+        except Exception as e:
+            logger.warning(f"写入生成缓存失败: {str(e)}")
+    
     def process_segment(self, segment, output_format="markdown"):
         """
         处理单个文本段落
@@ -138,24 +248,92 @@ class ContentCreator:
         
         return prompt
     
-    def process_segments(self, segments, output_file=None):
+    def process_segments(self, segments, output_file=None, max_workers=None, max_retries=None, rate_limit=None):
         """
-        处理多个文本段落
+        并发处理多个文本段落，结果顺序与输入一致
         
         Args:
-            segments: 文本段落列表
+            segments: 文本段落列表，也可以是逐个产生段落的迭代器（如StreamingSegmenter.iter_segments()），
+                此时每产生一个段落立即开始处理
             output_file: 输出文件路径，None表示不保存
+            max_workers: 同时处理的段落数，None表示使用SEGMENT_WORKERS配置（不超过生成客户端的并发上限）
+            max_retries: 单个段落失败后的重试轮数，None表示使用SEGMENT_MAX_RETRIES配置
+            rate_limit: 本批次每秒最多发起的请求数，None表示使用SEGMENT_RATE_LIMIT配置，<=0表示不额外限流
             
         Returns:
-            (处理结果, 输出文件路径)
+            (处理结果, 输出文件路径)，重试后仍失败的段落result为None并带有error字段
         """
-        logger.info(f"处理{len(segments)}个文本段落")
+        streaming = not isinstance(segments, (list, tuple))
+        max_workers = max_workers or SEGMENT_WORKERS
+        if not streaming:
+            max_workers = min(max_workers, len(segments) or 1)
+        max_workers = max(1, min(max_workers, getattr(self.client, "max_concurrency", max_workers)))
+        max_retries = SEGMENT_MAX_RETRIES if max_retries is None else max_retries
+        rate_limit = SEGMENT_RATE_LIMIT if rate_limit is None else rate_limit
+        limiter = TokenBucket(rate_limit) if rate_limit > 0 else None
+        
+        if streaming:
+            logger.info(f"流式处理文本段落，并发数: {max_workers}")
+        else:
+            logger.info(f"处理{len(segments)}个文本段落，并发数: {max_workers}")
+        start_time = time.time()
+        
+        # 迭代器产生的段落依次追加到items中
+        items = [] if streaming else segments
+        
+        def process(i):
+            if limiter is not None:
+                limiter.acquire()
+            logger.info(f"处理段落[{i+1}/{len(items)}]")
+            return self.process_segment(items[i])
+        
+        errors = {}
+        futures = {}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="segment-gen") as executor:
+            if streaming:
+                # 段落产生后立即提交，与上游的转写和分段同时进行
+                for segment in segments:
+                    items.append(segment)
+                    futures[executor.submit(process, len(items) - 1)] = len(items) - 1
+                segments = items
+            results = [None] * len(segments)
+            pending = list(range(len(segments)))
+            
+            for attempt in range(max_retries + 1):
+                if attempt:
+                    # 失败的段落在下一轮重试，退避时间逐轮加倍
+                    delay = min(2 ** attempt, 30)
+                    logger.info(f"{len(pending)}个段落处理失败，{delay}秒后进行第{attempt}次重试")
+                    time.sleep(delay)
+                
+                # 流式处理时第一轮的段落已经提交
+                if not futures:
+                    futures = {executor.submit(process, i): i for i in pending}
+                pending = []
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        results[i] = future.result()
+                        errors.pop(i, None)
+                    except Exception as e:
+                        logger.error(f"处理段落[{i+1}/{len(segments)}]出错: {str(e)}")
+                        errors[i] = str(e)
+                        pending.append(i)
+                futures = {}
+                
+                if not pending:
+                    break
         
-        results = []
-        for i, segment in enumerate(segments):
-            logger.info(f"处理段落[{i+1}/{len(segments)}]")
-            result = self.process_segment(segment)
-            results.append(result)
+        # 重试后仍失败的段落保留位置，记录错误
+        for i in sorted(pending):
+            results[i] = {
+                "segment": segments[i],
+                "prompt": self._build_prompt(segments[i], "markdown"),
+                "result": None,
+                "error": errors[i]
+            }
+        
+        logger.info(f"段落处理完成: 成功 {len(segments) - len(pending)}/{len(segments)}，耗时 {time.time() - start_time:.1f}秒")
         
         # 如果指定了输出文件，保存结果
         if output_file:
@@ -211,7 +389,27 @@ class ContentCreator:
         # 处理段落
         return self.process_segments(segments, output_file)
     
-    def generate_multiple_scripts(self, text, tags=None, num_scripts=5, custom_prompt=None):
+    def condense_text(self, text, summary_cache_file=None):
+        """
+        超长文本先进行map-reduce摘要，摘要失败时退回使用原文
+        
+        Args:
+            text: 原始文本
+            summary_cache_file: 中间摘要缓存文件，None表示不缓存
+            
+        Returns:
+            用于生成脚本的文本
+        """
+        if not self.summarizer.needs_summary(text):
+            return text
+        try:
+            return self.summarizer.summarize(text, summary_cache_file)
+        except Exception as e:
+            logger.error(f"长文本摘要失败，使用原文生成: {str(e)}")
+            return text
+    
+    def generate_multiple_scripts(self, text, tags=None, num_scripts=5, custom_prompt=None, mode=None, use_cache=True,
+                                  summary_cache_file=None):
         """
         生成多个脚本
         
@@ -220,18 +418,31 @@ class ContentCreator:
             tags: 标签列表，默认为None
             num_scripts: 要生成的脚本数量，默认为5
             custom_prompt: 自定义提示词，默认为None
+            mode: fanout 每个脚本单独并发请求；single 一次请求生成全部脚本；None表示使用SCRIPT_GENERATION_MODE配置
+            use_cache: 是否使用生成结果缓存，False表示重新生成新的脚本
+            summary_cache_file: 长文本中间摘要的缓存文件，None表示不缓存
             
         Returns:
             生成的脚本列表
+            
+        Raises:
+            GenerationError: 并发模式下客户端重试后仍有脚本生成失败
         """
         logger.info(f"生成{num_scripts}个脚本，基于文本: {text[:50]}...")
         
+        # 超长文本先摘要，避免超出模型上下文
+        text = self.condense_text(text, summary_cache_file)
+        
         scripts = []
         
         # 处理标签
         if tags is None:
             tags = []
         
+        # 并发模式：每个脚本一个较小的请求，总耗时接近生成单个脚本
+        if (mode or SCRIPT_GENERATION_MODE) == "fanout" and num_scripts > 1:
+            return self._generate_scripts_fanout(text, tags, num_scripts, custom_prompt, use_cache)
+        
         # 使用自定义提示词或默认提示词
         if custom_prompt:
             # 直接使用自定义提示词
@@ -259,7 +470,7 @@ class ContentCreator:
         
         try:
             # 生成内容
-            result = self.generate_content(prompt, max_tokens=3000, temperature=0.8)
+            result = self.generate_content(prompt, max_tokens=3000, temperature=0.8, use_cache=use_cache)
             
             # 解析结果
             if result:
@@ -284,6 +495,155 @@ class ContentCreator:
             
         return scripts
     
+    def _build_style_prompt(self, text, tags, style, custom_prompt=None):
+        """构建生成单个指定风格脚本的提示词"""
+        name, description = style
+        
+        if custom_prompt:
+            return f"""{custom_prompt}
+
+本次只需生成1个脚本，采用「{name}」风格（{description}）。请直接输出脚本内容，不要使用"---"分隔，不要包含解释：
+"""
+        
+        return f"""
+你是一位专业的直播内容创作者，请根据以下文本内容和标签，生成1个「{name}」风格的直播脚本。
+
+原始文本：
+{text}
+
+标签：{', '.join(tags) if tags else '无'}
+
+要求：
+1. 风格：{description}
+2. 保持原始文本的核心信息和主要观点
+3. 使用更加生动、吸引人的表达方式
+4. 增加一些互动元素或号召性用语
+5. 使用口语化的语言，增加亲和力
+
+请直接输出脚本内容，不要包含解释和标题：
+"""
+    
+    def _generate_scripts_fanout(self, text, tags, num_scripts, custom_prompt=None, use_cache=True):
+        """
+        为每个脚本单独发起一个指定风格的请求，并发执行（受生成客户端的并发上限和限流器约束）
+        
+        Returns:
+            按风格顺序排列的脚本列表
+
+        Raises:
+            GenerationError: 客户端重试后仍有脚本生成失败
+        """
+        styles = [SCRIPT_STYLES[i % len(SCRIPT_STYLES)] for i in range(num_scripts)]
+        prompts = [self._build_style_prompt(text, tags, style, custom_prompt) for style in styles]
+        results = [None] * num_scripts
+        errors = []
+        start_time = time.time()
+        stats_before = self._client_stats()
+        
+        max_workers = min(num_scripts, getattr(self.client, "max_concurrency", num_scripts))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="script-gen") as executor:
+            # 脚本数超过风格数时风格循环使用，重复的风格提示词相同，不使用缓存以得到不同的脚本
+            futures = {
+                executor.submit(self.generate_content, prompt, SCRIPT_MAX_TOKENS, 0.8,
+                                use_cache=use_cache and i < len(SCRIPT_STYLES)): i
+                for i, prompt in enumerate(prompts)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result().strip()
+                except Exception as e:
+                    logger.error(f"生成第{i+1}个脚本（{styles[i][0]}）出错: {str(e)}")
+                    errors.append((i, str(e)))
+        
+        scripts = [script for script in results if script]
+        logger.info(f"成功生成 {len(scripts)}/{num_scripts} 个脚本，耗时 {time.time() - start_time:.1f}秒")
+        
+        if len(scripts) < num_scripts:
+            # 统计的是客户端全局计数在本次生成期间的增量，并发任务的重试也会计入
+            stats_after = self._client_stats()
+            retries = stats_after.get("total_retries", 0) - stats_before.get("total_retries", 0)
+            throttles = stats_after.get("total_throttles", 0) - stats_before.get("total_throttles", 0)
+            detail = "; ".join(f"第{i+1}个脚本: {message}" for i, message in sorted(errors)) or "生成结果为空"
+            raise GenerationError(
+                f"仅成功生成 {len(scripts)}/{num_scripts} 个脚本（期间重试 {retries} 次，其中限流 {throttles} 次）: {detail}"
+            )
+        return scripts
+    
+    def _client_stats(self):
+        """生成客户端的统计信息，客户端不提供统计时返回空字典"""
+        stats = getattr(self.client, "stats", None)
+        return stats() if callable(stats) else {}
+    
+    def stream_multiple_scripts(self, text, tags=None, num_scripts=5, custom_prompt=None, use_cache=True,
+                                summary_cache_file=None):
+        """
+        并发流式生成多个指定风格的脚本，按到达顺序返回事件
+        
+        Args:
+            text: 原始文本
+            tags: 标签列表，默认为None
+            num_scripts: 要生成的脚本数量，默认为5
+            custom_prompt: 自定义提示词，默认为None
+            use_cache: 是否使用生成结果缓存，False表示重新生成新的脚本
+            summary_cache_file: 长文本中间摘要的缓存文件，None表示不缓存
+            
+        Yields:
+            事件字典，event字段为:
+            start（开始生成，含style）、token（新增文本text）、
+            script（单个脚本完成，含完整script）、error（单个脚本失败，含message）
+        """
+        tags = tags or []
+        text = self.condense_text(text, summary_cache_file)
+        styles = [SCRIPT_STYLES[i % len(SCRIPT_STYLES)] for i in range(num_scripts)]
+        events = queue.Queue()
+        cancelled = threading.Event()
+        
+        def generate(index):
+            style = styles[index][0]
+            prompt = self._build_style_prompt(text, tags, styles[index], custom_prompt)
+            parts = []
+            try:
+                if cancelled.is_set():
+                    return
+                events.put({"event": "start", "index": index, "style": style})
+                # 重复的风格提示词相同，不使用缓存以得到不同的脚本
+                stream = self.stream_content(prompt, SCRIPT_MAX_TOKENS, 0.8,
+                                             use_cache=use_cache and index < len(SCRIPT_STYLES))
+                try:
+                    for delta in stream:
+                        if cancelled.is_set():
+                            return
+                        parts.append(delta)
+                        events.put({"event": "token", "index": index, "text": delta})
+                finally:
+                    stream.close()
+                events.put({"event": "script", "index": index, "style": style, "script": "".join(parts).strip()})
+            except Exception as e:
+                logger.error(f"流式生成第{index+1}个脚本（{style}）出错: {str(e)}")
+                events.put({"event": "error", "index": index, "style": style, "message": str(e)})
+            finally:
+                # 每个脚本结束时放入一个None，用于统计剩余数量
+                events.put(None)
+        
+        max_workers = max(1, min(num_scripts, getattr(self.client, "max_concurrency", num_scripts)))
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="script-stream")
+        try:
+            for index in range(num_scripts):
+                executor.submit(generate, index)
+            
+            remaining = num_scripts
+            while remaining:
+                event = events.get()
+                if event is None:
+                    remaining -= 1
+                    continue
+                yield event
+        finally:
+            # 调用方提前停止读取时（如客户端断开），通知未完成的脚本停止生成
+            cancelled.set()
+            executor.shutdown(wait=False)
+    
     def process_multiple_scripts(self, input_text, num_scripts=5, output_file=None):
         """
         处理文本并生成多个脚本
@@ -325,13 +685,14 @@ class ContentCreator:
         
         return scripts, output_file
     
-    def generate_script(self, text, output_format="markdown"):
+    def generate_script(self, text, output_format="markdown", use_cache=True):
         """
         生成单份话术
         
         Args:
             text: 原始文本
             output_format: 输出格式，默认为markdown
+            use_cache: 是否使用生成结果缓存，需要同一文本的多份不同话术时应为False
             
         Returns:
             生成的话术
@@ -356,6 +717,6 @@ class ContentCreator:
 """
         
         # 生成内容
-        result = self.generate_content(prompt)
+        result = self.generate_content(prompt, use_cache=use_cache)
         
         return result
@@ -0,0 +1,362 @@
+"""
+文本生成客户端模块 - 复用HTTP连接池调用DashScope文本生成接口，并限制同时进行的请求数
+"""
+import json
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+
+# 配置日志
+logger = logging.getLogger('generation_client')
+
+# 尝试导入requests（使用连接池直接调用HTTP接口）
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    USE_REQUESTS = True
+except ImportError:
+    USE_REQUESTS = False
+
+# 没有requests时退回DashScope SDK（每次调用新建连接）
+try:
+    import dashscope
+    from dashscope import Generation
+    USE_DASHSCOPE = True
+except ImportError:
+    USE_DASHSCOPE = False
+
+from utils.config import (
+    ALIYUN_DASHSCOPE_API_KEY,
+    DASHSCOPE_BASE_URL,
+    GENERATION_MAX_CONCURRENCY,
+    GENERATION_POOL_SIZE,
+    GENERATION_TIMEOUT,
+    GENERATION_RATE_LIMIT,
+    GENERATION_RATE_BURST,
+    GENERATION_RATE_MIN,
+    GENERATION_MAX_RETRIES,
+    GENERATION_BACKOFF_BASE,
+    GENERATION_BACKOFF_MAX
+)
+from ai_generation.rate_limiter import AdaptiveRateLimiter
+
+# 表示服务端限流的错误码
+THROTTLE_CODES = ("Throttling", "RateQuota", "TooManyRequests")
+
+
+class GenerationError(Exception):
+    """文本生成接口返回错误"""
+
+    def __init__(self, message, status_code=None, code=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+
+    @property
+    def throttled(self):
+        """是否为服务端限流"""
+        return self.status_code == 429 or any(c in (self.code or "") for c in THROTTLE_CODES)
+
+    @property
+    def retryable(self):
+        """是否可以重试（限流或服务端错误）"""
+        return self.throttled or (self.status_code or 0) >= 500
+
+
+class GenerationClient:
+    """长期复用的文本生成客户端，线程安全"""
+
+    def __init__(self, api_key, base_url=DASHSCOPE_BASE_URL, max_concurrency=8, pool_size=16, timeout=120,
+                 rate_limiter=None, max_retries=4, backoff_base=1.0, backoff_max=30.0):
+        """
+        初始化生成客户端
+
+        Args:
+            api_key: DashScope API密钥
+            base_url: DashScope接口地址
+            max_concurrency: 同时进行的最大请求数
+            pool_size: 连接池大小
+            timeout: 单次请求超时时间（秒）
+            rate_limiter: 限流器（需提供acquire方法，可选on_throttle/on_success用于自适应调整），None表示不限流
+            max_retries: 限流、服务端错误或网络错误时的最大重试次数
+            backoff_base: 重试退避的初始时间（秒）
+            backoff_max: 重试退避的最长时间（秒）
+        """
+        self.api_key = api_key
+        self.url = f"{base_url.rstrip('/')}/services/aigc/text-generation/generation"
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.pool_size = max(pool_size, max_concurrency)
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._session = None
+        self._session_lock = threading.Lock()
+
+        # 统计信息
+        self._stats_lock = threading.Lock()
+        self.active = 0
+        self.total_requests = 0
+        self.total_errors = 0
+        self.total_throttles = 0
+        self.total_retries = 0
+        self.total_seconds = 0.0
+
+    def _get_session(self):
+        """创建带连接池的HTTP会话（首次调用时创建，之后复用keep-alive连接）"""
+        with self._session_lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                })
+                self._session = session
+            return self._session
+
+    def call(self, model, prompt, **parameters):
+        """
+        调用文本生成接口，限流、服务端错误和网络错误时按指数退避（随机抖动）重试
+
+        Args:
+            model: 模型名称
+            prompt: 提示词
+            parameters: 生成参数，如max_tokens、temperature、top_p
+
+        Returns:
+            生成的文本
+        """
+        if not self.api_key:
+            raise ValueError("API密钥未正确配置，请检查.env文件")
+
+        for attempt in range(self.max_retries + 1):
+            self._acquire()
+            try:
+                with self._track():
+                    if USE_REQUESTS:
+                        result = self._call_http(model, prompt, parameters)
+                    elif USE_DASHSCOPE:
+                        result = self._call_sdk(model, prompt, parameters)
+                    else:
+                        raise ImportError("requests和DashScope SDK均不可用，无法调用生成接口")
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                self._backoff(e, attempt)
+                continue
+            self._on_success()
+            return result
+
+    def stream(self, model, prompt, **parameters):
+        """
+        流式调用文本生成接口，逐段返回新增的文本（尚未返回任何文本时出错会按退避策略重试）
+
+        Args:
+            model: 模型名称
+            prompt: 提示词
+            parameters: 生成参数，如max_tokens、temperature、top_p
+
+        Yields:
+            新增的文本片段
+        """
+        if not self.api_key:
+            raise ValueError("API密钥未正确配置，请检查.env文件")
+
+        for attempt in range(self.max_retries + 1):
+            self._acquire()
+            started = False
+            try:
+                with self._track():
+                    if USE_REQUESTS:
+                        chunks = self._stream_http(model, prompt, parameters)
+                    elif USE_DASHSCOPE:
+                        chunks = self._stream_sdk(model, prompt, parameters)
+                    else:
+                        raise ImportError("requests和DashScope SDK均不可用，无法调用生成接口")
+                    for chunk in chunks:
+                        started = True
+                        yield chunk
+            except Exception as e:
+                # 已经返回过文本时不能重试，否则调用方会收到重复内容
+                if started or not self._should_retry(e, attempt):
+                    raise
+                self._backoff(e, attempt)
+                continue
+            self._on_success()
+            return
+
+    def _acquire(self):
+        """从限流器获取令牌"""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+    @contextmanager
+    def _track(self):
+        """限制同时进行的请求数，并记录请求统计"""
+        with self._semaphore:
+            with self._stats_lock:
+                self.active += 1
+            start_time = time.monotonic()
+            try:
+                yield
+            except Exception:
+                with self._stats_lock:
+                    self.total_errors += 1
+                raise
+            finally:
+                with self._stats_lock:
+                    self.active -= 1
+                    self.total_requests += 1
+                    self.total_seconds += time.monotonic() - start_time
+
+    def _should_retry(self, error, attempt):
+        """判断请求失败后是否重试"""
+        if attempt >= self.max_retries:
+            return False
+        if isinstance(error, GenerationError):
+            return error.retryable
+        return USE_REQUESTS and isinstance(error, requests.exceptions.RequestException)
+
+    def _backoff(self, error, attempt):
+        """记录限流/重试次数，通知限流器降速，然后按指数退避（完全随机抖动）等待"""
+        throttled = isinstance(error, GenerationError) and error.throttled
+        with self._stats_lock:
+            self.total_retries += 1
+            if throttled:
+                self.total_throttles += 1
+        if throttled and hasattr(self.rate_limiter, "on_throttle"):
+            self.rate_limiter.on_throttle()
+
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        logger.warning(f"生成请求失败，{delay:.1f}秒后第{attempt + 1}次重试: {str(error)}")
+        time.sleep(delay)
+
+    def _on_success(self):
+        if hasattr(self.rate_limiter, "on_success"):
+            self.rate_limiter.on_success()
+
+    def _call_http(self, model, prompt, parameters):
+        """通过连接池调用HTTP接口"""
+        body = {
+            "model": model,
+            "input": {"prompt": prompt},
+            "parameters": {**parameters, "result_format": "text"}
+        }
+        response = self._get_session().post(
+            self.url,
+            data=json.dumps(body, ensure_ascii=False).encode("utf-8"),
+            timeout=self.timeout
+        )
+        try:
+            data = response.json()
+        except ValueError:
+            data = {}
+
+        if response.status_code != 200:
+            message = data.get("message") or response.text[:200]
+            raise GenerationError(f"生成失败: {message}", response.status_code, data.get("code"))
+        return data.get("output", {}).get("text", "")
+
+    def _call_sdk(self, model, prompt, parameters):
+        """通过DashScope SDK调用"""
+        response = Generation.call(model=model, prompt=prompt, api_key=self.api_key, **parameters)
+        if response.status_code != 200:
+            raise GenerationError(f"生成失败: {response.message}", response.status_code, response.code)
+        return response.output.text
+
+    def _stream_http(self, model, prompt, parameters):
+        """通过连接池调用HTTP接口的SSE流式输出"""
+        body = {
+            "model": model,
+            "input": {"prompt": prompt},
+            "parameters": {**parameters, "result_format": "text", "incremental_output": True}
+        }
+        response = self._get_session().post(
+            self.url,
+            data=json.dumps(body, ensure_ascii=False).encode("utf-8"),
+            headers={"Accept": "text/event-stream", "X-DashScope-SSE": "enable"},
+            stream=True,
+            timeout=self.timeout
+        )
+        with response:
+            if response.status_code != 200:
+                try:
+                    data = response.json()
+                except ValueError:
+                    data = {}
+                message = data.get("message") or response.text[:200]
+                raise GenerationError(f"生成失败: {message}", response.status_code, data.get("code"))
+
+            for line in response.iter_lines():
+                # 按UTF-8解码，event-stream响应通常不声明字符集
+                line = line.decode("utf-8", errors="replace")
+                if not line.startswith("data:"):
+                    continue
+                data = json.loads(line[5:])
+                if data.get("code") and not data.get("output"):
+                    raise GenerationError(f"生成失败: {data.get('message')}", None, data.get("code"))
+                text = (data.get("output") or {}).get("text")
+                if text:
+                    yield text
+
+    def _stream_sdk(self, model, prompt, parameters):
+        """通过DashScope SDK流式调用"""
+        responses = Generation.call(
+            model=model,
+            prompt=prompt,
+            api_key=self.api_key,
+            stream=True,
+            incremental_output=True,
+            **parameters
+        )
+        for response in responses:
+            if response.status_code != 200:
+                raise GenerationError(f"生成失败: {response.message}", response.status_code, response.code)
+            if response.output and response.output.text:
+                yield response.output.text
+
+    def stats(self):
+        """
+        获取客户端统计信息
+
+        Returns:
+            统计信息字典
+        """
+        with self._stats_lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "active": self.active,
+                "total_requests": self.total_requests,
+                "total_errors": self.total_errors,
+                "total_throttles": self.total_throttles,
+                "total_retries": self.total_retries,
+                "avg_seconds": round(self.total_seconds / self.total_requests, 3) if self.total_requests else 0,
+                "rate_limiter": self.rate_limiter.stats() if hasattr(self.rate_limiter, "stats") else None
+            }
+
+    def close(self):
+        """关闭连接池"""
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+# 文本生成客户端（进程内共享）
+generation_client = GenerationClient(
+    ALIYUN_DASHSCOPE_API_KEY,
+    max_concurrency=GENERATION_MAX_CONCURRENCY,
+    pool_size=GENERATION_POOL_SIZE,
+    timeout=GENERATION_TIMEOUT,
+    rate_limiter=AdaptiveRateLimiter(GENERATION_RATE_LIMIT, GENERATION_RATE_BURST, min_rate=GENERATION_RATE_MIN),
+    max_retries=GENERATION_MAX_RETRIES,
+    backoff_base=GENERATION_BACKOFF_BASE,
+    backoff_max=GENERATION_BACKOFF_MAX
+)
@@ -0,0 +1,115 @@
+"""
+限流模块 - 令牌桶限流器，控制对生成接口的请求速率
+"""
+import time
+import logging
+import threading
+
+# 配置日志
+logger = logging.getLogger('rate_limiter')
+
+
+class TokenBucket:
+    """线程安全的令牌桶，按固定速率补充令牌，允许一定的突发请求"""
+
+    def __init__(self, rate, capacity=None):
+        """
+        初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数，<=0 表示不限流
+            capacity: 桶容量（允许的突发请求数），None表示与rate相同（至少为1）
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        获取令牌，令牌不足时等待
+
+        Args:
+            tokens: 需要的令牌数
+            timeout: 最长等待时间（秒），None表示一直等待
+
+        Returns:
+            是否获取成功
+        """
+        if self.rate <= 0:
+            return True
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    """根据服务端限流反馈自动调整速率的令牌桶：被限流时速率减半，请求成功后逐步恢复"""
+
+    def __init__(self, rate, capacity=None, min_rate=0.2, recover_step=0.1):
+        """
+        初始化自适应限流器
+
+        Args:
+            rate: 最大速率（每秒请求数），<=0 表示不限流（此时不做自适应调整）
+            capacity: 桶容量（允许的突发请求数）
+            min_rate: 被限流后速率的下限
+            recover_step: 每次请求成功后速率的增加量
+        """
+        super().__init__(rate, capacity)
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate) if rate > 0 else 0
+        self.recover_step = recover_step
+        self.throttles = 0
+
+    def on_throttle(self):
+        """服务端返回限流时调用：速率减半并清空令牌，使所有等待的请求一起放缓"""
+        with self._lock:
+            self.throttles += 1
+            if self.max_rate <= 0:
+                return
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = 0
+        logger.warning(f"请求被限流，速率降至 {self.rate:.2f} 次/秒")
+
+    def on_success(self):
+        """请求成功时调用：速率逐步恢复到最大值"""
+        if self.max_rate <= 0 or self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.recover_step)
+
+    def stats(self):
+        """
+        获取限流器统计信息
+
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            return {
+                "rate": round(self.rate, 3),
+                "max_rate": self.max_rate,
+                "throttles": self.throttles
+            }
@@ -0,0 +1,68 @@
+"""
+生成结果缓存模块 - 以模型、提示词哈希和生成参数为键，在磁盘上缓存文本生成结果（过期时间 + LRU淘汰）
+"""
+import json
+import hashlib
+
+from utils.disk_cache import DiskCache
+
+
+class ResponseCache(DiskCache):
+    """文本生成结果磁盘缓存，条目超过有效期后失效，总大小超过上限时按最近访问时间淘汰"""
+
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024, ttl=7 * 24 * 3600):
+        """
+        初始化生成结果缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 缓存总大小上限（字节）
+            ttl: 条目有效期（秒），<=0 表示永不过期
+        """
+        super().__init__(cache_dir, max_bytes, ttl=ttl, label="生成缓存")
+
+    @staticmethod
+    def make_key(model, prompt, max_tokens, temperature, top_p):
+        """
+        根据模型、提示词和生成参数生成缓存键
+
+        Args:
+            model: 模型名称
+            prompt: 提示词
+            max_tokens: 最大生成token数
+            temperature: 温度参数
+            top_p: top-p参数
+
+        Returns:
+            缓存键
+        """
+        raw = json.dumps({
+            "model": model,
+            "prompt": hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "top_p": top_p
+        }, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        读取缓存
+
+        Returns:
+            缓存的生成结果，未命中或已过期返回None
+        """
+        entry = super().get(key)
+        return entry.get("text") if entry else None
+
+    def put(self, key, text):
+        """
+        写入缓存（原子替换），必要时淘汰条目
+
+        Args:
+            key: 缓存键
+            text: 生成结果
+        """
+        if not text:
+            return
+        super().put(key, {"text": text})
@@ -0,0 +1,133 @@
+"""
+长文本摘要模块 - 对超长转写文本分段并发摘要（map），合并后得到浓缩文本（reduce），中间结果缓存到磁盘
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from text_processing.segmenter import TextSegmenter
+from utils.atomic_write import atomic_write_json
+
+# 配置日志
+logger = logging.getLogger('summarizer')
+
+# 任务目录下的中间摘要缓存文件名
+SUMMARY_CACHE_FILENAME = "summaries.json"
+
+
+class TranscriptSummarizer:
+    """长转写文本的map-reduce摘要"""
+
+    def __init__(self, creator, threshold_chars=8000, chunk_chars=3000, max_tokens=400, max_rounds=3):
+        """
+        初始化摘要器
+
+        Args:
+            creator: 内容创作器（使用其generate_content生成摘要）
+            threshold_chars: 文本超过该长度才进行摘要，<=0 表示不摘要
+            chunk_chars: 每个摘要分段的最大长度
+            max_tokens: 单个分段摘要的最大token数
+            max_rounds: 合并后仍超过阈值时最多再摘要的轮数
+        """
+        self.creator = creator
+        self.threshold_chars = threshold_chars
+        self.chunk_chars = chunk_chars
+        self.max_tokens = max_tokens
+        self.max_rounds = max_rounds
+        self.segmenter = TextSegmenter(min_segment_length=1, max_segment_length=chunk_chars)
+
+    def needs_summary(self, text):
+        """文本是否超过摘要阈值"""
+        return self.threshold_chars > 0 and len(text) > self.threshold_chars
+
+    def summarize(self, text, cache_file=None):
+        """
+        将超长文本浓缩到阈值以内，未超过阈值时原样返回
+
+        Args:
+            text: 原始文本
+            cache_file: 中间摘要缓存文件（通常位于任务目录下），None表示不缓存
+
+        Returns:
+            浓缩后的文本
+        """
+        if not self.needs_summary(text):
+            return text
+
+        cache = self._load_cache(cache_file)
+        start_time = time.time()
+        original_length = len(text)
+
+        for round_index in range(self.max_rounds):
+            chunks = self.segmenter.segment_by_meaning(text)
+            logger.info(f"第{round_index + 1}轮摘要: {len(text)} 字符，{len(chunks)} 个分段")
+            try:
+                summaries = self._summarize_chunks(chunks, cache)
+            finally:
+                # 失败时也保存已完成的分段摘要，重试时不必重新生成
+                self._save_cache(cache_file, cache)
+
+            text = "\n".join(summary for summary in summaries if summary)
+            if not self.needs_summary(text):
+                break
+
+        logger.info(f"摘要完成: {original_length} -> {len(text)} 字符，耗时 {time.time() - start_time:.1f}秒")
+        return text
+
+    def _summarize_chunks(self, chunks, cache):
+        """并发摘要各分段（map），已缓存的分段直接复用"""
+        keys = [hashlib.sha256(chunk.encode("utf-8")).hexdigest() for chunk in chunks]
+        summaries = [cache.get(key) for key in keys]
+        missing = [i for i, summary in enumerate(summaries) if summary is None]
+        if not missing:
+            return summaries
+
+        max_workers = max(1, min(len(missing), getattr(self.creator.client, "max_concurrency", len(missing))))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="summarize") as executor:
+            results = executor.map(self._summarize_chunk, [chunks[i] for i in missing])
+            for i, summary in zip(missing, results):
+                summaries[i] = summary
+                cache[keys[i]] = summary
+        return summaries
+
+    def _summarize_chunk(self, chunk):
+        """摘要单个分段"""
+        prompt = f"""
+请对以下直播转写片段进行摘要，供后续撰写直播脚本使用。
+
+片段内容：
+{chunk}
+
+要求：
+1. 保留商品名称、卖点、价格、优惠活动和关键数据
+2. 保留有代表性的话术和互动方式
+3. 去掉重复、寒暄和无关内容
+4. 摘要长度不超过原文的三分之一
+
+请直接输出摘要，不要包含解释：
+"""
+        return self.creator.generate_content(prompt, max_tokens=self.max_tokens, temperature=0.3).strip()
+
+    def _load_cache(self, cache_file):
+        """读取中间摘要缓存（分段内容哈希 -> 摘要）"""
+        if not cache_file or not os.path.exists(cache_file):
+            return {}
+        try:
+            with open(cache_file, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except Exception as e:
+            logger.warning(f"读取摘要缓存失败，忽略: {str(e)}")
+            return {}
+        return cached.get("summaries", {})
+
+    def _save_cache(self, cache_file, cache):
+        """原子写入中间摘要缓存"""
+        if not cache_file:
+            return
+        try:
+            atomic_write_json(cache_file, {"summaries": cache})
+        except Exception as e:
+            logger.warning(f"写入摘要缓存失败: {str(e)}")
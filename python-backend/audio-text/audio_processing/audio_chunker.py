@@ -0,0 +1,185 @@
+"""
+音频分块模块 - 在静音处切分长音频，用于多会话并行转写
+"""
+import struct
+import logging
+
+import numpy as np
+
+# 配置日志
+logger = logging.getLogger('audio_chunker')
+
+# 计算能量时每帧的时长（毫秒）
+FRAME_MS = 100
+# 计算能量时每次读取的时长（秒），保证内存占用与音频长度无关
+READ_BLOCK_SECONDS = 60
+
+
+def find_wav_data(audio_file):
+    """
+    解析WAV文件头，找到PCM数据的位置和格式
+
+    Args:
+        audio_file: WAV文件路径
+
+    Returns:
+        字典: {offset, size, sample_rate, channels, sample_width, is_float}，不支持的格式返回None
+    """
+    fmt = None
+    with open(audio_file, "rb") as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            return None
+
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+
+            if chunk_id == b"fmt ":
+                data = f.read(chunk_size)
+                audio_format, channels, sample_rate, _, _, bits = struct.unpack("<HHIIHH", data[:16])
+                # 0xFFFE = WAVE_FORMAT_EXTENSIBLE，实际格式在SubFormat的前两个字节
+                if audio_format == 0xFFFE and len(data) >= 26:
+                    audio_format = struct.unpack("<H", data[24:26])[0]
+                # 1 = PCM, 3 = IEEE float
+                if audio_format not in (1, 3):
+                    return None
+                fmt = {
+                    "sample_rate": sample_rate,
+                    "channels": channels,
+                    "sample_width": bits // 8,
+                    "is_float": audio_format == 3
+                }
+            elif chunk_id == b"data":
+                if fmt is None:
+                    return None
+                offset = f.tell()
+                # 录制中断的文件可能声明了错误的大小，以实际文件长度为准
+                f.seek(0, 2)
+                size = min(chunk_size, f.tell() - offset)
+                return {"offset": offset, "size": size, **fmt}
+            else:
+                f.seek(chunk_size, 1)
+
+            # RIFF块按2字节对齐
+            if chunk_size % 2:
+                f.seek(1, 1)
+
+
+def is_pcm_buffer(audio):
+    """判断audio是内存中的PCM数据还是文件路径"""
+    return isinstance(audio, (bytes, bytearray, memoryview))
+
+
+def iter_pcm_blocks(audio, info, block_bytes):
+    """
+    按块读取PCM数据
+
+    Args:
+        audio: WAV文件路径，或内存中的PCM数据
+        info: 数据位置和格式信息
+        block_bytes: 每块的字节数
+
+    Yields:
+        PCM数据块
+    """
+    start, end = info["offset"], info["offset"] + info["size"]
+    if is_pcm_buffer(audio):
+        view = memoryview(audio)
+        for offset in range(start, end, block_bytes):
+            yield view[offset:min(offset + block_bytes, end)]
+        return
+
+    with open(audio, "rb") as f:
+        f.seek(start)
+        remaining = info["size"]
+        while remaining > 0:
+            block = f.read(min(block_bytes, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+def compute_frame_energy(audio, info, frame_ms=FRAME_MS):
+    """
+    逐块读取16位单声道PCM，计算每帧的均方根能量
+
+    Args:
+        audio: WAV文件路径，或内存中的PCM数据
+        info: find_wav_data返回的格式信息
+        frame_ms: 每帧时长（毫秒）
+
+    Returns:
+        每帧能量的numpy数组
+    """
+    frame_samples = info["sample_rate"] * frame_ms // 1000
+    frame_bytes = frame_samples * info["sample_width"]
+    block_bytes = frame_bytes * (READ_BLOCK_SECONDS * 1000 // frame_ms)
+
+    energies = []
+    for block in iter_pcm_blocks(audio, info, block_bytes):
+        usable = len(block) - len(block) % frame_bytes
+        if usable == 0:
+            break
+        samples = np.frombuffer(block[:usable], dtype="<i2").astype(np.float32)
+        frames = samples.reshape(-1, frame_samples)
+        energies.append(np.sqrt(np.mean(frames * frames, axis=1)))
+
+    if not energies:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(energies)
+
+
+def split_on_silence(audio, chunk_seconds=300, search_seconds=20, frame_ms=FRAME_MS, sample_rate=16000):
+    """
+    将16kHz单声道16位音频切分为若干块，切分点选在目标位置附近能量最低的帧
+
+    Args:
+        audio: WAV文件路径，或内存中的16位单声道PCM数据
+        chunk_seconds: 目标分块时长（秒）
+        search_seconds: 在目标切分点前后搜索静音的范围（秒）
+        frame_ms: 能量计算的帧长（毫秒）
+        sample_rate: audio为PCM数据时的采样率
+
+    Returns:
+        分块列表，每项为 {offset, size, start_ms}（offset/size为文件或PCM数据中的字节位置）
+    """
+    if is_pcm_buffer(audio):
+        info = {"offset": 0, "size": len(audio), "sample_rate": sample_rate,
+                "channels": 1, "sample_width": 2, "is_float": False}
+    else:
+        info = find_wav_data(audio)
+        if info is None or info["channels"] != 1 or info["sample_width"] != 2 or info["is_float"]:
+            raise ValueError(f"只支持16位单声道PCM WAV文件: {audio}")
+
+    energy = compute_frame_energy(audio, info, frame_ms)
+    frame_bytes = info["sample_rate"] * frame_ms // 1000 * info["sample_width"]
+    frames_per_chunk = chunk_seconds * 1000 // frame_ms
+    search_frames = search_seconds * 1000 // frame_ms
+    total_frames = len(energy)
+
+    # 逐个确定切分点（帧序号）
+    boundaries = [0]
+    target = frames_per_chunk
+    while target < total_frames - search_frames:
+        lo = max(boundaries[-1] + 1, target - search_frames)
+        hi = min(total_frames, target + search_frames + 1)
+        split = lo + int(np.argmin(energy[lo:hi]))
+        boundaries.append(split)
+        target = split + frames_per_chunk
+
+    chunks = []
+    for i, start_frame in enumerate(boundaries):
+        start = start_frame * frame_bytes
+        end = boundaries[i + 1] * frame_bytes if i + 1 < len(boundaries) else info["size"]
+        chunks.append({
+            "offset": info["offset"] + start,
+            "size": end - start,
+            "start_ms": start_frame * frame_ms
+        })
+
+    logger.info(f"音频已切分为 {len(chunks)} 块: {[round(c['start_ms'] / 1000) for c in chunks]}秒")
+    return chunks
@@ -0,0 +1,211 @@
+"""
+音频重采样模块 - 在进程内将WAV转换为16kHz单声道PCM，压缩格式通过管道调用ffmpeg解码（不写临时文件）
+"""
+import math
+import logging
+import subprocess
+
+import numpy as np
+
+from audio_processing.audio_chunker import find_wav_data, iter_pcm_blocks
+
+# 配置日志
+logger = logging.getLogger('resampler')
+
+# 尝试导入soxr（可选，速度更快）
+try:
+    import soxr
+    USE_SOXR = True
+except ImportError:
+    USE_SOXR = False
+
+# 每次读取和重采样的输入时长（秒）
+READ_BLOCK_SECONDS = 10
+# 每次向量化计算的输出样本数，限制中间矩阵的内存占用
+OUTPUT_BLOCK_SAMPLES = 64 * 1024
+
+
+class PolyphaseResampler:
+    """基于NumPy的多相FIR流式重采样器（Kaiser窗sinc低通滤波）"""
+
+    def __init__(self, src_rate, dst_rate, zero_crossings=16, kaiser_beta=8.6):
+        """
+        初始化重采样器
+
+        Args:
+            src_rate: 输入采样率
+            dst_rate: 输出采样率
+            zero_crossings: 滤波器单侧的过零点数，越大越精确也越慢
+            kaiser_beta: Kaiser窗参数
+        """
+        g = math.gcd(src_rate, dst_rate)
+        self.up = dst_rate // g
+        self.down = src_rate // g
+
+        # 在上采样后的采样率下设计低通滤波器，截止频率为两者奈奎斯特频率中较低的一个
+        cutoff = 1.0 / max(self.up, self.down)
+        half = zero_crossings * max(self.up, self.down)
+        n = np.arange(-half, half + 1)
+        h = cutoff * np.sinc(cutoff * n) * np.kaiser(2 * half + 1, kaiser_beta) * self.up
+
+        # 拆分为多相滤波器组: phases[p, i] = h[p + i * up]
+        self.taps = int(math.ceil(len(h) / self.up))
+        h = np.concatenate([h, np.zeros(self.taps * self.up - len(h))])
+        self.phases = h.reshape(self.taps, self.up).T.astype(np.float32)
+        self.delay = half
+
+        # 流式状态：buf[0] 对应输入样本序号 buf_start（负序号视为0）
+        self.buf = np.zeros(self.taps - 1, dtype=np.float32)
+        self.buf_start = -(self.taps - 1)
+        self.total_in = 0
+        self.next_out = 0
+
+    def process(self, samples, last=False):
+        """
+        输入一块单声道样本，返回当前可以计算的输出样本
+
+        Args:
+            samples: float32单声道样本
+            last: 是否为最后一块，为True时输出剩余的全部样本
+
+        Returns:
+            float32输出样本
+        """
+        self.buf = np.concatenate([self.buf, np.asarray(samples, dtype=np.float32)])
+        self.total_in += len(samples)
+
+        if last:
+            end = -(-self.total_in * self.up // self.down)
+            # 补零，使最后一个输出样本所需的输入都在缓冲区中
+            need = (end * self.down + self.delay) // self.up + 1 - self.buf_start
+            if need > len(self.buf):
+                self.buf = np.concatenate([self.buf, np.zeros(need - len(self.buf), dtype=np.float32)])
+        else:
+            # 只计算所需输入已全部到达的输出样本
+            end = max(self.next_out, (self.total_in * self.up - 1 - self.delay) // self.down + 1)
+
+        outputs = []
+        offsets = np.arange(self.taps)
+        for block_start in range(self.next_out, end, OUTPUT_BLOCK_SAMPLES):
+            n = np.arange(block_start, min(block_start + OUTPUT_BLOCK_SAMPLES, end), dtype=np.int64)
+            t = n * self.down + self.delay
+            j = t // self.up
+            p = t % self.up
+            idx = j[:, None] - offsets[None, :] - self.buf_start
+            outputs.append(np.einsum("ij,ij->i", self.phases[p], self.buf[idx]))
+        self.next_out = end
+
+        # 丢弃之后不再需要的输入
+        keep_from = (self.next_out * self.down + self.delay) // self.up - (self.taps - 1)
+        drop = keep_from - self.buf_start
+        if drop > 0:
+            self.buf = self.buf[drop:]
+            self.buf_start = keep_from
+
+        if not outputs:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(outputs)
+
+
+def _decode_block(block, info):
+    """将WAV数据块解码为[-1, 1]范围的float32单声道样本（多声道取平均）"""
+    width = info["sample_width"]
+    if info["is_float"]:
+        samples = np.frombuffer(block, dtype="<f4" if width == 4 else "<f8").astype(np.float32)
+    elif width == 1:
+        samples = (np.frombuffer(block, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(block, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        raw = np.frombuffer(block, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        value = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        value = np.where(value >= 1 << 23, value - (1 << 24), value)
+        samples = value.astype(np.float32) / float(1 << 23)
+    elif width == 4:
+        samples = np.frombuffer(block, dtype="<i4").astype(np.float32) / float(1 << 31)
+    else:
+        raise ValueError(f"不支持的位深度: {width * 8}bit")
+
+    channels = info["channels"]
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def _to_pcm16(samples):
+    """float32样本转换为16位PCM字节"""
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2").tobytes()
+
+
+def resample_wav(audio_file, target_sample_rate=16000):
+    """
+    读取WAV文件，在内存中完成下混和重采样
+
+    Args:
+        audio_file: WAV文件路径
+        target_sample_rate: 目标采样率
+
+    Returns:
+        16位单声道PCM数据（bytearray，直接返回拼接缓冲区，避免长音频再复制一份），不支持的WAV格式返回None
+    """
+    info = find_wav_data(audio_file)
+    if info is None or info["sample_width"] == 0:
+        return None
+
+    frame_bytes = info["sample_width"] * info["channels"]
+    block_bytes = info["sample_rate"] * READ_BLOCK_SECONDS * frame_bytes
+    # 忽略末尾不完整的采样帧
+    info = {**info, "size": info["size"] - info["size"] % frame_bytes}
+
+    if info["sample_rate"] == target_sample_rate:
+        resample = None
+    elif USE_SOXR:
+        stream = soxr.ResampleStream(info["sample_rate"], target_sample_rate, 1, dtype="float32")
+        resample = stream.resample_chunk
+    else:
+        resample = PolyphaseResampler(info["sample_rate"], target_sample_rate).process
+
+    output = bytearray()
+    for block in iter_pcm_blocks(audio_file, info, block_bytes):
+        samples = _decode_block(block, info)
+        output += _to_pcm16(resample(samples) if resample else samples)
+    if resample:
+        output += _to_pcm16(resample(np.zeros(0, dtype=np.float32), last=True))
+
+    logger.info(f"WAV重采样完成: {info['sample_rate']}Hz/{info['channels']}声道 -> {target_sample_rate}Hz/单声道，"
+                f"{len(output)} 字节（{'soxr' if USE_SOXR else 'numpy'}）")
+    return output
+
+
+def decode_with_ffmpeg(audio_file, target_sample_rate=16000):
+    """
+    使用ffmpeg解码压缩格式音频，通过标准输出读取PCM数据，不写临时文件
+
+    Args:
+        audio_file: 音频文件路径
+        target_sample_rate: 目标采样率
+
+    Returns:
+        16位单声道PCM数据（bytes），失败时返回None
+    """
+    cmd = [
+        'ffmpeg',
+        '-nostdin',
+        '-i', audio_file,
+        '-f', 's16le',
+        '-acodec', 'pcm_s16le',
+        '-ar', str(target_sample_rate),
+        '-ac', '1',
+        'pipe:1'
+    ]
+    logger.info(f"解码音频文件: {' '.join(cmd)}")
+    try:
+        result = subprocess.run(cmd, capture_output=True)
+    except Exception as e:
+        logger.error(f"音频解码出错: {str(e)}")
+        return None
+
+    if result.returncode != 0:
+        logger.error(f"音频解码失败: {result.stderr.decode('utf-8', errors='replace')[-2000:]}")
+        return None
+    return result.stdout
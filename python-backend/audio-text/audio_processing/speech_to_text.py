@@ -3,11 +3,14 @@
 """
 import os
 import json
+import mmap
 import time
-import logging
 import wave
-import tempfile
-import subprocess
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 # 配置日志
@@ -17,7 +20,6 @@ logger = logging.getLogger('speech_to_text')
 # 尝试导入阿里云NLS SDK
 try:
     import nls
-    from nls.token import getToken
     USE_SDK = True
     logger.info("成功导入阿里云NLS SDK")
 except ImportError as e:
@@ -29,8 +31,26 @@ from utils.config import (
     ALIYUN_ACCESS_KEY_ID,
     ALIYUN_ACCESS_KEY_SECRET,
     ALIYUN_APPKEY,
-    ALIYUN_REGION
+    ALIYUN_REGION,
+    TRANSCRIPT_CACHE_ENABLED,
+    TRANSCRIPT_CACHE_DIR,
+    TRANSCRIPT_CACHE_MAX_MB,
+    PARALLEL_TRANSCRIBE_SESSIONS,
+    PARALLEL_TRANSCRIBE_MIN_SECONDS,
+    PARALLEL_CHUNK_SECONDS,
+    SILENCE_SEARCH_SECONDS,
+    TRANSCRIBE_TIMEOUT_SECONDS,
+    ASR_FRAME_BYTES,
+    ASR_SEND_SPEED
 )
+from audio_processing.transcript_cache import TranscriptCache, hash_audio_file
+from audio_processing.transcript_writer import TranscriptWriter
+from audio_processing.audio_chunker import is_pcm_buffer
+from audio_processing.resampler import resample_wav, decode_with_ffmpeg
+from audio_processing.token_manager import nls_token_manager
+
+# 转写结果缓存（进程内共享）
+transcript_cache = TranscriptCache(TRANSCRIPT_CACHE_DIR, TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024) if TRANSCRIPT_CACHE_ENABLED else None
 
 def get_audio_info(audio_file):
     """
@@ -56,49 +76,187 @@ def get_audio_info(audio_file):
 
 def convert_audio(audio_file, target_sample_rate=16000, target_channels=1):
     """
-    转换音频文件采样率和声道数
+    在内存中将音频转换为目标采样率的单声道PCM数据
+    
+    WAV文件直接在进程内下混和重采样；压缩格式（mp3、m4a等）通过管道调用ffmpeg解码，不写临时文件。
     
     Args:
         audio_file: 原始音频文件路径
         target_sample_rate: 目标采样率，默认16000Hz
-        target_channels: 目标声道数，默认1（单声道）
+        target_channels: 目标声道数，只支持1（单声道）
         
     Returns:
-        转换后的临时文件路径
+        16位单声道PCM数据（bytes或bytearray），转换失败时返回None
     """
+    if target_channels != 1:
+        raise ValueError("只支持转换为单声道")
+    
     try:
-        # 创建临时文件
-        temp_file = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-        temp_file.close()
-        
-        # 使用ffmpeg转换音频
-        cmd = [
-            'ffmpeg', 
-            '-i', audio_file, 
-            '-ar', str(target_sample_rate), 
-            '-ac', str(target_channels),
-            '-y',  # 覆盖输出文件
-            temp_file.name
-        ]
-        
-        logger.info(f"转换音频文件: {' '.join(cmd)}")
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            logger.error(f"音频转换失败: {result.stderr}")
-            return None
+        pcm_data = resample_wav(audio_file, target_sample_rate)
+        if pcm_data is not None:
+            return pcm_data
+    except Exception as e:
+        logger.warning(f"WAV重采样失败，改用ffmpeg解码: {str(e)}")
+    
+    return decode_with_ffmpeg(audio_file, target_sample_rate)
+
+class RecognitionSession:
+    """单次识别会话，保存一次识别的全部状态，识别结束时通过事件通知等待方"""
+    
+    def __init__(self, output_file=None, label="", on_sentence=None):
+        """
+        初始化识别会话
         
-        logger.info(f"音频转换成功，临时文件: {temp_file.name}")
-        return temp_file.name
+        Args:
+            output_file: 实时追加写入转写结果的文件路径，None表示不写入
+            label: 日志中用于区分会话的标识
+            on_sentence: 每识别完成一句时调用的回调，参数为句子文本，None表示不回调
+        """
+        self.output_file = output_file
+        self.label = label
+        self.on_sentence = on_sentence
+        self.all_results = []
+        self.sentences = []  # 带时间戳的句子列表 [{begin_time, end_time, text}]，单位毫秒
+        self.processed_sentences = set()  # 用于跟踪已处理的句子，避免重复
+        self.error_message = None  # 识别过程中的错误信息，出错时不写入缓存
+        self.done = threading.Event()
+        self.writer = TranscriptWriter(output_file) if output_file else None
+    
+    @property
+    def transcript(self):
+        """当前完整的转写文本"""
+        return " ".join(self.all_results)
+    
+    def add_sentence(self, text, begin_time=0, end_time=0):
+        """记录一个识别完成的句子，并追加写入输出文件"""
+        self.all_results.append(text)
+        self.sentences.append({"begin_time": begin_time, "end_time": end_time, "text": text})
+        if self.writer:
+            self.writer.add(text, begin_time, end_time)
+        if self.on_sentence:
+            self.on_sentence(text)
+    
+    def finish(self):
+        """关闭输出文件并通知等待方"""
+        if self.writer:
+            self.writer.close()
+        self.done.set()
+    
+    def wait(self, timeout=None):
+        """
+        等待识别结束
         
-    except Exception as e:
-        logger.error(f"音频转换出错: {str(e)}")
-        return None
+        Args:
+            timeout: 超时时间（秒），None表示一直等待
+            
+        Raises:
+            TimeoutError: 超时仍未收到完成、错误或关闭事件
+        """
+        if not self.done.wait(timeout):
+            raise TimeoutError(f"等待识别结果超时（{timeout}秒）{self.label}")
+    
+    def _parse(self, message, event_name):
+        """将回调消息解析为字典，无效时返回None"""
+        if isinstance(message, str):
+            try:
+                message = json.loads(message)
+            except json.JSONDecodeError:
+                logger.error(f"无法解析{event_name}事件消息: {message}")
+                return None
+        if not isinstance(message, dict):
+            logger.error(f"{event_name}事件消息不是字典: {type(message)}")
+            return None
+        return message
+    
+    def on_sentence_begin(self, message, *args, **kwargs):
+        """句子开始回调"""
+        try:
+            logger.info(f"句子开始{self.label}: {message}")
+            message = self._parse(message, "句子开始")
+            if message is None:
+                return
+                
+            # 检查payload是否存在
+            if "payload" not in message:
+                logger.error(f"句子开始事件中缺少payload数据: {message}")
+                return
+                
+            # 获取句子ID和时间
+            sentence_id = message["payload"].get("index", 0)
+            sentence_time = message["payload"].get("time", 0)
+            
+            progress_info = f"音频转写进度{self.label}: 开始转写第 {sentence_id} 句，时间点: {sentence_time}ms"
+            print(progress_info, flush=True)
+        except Exception as e:
+            logger.error(f"处理句子开始事件出错: {str(e)}")
+    
+    def on_sentence_end(self, message, *args, **kwargs):
+        """句子结束回调"""
+        try:
+            logger.info(f"句子结束{self.label}: {message}")
+            message = self._parse(message, "句子结束")
+            if message is None:
+                return
+                
+            # 检查payload是否存在且不为None
+            if "payload" not in message or message["payload"] is None:
+                logger.error(f"句子结束事件中缺少payload数据: {message}")
+                return
+                
+            # 获取结果
+            payload = message["payload"]
+            result = payload.get("result", "")
+            sentence_id = payload.get("sentence_id", "")
+            
+            # 如果这个句子已经处理过，跳过
+            if sentence_id and sentence_id in self.processed_sentences:
+                logger.info(f"句子 {sentence_id} 已处理过，跳过")
+                return
+                
+            # 添加到已处理集合
+            if sentence_id:
+                self.processed_sentences.add(sentence_id)
+                
+            # 添加到结果列表，并追加写入输出文件
+            if result:
+                self.add_sentence(result, payload.get("begin_time", 0), payload.get("time", 0))
+                logger.info(f"第 {len(self.all_results)} 句转写结果: {result}")
+        except Exception as e:
+            logger.error(f"处理句子结束事件出错: {str(e)}")
+    
+    def on_completed(self, message, *args, **kwargs):
+        """转写完成回调"""
+        try:
+            logger.info(f"识别完成{self.label}: {message}")
+            if self.output_file:
+                logger.info(f"转写结果已保存到: {self.output_file}")
+        except Exception as e:
+            logger.error(f"处理转写完成事件出错: {str(e)}")
+        finally:
+            # 标记转写完成
+            self.finish()
+    
+    def on_error(self, message, *args, **kwargs):
+        """错误回调"""
+        logger.error(f"识别错误{self.label}: {message}")
+        self.error_message = str(message)
+        self.finish()
+    
+    def on_close(self, *args, **kwargs):
+        """连接关闭回调"""
+        logger.info(f"连接关闭{self.label}")
+        self.finish()
 
 class SpeechToText:
-    """语音转文字类，使用阿里云语音识别服务"""
+    """
+    语音转文字类，使用阿里云语音识别服务
     
-    def __init__(self, format_type="wav", sample_rate=16000, enable_punctuation=True, enable_inverse_text_normalization=True):
+    实例只保存识别参数，每次识别的状态保存在独立的RecognitionSession中，
+    因此同一个实例可以在多个线程中同时使用。
+    """
+    
+    def __init__(self, format_type="wav", sample_rate=16000, enable_punctuation=True, enable_inverse_text_normalization=True,
+                 parallel_sessions=PARALLEL_TRANSCRIBE_SESSIONS, timeout=TRANSCRIBE_TIMEOUT_SECONDS):
         """
         初始化语音转文字对象
         
@@ -107,19 +265,15 @@ class SpeechToText:
             sample_rate: 采样率，默认为16000
             enable_punctuation: 是否启用标点符号，默认为True
             enable_inverse_text_normalization: 是否启用文本反规范化，默认为True
+            parallel_sessions: 长音频并行转写的最大会话数，1表示不切分
+            timeout: 音频发送完毕后等待识别结果的超时时间（秒）
         """
         self.format_type = format_type
         self.sample_rate = sample_rate
         self.enable_punctuation = enable_punctuation
         self.enable_inverse_text_normalization = enable_inverse_text_normalization
-        
-        # 初始化状态变量
-        self.all_results = []
-        self.current_sentence = ""
-        self.is_finished = False
-        self.transcript = ""
-        self.output_file = None
-        self.processed_sentences = set()  # 用于跟踪已处理的句子，避免重复
+        self.parallel_sessions = max(1, parallel_sessions)
+        self.timeout = timeout
         
         logger.info(f"初始化语音转文字对象，格式: {format_type}, 采样率: {sample_rate}")
         
@@ -146,12 +300,27 @@ class SpeechToText:
             logger.error("阿里云NLS SDK不可用，请安装SDK")
             raise ImportError("阿里云NLS SDK不可用，请安装SDK")
     
-    def transcribe(self, audio_file):
+    def _cache_params(self):
+        """影响转写结果的参数，作为缓存键的一部分"""
+        return {
+            "format": self.format_type,
+            "sample_rate": self.sample_rate,
+            "enable_punctuation": self.enable_punctuation,
+            "enable_inverse_text_normalization": self.enable_inverse_text_normalization,
+            "appkey": ALIYUN_APPKEY
+        }
+    
+    def transcribe(self, audio_file, content_hash=None, output_file=None, on_sentence=None, on_progress=None):
         """
         转写音频文件
         
         Args:
             audio_file: 音频文件路径
+            content_hash: 音频文件内容的SHA-256，None表示自动计算（用于转写缓存）
+            output_file: 实时追加写入转写结果的文件路径，同时生成带时间戳的句子日志（.sentences.jsonl），None表示不写入
+            on_sentence: 按时间顺序接收识别完成的句子的回调（如StreamingSegmenter.add_sentence），
+                单会话识别时逐句实时调用；并行识别在拼接时调用；命中缓存时按缓存的句子依次调用
+            on_progress: 音频发送进度回调，参数为(已发送字节数, 总字节数)，每发送约10%调用一次
             
         Returns:
             转写结果
@@ -160,55 +329,101 @@ class SpeechToText:
             logger.error(f"音频文件不存在: {audio_file}")
             raise FileNotFoundError(f"音频文件不存在: {audio_file}")
         
+        # 检查转写缓存，相同音频和参数直接返回缓存结果
+        cache_key = None
+        if transcript_cache is not None:
+            if content_hash is None:
+                content_hash = hash_audio_file(audio_file)
+            cache_key = TranscriptCache.make_key(content_hash, self._cache_params())
+            cached = transcript_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"使用缓存的转写结果: {audio_file}")
+                self._replay_cached(cached, output_file, on_sentence)
+                return cached["transcript"]
+        
         logger.info(f"开始转写音频文件: {audio_file}")
         
         # 获取音频信息
-        sample_rate, channels, _ = get_audio_info(audio_file)
-        
-        # 检查采样率和声道数是否需要转换
-        converted_file = None
-        if sample_rate != 16000 or channels != 1:
-            logger.info(f"音频需要转换: 采样率 {sample_rate}Hz -> 16000Hz, 声道数 {channels} -> 1")
-            converted_file = convert_audio(audio_file, 16000, 1)
-            if converted_file:
-                logger.info(f"使用转换后的音频文件: {converted_file}")
-                audio_file = converted_file
-                self.sample_rate = 16000
+        sample_rate, channels, bits = get_audio_info(audio_file)
+        
+        # 检查采样率、声道数和位深度是否需要转换（并行识别的分块只支持16位PCM），转换结果保存在内存中直接发送
+        audio = audio_file
+        aformat = None
+        if sample_rate != 16000 or channels != 1 or bits != 16:
+            logger.info(f"音频需要转换: 采样率 {sample_rate}Hz -> 16000Hz, 声道数 {channels} -> 1, 位深度 {bits}bit -> 16bit")
+            pcm_data = convert_audio(audio_file, 16000, 1)
+            if pcm_data:
+                logger.info(f"使用转换后的PCM数据: {len(pcm_data)} 字节")
+                audio = pcm_data
+                aformat = "pcm"
+                sample_rate = 16000
             else:
                 logger.warning("音频转换失败，尝试使用原始文件")
+                sample_rate = self.sample_rate
         
-        try:
-            # 转写音频
-            result = self._transcribe_with_sdk(audio_file)
+        # 转写音频，长音频切分后并行识别
+        duration = self._get_duration(audio, sample_rate)
+        if self.parallel_sessions > 1 and duration and duration > PARALLEL_TRANSCRIBE_MIN_SECONDS:
+            session = self._transcribe_parallel(audio, sample_rate, output_file, on_sentence, on_progress)
+        else:
+            session = self._transcribe_with_sdk(audio, sample_rate, aformat=aformat, output_file=output_file,
+                                                on_sentence=on_sentence, on_progress=on_progress)
+        result = session.transcript
+        
+        # 识别成功时写入缓存
+        if cache_key and result and not session.error_message:
+            transcript_cache.put(cache_key, result, sentences=session.sentences)
             
-            # 如果使用了临时文件，删除它
-            if converted_file and os.path.exists(converted_file):
-                os.unlink(converted_file)
-                logger.info(f"已删除临时文件: {converted_file}")
-                
-            return result
+        return result
+    
+    def _replay_cached(self, cached, output_file=None, on_sentence=None):
+        """
+        与实时识别相同地逐句重放缓存的转写结果：写入转写文本和句子日志，并依次调用on_sentence
+        
+        Args:
+            cached: 缓存条目，包含transcript和带时间戳的sentences（旧版本的缓存没有sentences，整段文本作为一句）
+            output_file: 写入转写结果的文件路径，None表示不写入
+            on_sentence: 接收句子的回调
+        """
+        sentences = cached.get("sentences")
+        if sentences is None:
+            sentences = [{"begin_time": 0, "end_time": 0, "text": cached["transcript"]}] if cached["transcript"] else []
+        
+        session = RecognitionSession(output_file, label="[缓存]", on_sentence=on_sentence)
+        try:
+            for sentence in sentences:
+                session.add_sentence(sentence["text"], sentence.get("begin_time", 0), sentence.get("end_time", 0))
+        finally:
+            session.finish()
+    
+    async def transcribe_async(self, audio_file, content_hash=None, output_file=None):
+        """
+        异步转写音频文件，识别在后台线程中进行，不阻塞事件循环
+        
+        Args:
+            audio_file: 音频文件路径
+            content_hash: 音频文件内容的SHA-256，None表示自动计算
+            output_file: 实时写入转写结果的文件路径，None表示不写入
             
-        except Exception as e:
-            # 如果出错，也要删除临时文件
-            if converted_file and os.path.exists(converted_file):
-                os.unlink(converted_file)
-                logger.info(f"已删除临时文件: {converted_file}")
-            raise
+        Returns:
+            转写结果
+        """
+        return await asyncio.to_thread(self.transcribe, audio_file, content_hash, output_file)
     
-    def transcribe_file(self, audio_file, output_file=None):
+    def transcribe_file(self, audio_file, output_file=None, content_hash=None, on_sentence=None, on_progress=None):
         """
         转写音频文件并保存结果到文本文件
         
         Args:
             audio_file: 音频文件路径
             output_file: 输出文件路径，None表示不保存
+            content_hash: 音频文件内容的SHA-256，None表示自动计算
+            on_sentence: 按时间顺序接收识别完成的句子的回调，None表示不回调
+            on_progress: 音频发送进度回调，参数为(已发送字节数, 总字节数)，None表示不回调
             
         Returns:
             (转写结果, 输出文件路径)
         """
-        # 保存输出文件路径，用于实时写入
-        self.output_file = output_file
-        
         # 如果指定了输出文件，确保输出目录存在
         if output_file:
             output_dir = os.path.dirname(output_file)
@@ -220,7 +435,8 @@ class SpeechToText:
                 pass
             
         # 转写音频
-        transcript = self.transcribe(audio_file)
+        transcript = self.transcribe(audio_file, content_hash=content_hash, output_file=output_file,
+                                     on_sentence=on_sentence, on_progress=on_progress)
         
         # 如果指定了输出文件，确保最终结果完整写入
         if output_file:
@@ -231,24 +447,131 @@ class SpeechToText:
         
         return transcript, output_file
     
-    def _transcribe_with_sdk(self, audio_file):
-        """使用阿里云SDK进行语音识别"""
-        logger.info("使用阿里云NLS SDK进行语音识别")
+    def _get_duration(self, audio, sample_rate):
+        """获取音频时长（秒），audio为WAV文件路径或16位单声道PCM数据，无法解析时返回None"""
+        if is_pcm_buffer(audio):
+            return len(audio) / float(sample_rate * 2)
+        try:
+            with wave.open(audio, 'rb') as wf:
+                return wf.getnframes() / float(wf.getframerate())
+        except Exception:
+            return None
+    
+    def _transcribe_parallel(self, audio, sample_rate, output_file=None, on_sentence=None, on_progress=None):
+        """
+        在静音处切分长音频，多个识别会话并行转写后按时间顺序拼接
+        
+        分块按时间顺序排列，每完成一块就把从头开始连续完成的各块句子拼接到结果中，
+        转写文本和句子日志随之写入、on_sentence随之回调，不必等待后面的分块
+        
+        Args:
+            audio: 16kHz单声道WAV文件路径，或内存中的PCM数据
+            sample_rate: 音频采样率
+            output_file: 按时间顺序实时写入拼接结果的文件路径
+            on_sentence: 按时间顺序接收句子的回调
+            on_progress: 所有分块合计的音频发送进度回调
+            
+        Returns:
+            汇总了所有分块句子的RecognitionSession
+        """
+        from audio_processing.audio_chunker import split_on_silence
         
         try:
-            # 获取Token
-            token = getToken(ALIYUN_ACCESS_KEY_ID, ALIYUN_ACCESS_KEY_SECRET)
-            if not token:
-                raise Exception("获取Token失败")
+            chunks = split_on_silence(audio, PARALLEL_CHUNK_SECONDS, SILENCE_SEARCH_SECONDS, sample_rate=sample_rate)
+        except ValueError as e:
+            # 转换失败时的原始文件可能不是16位单声道PCM，无法切分，改为单会话识别
+            logger.warning(f"无法切分音频，改为单会话识别: {str(e)}")
+            chunks = []
+        if len(chunks) <= 1:
+            aformat = "pcm" if is_pcm_buffer(audio) else None
+            return self._transcribe_with_sdk(audio, sample_rate, aformat=aformat, output_file=output_file,
+                                             on_sentence=on_sentence, on_progress=on_progress)
+        
+        workers = min(self.parallel_sessions, len(chunks))
+        logger.info(f"并行转写: {len(chunks)} 块，{workers} 个会话")
+        start_time = time.time()
+        
+        # 汇总各分块的发送进度
+        total_bytes = sum(chunk["size"] for chunk in chunks)
+        sent_bytes = {}
+        progress_lock = threading.Lock()
+        
+        def report_progress(chunk, sent, _):
+            with progress_lock:
+                sent_bytes[chunk["offset"]] = sent
+                total_sent = sum(sent_bytes.values())
+            on_progress(total_sent, total_bytes)
+        
+        def transcribe_chunk(chunk):
+            # 每块使用独立的识别会话，直接发送裸PCM数据
+            session = self._transcribe_with_sdk(
+                audio, sample_rate,
+                aformat="pcm",
+                byte_range=(chunk["offset"], chunk["size"]),
+                label=f"[{chunk['start_ms'] // 1000}s]",
+                on_progress=functools.partial(report_progress, chunk) if on_progress else None
+            )
+            if session.error_message:
+                raise Exception(f"分块转写失败（起始 {chunk['start_ms']}ms）: {session.error_message}")
+            return [
+                {**sentence,
+                 "begin_time": sentence["begin_time"] + chunk["start_ms"],
+                 "end_time": sentence["end_time"] + chunk["start_ms"]}
+                for sentence in session.sentences
+            ]
+        
+        merged = RecognitionSession(output_file, on_sentence=on_sentence)
+        results = [None] * len(chunks)
+        next_index = 0  # 下一个待拼接的分块
+        
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asr-chunk") as executor:
+                futures = {executor.submit(transcribe_chunk, chunk): index for index, chunk in enumerate(chunks)}
+                try:
+                    for future in as_completed(futures):
+                        results[futures[future]] = future.result()
+                        # 拼接从头开始连续完成的分块
+                        while next_index < len(chunks) and results[next_index] is not None:
+                            for sentence in sorted(results[next_index], key=lambda s: s["begin_time"]):
+                                merged.add_sentence(sentence["text"], sentence["begin_time"], sentence["end_time"])
+                            results[next_index] = []
+                            next_index += 1
+                except Exception:
+                    # 有分块失败时不再启动尚未开始的分块
+                    for future in futures:
+                        future.cancel()
+                    raise
+        finally:
+            merged.finish()
+        
+        logger.info(f"并行转写完成，共 {len(merged.sentences)} 句，耗时 {time.time() - start_time:.1f}秒")
+        return merged
+    
+    def _transcribe_with_sdk(self, audio, sample_rate, aformat=None, byte_range=None, output_file=None, label="",
+                             on_sentence=None, on_progress=None):
+        """
+        使用阿里云SDK进行一次语音识别
+        
+        Args:
+            audio: 音频文件路径，或内存中的PCM数据（此时aformat应为pcm）
+            sample_rate: 音频采样率
+            aformat: 音频格式，None表示使用实例的格式
+            byte_range: (起始字节, 长度)，只发送其中的这一段，None表示全部发送
+            output_file: 实时写入转写结果的文件路径
+            label: 日志中用于区分会话的标识
+            on_sentence: 每识别完成一句时调用的回调
+            on_progress: 音频发送进度回调
             
-            logger.info(f"成功获取Token: {token[:10]}...")
+        Returns:
+            识别结束后的RecognitionSession
+        """
+        logger.info(f"使用阿里云NLS SDK进行语音识别{label}")
+        
+        try:
+            # 获取Token（进程内共享，过期前自动刷新）
+            token = nls_token_manager.get_token()
             
-            # 重置状态
-            self.all_results = []
-            self.current_sentence = ""
-            self.is_finished = False
-            self.transcript = ""
-            self.processed_sentences = set()  # 重置已处理句子集合
+            session = RecognitionSession(output_file, label, on_sentence)
             
             # 创建识别请求
             logger.info("设置识别参数")
@@ -257,200 +580,121 @@ class SpeechToText:
                 token=token,
                 appkey=ALIYUN_APPKEY,
                 on_start=None,
-                on_sentence_begin=self._on_sentence_begin,
-                on_sentence_end=self._on_sentence_end,
+                on_sentence_begin=session.on_sentence_begin,
+                on_sentence_end=session.on_sentence_end,
                 on_result_changed=None,
-                on_completed=self._on_completed,
-                on_error=self._on_error,
-                on_close=self._on_close
+                on_completed=session.on_completed,
+                on_error=session.on_error,
+                on_close=session.on_close
             )
             
             # 开始识别，在start方法中设置参数
             logger.info("开始识别...")
             sr.start(
-                aformat=self.format_type,
-                sample_rate=self.sample_rate,
+                aformat=aformat or self.format_type,
+                sample_rate=sample_rate,
                 enable_punctuation_prediction=self.enable_punctuation,
                 enable_inverse_text_normalization=self.enable_inverse_text_normalization
             )
             
-            # 读取音频文件并发送
-            with open(audio_file, 'rb') as f:
-                audio_data = f.read()
-            
-            # 分块发送音频数据
-            chunk_size = 4096
-            total_size = len(audio_data)
-            sent_size = 0
-            
-            # 输出到控制台的进度条
-            print(f"\r🔊 音频转写进度: 0%", end="", flush=True)
-            
-            for i in range(0, total_size, chunk_size):
-                chunk = audio_data[i:i+chunk_size]
-                sr.send_audio(chunk)
-                
-                # 更新发送进度
-                sent_size += len(chunk)
-                progress = sent_size / total_size * 100
-                
-                # 每10%更新一次进度条
-                if int(progress) % 10 == 0 and int(progress) > 0:
-                    print(f"\r🔊 音频转写进度: {int(progress)}%", end="", flush=True)
-                
-                # 记录发送进度到日志
-                if i % (chunk_size * 10) == 0 or i + chunk_size >= total_size:
-                    logger.info(f"已发送 {sent_size}/{total_size} 字节 ({progress:.1f}%)")
-            
-            # 完成进度条
-            print(f"\r🔊 音频转写进度: 100% ✅", flush=True)
+            # 从磁盘流式发送音频数据
+            self._send_audio(sr, audio, sample_rate, byte_range, on_progress)
             
             # 停止发送音频
             sr.stop()
             
-            # 等待识别完成
-            while not self.is_finished:
-                time.sleep(0.1)
+            # 等待识别完成（完成、错误、连接关闭任一事件都会结束等待）
+            try:
+                session.wait(self.timeout)
+            except TimeoutError:
+                sr.shutdown()
+                session.finish()
+                raise
+            
+            # Token被服务端拒绝时丢弃缓存，下次重新申请
+            if session.error_message and "token" in session.error_message.lower():
+                nls_token_manager.invalidate()
             
-            # 返回转写结果
-            return self.transcript
+            return session
             
         except Exception as e:
             logger.error(f"语音识别失败: {str(e)}")
             raise
     
-    def _on_sentence_begin(self, message, *args, **kwargs):
-        """句子开始回调"""
-        try:
-            logger.info(f"句子开始: {message}")
-            # 检查message是否是字符串，如果是，尝试解析为JSON
-            if isinstance(message, str):
-                try:
-                    message = json.loads(message)
-                except json.JSONDecodeError:
-                    logger.error(f"无法解析句子开始事件消息: {message}")
-                    return
-                    
-            # 检查message是否是字典
-            if not isinstance(message, dict):
-                logger.error(f"句子开始事件消息不是字典: {type(message)}")
-                return
-                
-            # 检查payload是否存在
-            if "payload" not in message:
-                logger.error(f"句子开始事件中缺少payload数据: {message}")
-                return
-                
-            # 获取句子ID和时间
-            sentence_id = message["payload"].get("index", 0)
-            sentence_time = message["payload"].get("time", 0)
-            
-            progress_info = f"音频转写进度: 开始转写第 {sentence_id} 句，时间点: {sentence_time}ms"
-            print(progress_info, flush=True)
-        except Exception as e:
-            logger.error(f"处理句子开始事件出错: {str(e)}")
-    
-    def _on_sentence_end(self, message, *args, **kwargs):
-        """句子结束回调"""
-        try:
-            logger.info(f"句子结束: {message}")
-            
-            # 检查message是否是字符串，如果是，尝试解析为JSON
-            if isinstance(message, str):
-                try:
-                    message = json.loads(message)
-                except json.JSONDecodeError:
-                    logger.error(f"无法解析句子结束事件消息: {message}")
-                    return
-            
-            # 检查message是否是字典
-            if not isinstance(message, dict):
-                logger.error(f"句子结束事件消息不是字典: {type(message)}")
-                return
-                
-            # 检查payload是否存在且不为None
-            if "payload" not in message or message["payload"] is None:
-                logger.error(f"句子结束事件中缺少payload数据: {message}")
-                return
-                
-            # 获取结果
-            result = message["payload"].get("result", "")
-            sentence_id = message["payload"].get("sentence_id", "")
-            
-            # 如果这个句子已经处理过，跳过
-            if sentence_id and sentence_id in self.processed_sentences:
-                logger.info(f"句子 {sentence_id} 已处理过，跳过")
+    def _send_audio(self, sr, audio, sample_rate, byte_range=None, on_progress=None):
+        """
+        按帧发送音频：文件通过内存映射读取，内存占用与音频长度无关；内存中的PCM数据直接切片发送
+        
+        Args:
+            sr: 已开始识别的NlsSpeechTranscriber
+            audio: 音频文件路径，或内存中的PCM数据
+            sample_rate: 音频采样率，用于按时长控制发送速度
+            byte_range: (起始字节, 长度)，None表示全部发送
+            on_progress: 发送进度回调，参数为(已发送字节数, 总字节数)
+        """
+        if is_pcm_buffer(audio):
+            view = memoryview(audio)
+            try:
+                self._send_frames(sr, view, sample_rate, byte_range, on_progress)
+            finally:
+                view.release()
+            return
+        
+        with open(audio, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                logger.warning(f"没有可发送的音频数据: {audio}")
                 return
-                
-            # 添加到已处理集合
-            if sentence_id:
-                self.processed_sentences.add(sentence_id)
-                
-            # 添加到结果列表
-            if result:
-                self.all_results.append(result)
-                
-                # 更新当前完整转写文本
-                self.transcript = " ".join(self.all_results)
-                
-                # 如果指定了输出文件，实时写入
-                if self.output_file:
-                    with open(self.output_file, 'w', encoding='utf-8') as f:
-                        f.write(self.transcript)
-                        
-                logger.info(f"当前转写结果: {self.transcript}")
-        except Exception as e:
-            logger.error(f"处理句子结束事件出错: {str(e)}")
-    
-    def _on_completed(self, message, *args, **kwargs):
-        """转写完成回调"""
-        try:
-            logger.info(f"识别完成: {message}")
-            
-            # 检查message是否是字符串，如果是，尝试解析为JSON
-            if isinstance(message, str):
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
                 try:
-                    message = json.loads(message)
-                except json.JSONDecodeError:
-                    logger.warning(f"识别完成事件收到无效消息: {message}")
-                    return
-            
-            # 检查message是否是字典
-            if not isinstance(message, dict):
-                logger.warning(f"识别完成事件消息不是字典: {type(message)}")
-                return
-            
-            # 如果转写结果为空，尝试使用之前收集的句子
-            if not self.transcript and self.all_results:
-                self.transcript = " ".join(self.all_results)
-                
-            # 如果指定了输出文件，确保最终结果被写入
-            if self.output_file and self.transcript:
-                with open(self.output_file, 'w', encoding='utf-8') as f:
-                    f.write(self.transcript)
-                logger.info(f"转写结果已保存到: {self.output_file}")
-            
-            # 标记转写完成
-            self.is_finished = True
-            
-        except Exception as e:
-            logger.error(f"处理转写完成事件出错: {str(e)}")
+                    self._send_frames(sr, view, sample_rate, byte_range, on_progress)
+                finally:
+                    view.release()
     
-    def _on_error(self, message, *args, **kwargs):
-        """错误回调"""
-        try:
-            logger.error(f"识别错误: {message}")
-            self.is_finished = True
-        except Exception as e:
-            logger.error(f"处理错误事件出错: {str(e)}")
-    
-    def _on_close(self, *args, **kwargs):
-        """连接关闭回调"""
-        try:
-            logger.info("连接关闭")
-            self.is_finished = True
-        except Exception as e:
-            logger.error(f"处理连接关闭事件出错: {str(e)}")
+    def _send_frames(self, sr, view, sample_rate, byte_range=None, on_progress=None):
+        """按ASR_FRAME_BYTES切片发送memoryview中的音频数据，并按ASR_SEND_SPEED控制节奏"""
+        frame_bytes = max(ASR_FRAME_BYTES, 2)
+        # 16位单声道音频每秒的字节数，用于换算已发送音频的时长
+        bytes_per_sec = sample_rate * 2
+        
+        start, length = byte_range if byte_range else (0, len(view))
+        length = min(length, len(view) - start)
+        if length <= 0:
+            logger.warning("没有可发送的音频数据")
+            return
+        
+        started_at = time.monotonic()
+        sent_size = 0
+        last_reported = -1
+        
+        # 输出到控制台的进度条
+        print(f"\r🔊 音频转写进度: 0%", end="", flush=True)
+        
+        for offset in range(start, start + length, frame_bytes):
+            frame = view[offset:min(offset + frame_bytes, start + length)]
+            sr.send_audio(bytes(frame))
+            sent_size += len(frame)
+            frame.release()
+            
+            # 按倍速控制发送节奏，避免发送过快被服务端拒绝
+            if ASR_SEND_SPEED > 0:
+                ahead = sent_size / bytes_per_sec / ASR_SEND_SPEED - (time.monotonic() - started_at)
+                if ahead > 0:
+                    time.sleep(ahead)
+            
+            # 每10%更新一次进度条和日志
+            progress = int(sent_size * 100 / length)
+            if progress // 10 != last_reported // 10:
+                last_reported = progress
+                print(f"\r🔊 音频转写进度: {progress}%", end="", flush=True)
+                logger.info(f"已发送 {sent_size}/{length} 字节 ({progress}%)")
+                if on_progress:
+                    on_progress(sent_size, length)
+        
+        # 完成进度条
+        print(f"\r🔊 音频转写进度: 100% ✅", flush=True)
+        elapsed = time.monotonic() - started_at
+        logger.info(f"音频发送完成: {length} 字节，音频时长 {length / bytes_per_sec:.1f}秒，耗时 {elapsed:.1f}秒")
     
     def process_directory(self, input_dir, output_dir=None):
         """
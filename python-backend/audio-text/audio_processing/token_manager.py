@@ -0,0 +1,235 @@
+"""
+NLS Token管理模块 - 进程内共享Token，在过期前后台刷新，并通过文件缓存在多个Worker进程间共享
+"""
+import os
+import json
+import time
+import logging
+import threading
+
+# 配置日志
+logger = logging.getLogger('token_manager')
+
+# 优先使用阿里云核心SDK获取Token（可以拿到过期时间），否则使用NLS SDK自带的getToken
+try:
+    from aliyunsdkcore.client import AcsClient
+    from aliyunsdkcore.request import CommonRequest
+    USE_CORE_SDK = True
+except ImportError:
+    USE_CORE_SDK = False
+
+try:
+    from nls.token import getToken
+    USE_NLS_TOKEN = True
+except ImportError:
+    USE_NLS_TOKEN = False
+
+from utils.config import (
+    ALIYUN_ACCESS_KEY_ID,
+    ALIYUN_ACCESS_KEY_SECRET,
+    ALIYUN_REGION,
+    NLS_TOKEN_REFRESH_MARGIN,
+    NLS_TOKEN_DEFAULT_TTL,
+    NLS_TOKEN_CACHE_FILE
+)
+from utils.atomic_write import atomic_write_json
+
+
+class NlsTokenManager:
+    """NLS访问Token管理，所有SpeechToText实例共用一个Token"""
+
+    def __init__(self, access_key_id, access_key_secret, region="cn-shanghai",
+                 refresh_margin=600, default_ttl=3600, cache_file=None):
+        """
+        初始化Token管理器
+
+        Args:
+            access_key_id: 阿里云AccessKey ID
+            access_key_secret: 阿里云AccessKey Secret
+            region: 地域
+            refresh_margin: 距过期多少秒时刷新
+            default_ttl: 无法获得过期时间时假定的有效期（秒）
+            cache_file: Token缓存文件，多个进程共享，None表示不使用文件缓存
+        """
+        self.access_key_id = access_key_id
+        self.access_key_secret = access_key_secret
+        self.region = region
+        self.refresh_margin = refresh_margin
+        self.default_ttl = default_ttl
+        self.cache_file = cache_file
+
+        self._token = None
+        self._expire_time = 0
+        self._lock = threading.Lock()  # 保护Token状态，不在持有时发起网络请求
+        self._refresh_lock = threading.Lock()  # 同一时间只有一个线程申请新Token
+        self._refresh_thread = None
+        self._stop_event = threading.Event()
+
+    def _is_fresh(self, expire_time):
+        return expire_time - self.refresh_margin > time.time()
+
+    def _current(self):
+        """当前的(Token, 过期时间戳)"""
+        with self._lock:
+            return self._token, self._expire_time
+
+    def get_token(self):
+        """
+        获取有效的Token
+
+        Token即将过期（进入刷新提前量）但尚未过期时，尝试刷新一次，刷新失败或其他线程正在刷新时
+        直接返回当前Token；只有没有Token或Token已过期时才等待刷新，刷新失败时抛出异常
+
+        Returns:
+            Token字符串
+        """
+        token, expire_time = self._current()
+        if not (token and self._is_fresh(expire_time)):
+            valid = bool(token) and expire_time > time.time()
+            try:
+                self._refresh(blocking=not valid)
+            except Exception as e:
+                token, expire_time = self._current()
+                if not (token and expire_time > time.time()):
+                    raise
+                logger.warning(f"刷新Token失败，继续使用尚未过期的Token: {str(e)}")
+            token, expire_time = self._current()
+            if not (token and expire_time > time.time()):
+                raise Exception("没有可用的Token")
+
+        with self._lock:
+            self._ensure_refresh_thread()
+        return token
+
+    def invalidate(self):
+        """使当前Token失效（例如服务端返回Token无效时），下次获取时重新申请"""
+        with self._lock:
+            self._token = None
+            self._expire_time = 0
+            if self.cache_file and os.path.exists(self.cache_file):
+                try:
+                    os.unlink(self.cache_file)
+                except OSError:
+                    pass
+
+    def stop(self):
+        """停止后台刷新线程"""
+        self._stop_event.set()
+
+    def _request_token(self):
+        """向阿里云申请新Token，返回(token, 过期时间戳)"""
+        if USE_CORE_SDK:
+            client = AcsClient(self.access_key_id, self.access_key_secret, self.region)
+            request = CommonRequest()
+            request.set_method('POST')
+            request.set_domain(f'nls-meta.{self.region}.aliyuncs.com')
+            request.set_version('2019-02-28')
+            request.set_action_name('CreateToken')
+            response = json.loads(client.do_action_with_exception(request))
+            token = response.get('Token', {})
+            if not token.get('Id'):
+                raise Exception(f"获取Token失败: {response}")
+            return token['Id'], token.get('ExpireTime') or time.time() + self.default_ttl
+
+        if USE_NLS_TOKEN:
+            token = getToken(self.access_key_id, self.access_key_secret)
+            if not token:
+                raise Exception("获取Token失败")
+            return token, time.time() + self.default_ttl
+
+        raise ImportError("阿里云SDK不可用，无法获取Token")
+
+    def _refresh(self, blocking=True):
+        """
+        申请新Token并写入缓存，网络请求期间不持有状态锁，其他线程仍可拿到当前Token
+
+        Args:
+            blocking: 其他线程正在申请时是否等待其完成，False时直接返回
+
+        Returns:
+            是否已有新Token（包括等待期间其他线程或进程已刷新）
+        """
+        if not self._refresh_lock.acquire(blocking=blocking):
+            return False
+        try:
+            with self._lock:
+                # 其他线程或进程可能已经刷新过
+                if (self._token and self._is_fresh(self._expire_time)) or self._load_cache():
+                    return True
+
+            token, expire_time = self._request_token()
+            with self._lock:
+                self._token = token
+                self._expire_time = expire_time
+            self._save_cache(token, expire_time)
+            logger.info(f"成功获取Token: {token[:10]}...，有效期至 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(expire_time))}")
+            return True
+        finally:
+            self._refresh_lock.release()
+
+    def _load_cache(self):
+        """从缓存文件读取其他进程获取的Token，有效时返回True（调用方需持有锁）"""
+        if not self.cache_file:
+            return False
+        try:
+            with open(self.cache_file, "r") as f:
+                cached = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+        except Exception as e:
+            logger.warning(f"读取Token缓存失败: {str(e)}")
+            return False
+
+        if cached.get("token") and self._is_fresh(cached.get("expire_time", 0)):
+            self._token = cached["token"]
+            self._expire_time = cached["expire_time"]
+            logger.info("使用缓存的Token")
+            return True
+        return False
+
+    def _save_cache(self, token, expire_time):
+        """原子写入缓存文件，仅当前用户可读"""
+        if not self.cache_file:
+            return
+        try:
+            cache_dir = os.path.dirname(self.cache_file) or "."
+            os.makedirs(cache_dir, exist_ok=True)
+            atomic_write_json(self.cache_file, {"token": token, "expire_time": expire_time}, file_mode=0o600)
+        except Exception as e:
+            logger.warning(f"写入Token缓存失败: {str(e)}")
+
+    def _ensure_refresh_thread(self):
+        """首次获取Token后启动后台刷新线程（调用方需持有锁）"""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self._refresh_thread = threading.Thread(target=self._refresh_loop, name="nls-token-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def _refresh_loop(self):
+        """在Token过期前提前刷新，使转写任务不必等待申请Token"""
+        while not self._stop_event.is_set():
+            with self._lock:
+                wait = self._expire_time - self.refresh_margin - time.time()
+            if wait > 0:
+                self._stop_event.wait(min(wait, 3600))
+                continue
+
+            try:
+                self._refresh()
+                wait = None
+            except Exception as e:
+                logger.error(f"后台刷新Token失败，60秒后重试: {str(e)}")
+                wait = 60
+            if wait:
+                self._stop_event.wait(wait)
+
+
+# Token管理器（进程内共享）
+nls_token_manager = NlsTokenManager(
+    ALIYUN_ACCESS_KEY_ID,
+    ALIYUN_ACCESS_KEY_SECRET,
+    ALIYUN_REGION,
+    refresh_margin=NLS_TOKEN_REFRESH_MARGIN,
+    default_ttl=NLS_TOKEN_DEFAULT_TTL,
+    cache_file=NLS_TOKEN_CACHE_FILE or None
+)
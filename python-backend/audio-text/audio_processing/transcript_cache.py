@@ -0,0 +1,70 @@
+"""
+转写结果缓存模块 - 以音频内容哈希和转写参数为键，在磁盘上缓存转写结果（LRU淘汰）
+"""
+import json
+import hashlib
+
+from utils.disk_cache import DiskCache
+
+# 计算文件哈希时的读取块大小
+HASH_READ_SIZE = 8 * 1024 * 1024
+
+
+def hash_audio_file(audio_file):
+    """
+    计算音频文件原始字节的SHA-256
+
+    Args:
+        audio_file: 音频文件路径
+
+    Returns:
+        十六进制哈希字符串
+    """
+    hasher = hashlib.sha256()
+    with open(audio_file, "rb") as f:
+        while True:
+            block = f.read(HASH_READ_SIZE)
+            if not block:
+                break
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+class TranscriptCache(DiskCache):
+    """转写结果磁盘缓存，总大小超过上限时按最近访问时间淘汰"""
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024):
+        """
+        初始化转写缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 缓存总大小上限（字节）
+        """
+        super().__init__(cache_dir, max_bytes, label="转写缓存")
+
+    @staticmethod
+    def make_key(content_hash, params):
+        """
+        根据音频内容哈希和转写参数生成缓存键
+
+        Args:
+            content_hash: 音频内容哈希
+            params: 影响转写结果的参数字典
+
+        Returns:
+            缓存键
+        """
+        raw = json.dumps({"content": content_hash, "params": params}, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def put(self, key, transcript, **extra):
+        """
+        写入缓存（原子替换），必要时淘汰最久未访问的条目
+
+        Args:
+            key: 缓存键
+            transcript: 转写文本
+            extra: 其他需要缓存的字段
+        """
+        super().put(key, {"transcript": transcript, **extra})
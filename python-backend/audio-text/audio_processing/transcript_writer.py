@@ -0,0 +1,94 @@
+"""
+转写结果写入模块 - 以追加方式写入转写文本和句子日志，每句的写入开销与已有内容长度无关
+"""
+import os
+import json
+import logging
+
+# 配置日志
+logger = logging.getLogger('transcript_writer')
+
+
+def sentences_path(transcript_file):
+    """
+    获取转写文本对应的句子日志路径（transcript.txt -> transcript.sentences.jsonl）
+
+    Args:
+        transcript_file: 转写文本文件路径
+
+    Returns:
+        句子日志文件路径
+    """
+    return os.path.splitext(transcript_file)[0] + ".sentences.jsonl"
+
+
+def read_sentences(transcript_file, offset=0):
+    """
+    从指定字节位置开始读取句子日志，用于增量获取转写进度
+
+    Args:
+        transcript_file: 转写文本文件路径
+        offset: 上次读取结束的字节位置
+
+    Returns:
+        (句子列表, 下次读取的字节位置)；尚未写完的最后一行不会返回
+    """
+    path = sentences_path(transcript_file)
+    if not os.path.exists(path):
+        return [], offset
+
+    sentences = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            try:
+                sentences.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning(f"跳过无法解析的句子记录: {line[:100]}")
+    return sentences, offset
+
+
+class TranscriptWriter:
+    """追加写入转写文本，并把每个句子及其起止时间记录到JSONL日志"""
+
+    def __init__(self, transcript_file, separator=" "):
+        """
+        初始化写入器，清空已有的转写文本和句子日志
+
+        Args:
+            transcript_file: 转写文本文件路径
+            separator: 句子之间的分隔符
+        """
+        self.transcript_file = transcript_file
+        self.separator = separator
+        self.count = 0
+        self._text = open(transcript_file, "w", encoding="utf-8")
+        self._log = open(sentences_path(transcript_file), "w", encoding="utf-8")
+
+    def add(self, text, begin_time=0, end_time=0):
+        """
+        追加一个句子
+
+        Args:
+            text: 句子文本
+            begin_time: 句子开始时间（毫秒）
+            end_time: 句子结束时间（毫秒）
+        """
+        if self.count:
+            self._text.write(self.separator)
+        self._text.write(text)
+        self._text.flush()
+
+        record = {"index": self.count, "begin_time": begin_time, "end_time": end_time, "text": text}
+        self._log.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._log.flush()
+        self.count += 1
+
+    def close(self):
+        """关闭文件"""
+        for f in (self._text, self._log):
+            if not f.closed:
+                f.close()
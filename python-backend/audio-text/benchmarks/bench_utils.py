@@ -0,0 +1,38 @@
+"""
+性能测试公共函数 - 生成样例文本、计时
+"""
+import time
+import random
+
+# 生成测试文本用的短语
+PHRASES = [
+    "欢迎来到直播间", "今天给大家带来一款新品", "这款面霜的保湿效果特别好", "家人们看一下这个质地",
+    "原价三百九十九元", "今天直播间只要一百九十九", "限时限量抢完就没有了", "已经有很多姐妹回购了",
+    "敏感肌也可以放心使用", "我们支持七天无理由退换", "点击下方小黄车就可以下单", "关注主播不迷路",
+    "这个成分是从植物里提取的", "早晚各用一次效果更好", "库存只剩最后五十单", "有问题可以在评论区留言",
+    "我们和品牌方谈了很久才拿到这个价格", "买两件再送一个旅行装", "夏天用也不会觉得油腻", "包装设计也很高级"
+]
+
+
+def generate_text(chars, seed=42):
+    """随机拼接短语，生成指定字数的文本"""
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < chars:
+        phrase = rng.choice(PHRASES) + rng.choice(["，", "。", "！", "？"])
+        parts.append(phrase)
+        length += len(phrase)
+    return "".join(parts)
+
+
+def timed(func, repeat):
+    """重复执行，返回(最短耗时, 结果)"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
@@ -0,0 +1,87 @@
+"""
+分段性能测试 - 对比原逐字符拼接的分段实现与基于下标区间的TextSegmenter
+
+使用方法:
+    python benchmarks/segmentation_benchmark.py [--input transcript.txt] [--mb 1]
+
+不指定--input时随机生成指定大小（UTF-8编码）的直播转写文本。
+"""
+import os
+import sys
+import argparse
+
+# 添加audio-text目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from text_processing.segmentation import TextSegmenter, iter_sentence_spans
+from bench_utils import generate_text, timed
+
+
+def legacy_segment_by_meaning(text, min_segment_length=50, max_segment_length=500):
+    """原text_processing/segmenter.py中的实现（逐字符拼接句子和分段），作为对比基准"""
+    segments = []
+    current_segment = ""
+
+    sentences = []
+    temp = ""
+    for char in text:
+        temp += char
+        if char in ['。', '！', '？', '…', '.', '!', '?']:
+            sentences.append(temp)
+            temp = ""
+    if temp:
+        sentences.append(temp)
+
+    for sentence in sentences:
+        if len(current_segment) + len(sentence) <= max_segment_length:
+            current_segment += sentence
+        else:
+            if current_segment and len(current_segment) >= min_segment_length:
+                segments.append(current_segment)
+            if len(sentence) > max_segment_length:
+                for i in range(0, len(sentence), max_segment_length):
+                    segment = sentence[i:i + max_segment_length]
+                    if len(segment) >= min_segment_length:
+                        segments.append(segment)
+            else:
+                current_segment = sentence
+
+    if current_segment and len(current_segment) >= min_segment_length:
+        segments.append(current_segment)
+    return segments
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="分段性能测试")
+    parser.add_argument("--input", "-i", help="转写文本文件，不指定则随机生成")
+    parser.add_argument("--mb", type=float, default=1.0, help="随机生成文本的大小（MB），默认1")
+    parser.add_argument("--repeat", type=int, default=3, help="每种方式重复次数，取最短耗时，默认3")
+    args = parser.parse_args()
+
+    if args.input:
+        with open(args.input, "r", encoding="utf-8") as f:
+            text = f.read()
+    else:
+        # 中文字符UTF-8编码为3字节
+        text = generate_text(int(args.mb * 1024 * 1024 / 3))
+    print(f"文本: {len(text)} 字符，{len(text.encode('utf-8')) / 1024 / 1024:.2f} MB")
+
+    segmenter = TextSegmenter()
+
+    legacy_time, expected = timed(lambda: legacy_segment_by_meaning(text), args.repeat)
+    print(f"原实现（逐字符拼接）: {legacy_time:.3f}秒，{len(expected)} 个分段")
+
+    sentence_time, sentences = timed(lambda: sum(1 for _ in iter_sentence_spans(text)), args.repeat)
+    print(f"分句（下标区间）:     {sentence_time:.3f}秒，{sentences} 个句子")
+
+    span_time, result = timed(lambda: segmenter.segment_by_meaning(text), args.repeat)
+    print(f"分段（下标区间）:     {span_time:.3f}秒，加速 {legacy_time / span_time:.2f}x，结果一致: {result == expected}")
+
+    # 惰性分段：取到第一个分段的耗时与文本长度无关
+    first_time, _ = timed(lambda: next(segmenter.iter_segments(text)), args.repeat)
+    print(f"惰性分段取第一个分段: {first_time * 1000:.3f}毫秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+标签提取性能测试 - 对比逐段调用extract_tags与批量extract_tags_batch（单进程/多进程）
+
+使用方法:
+    python benchmarks/tagging_benchmark.py [--input transcript.txt] [--chars 100000] [--workers 4]
+
+不指定--input时随机生成指定字数的直播转写文本。
+"""
+import os
+import sys
+import argparse
+
+# 添加audio-text目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from text_processing.segmenter import TextSegmenter
+from text_processing.tagger import TextTagger
+from text_processing.jieba_loader import warm_up
+from utils.config import TAGGING_WORKERS, TAGGING_PARALLEL_MIN_SEGMENTS, TAGGING_PARALLEL_MIN_CHARS
+from bench_utils import generate_text, timed
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="标签提取性能测试")
+    parser.add_argument("--input", "-i", help="转写文本文件，不指定则随机生成")
+    parser.add_argument("--chars", type=int, default=100000, help="随机生成的字数，默认100000")
+    parser.add_argument("--workers", "-w", type=int, default=os.cpu_count() or 1, help="多进程分词的进程数，默认为CPU核数")
+    parser.add_argument("--repeat", type=int, default=3, help="每种方式重复次数，取最短耗时，默认3")
+    args = parser.parse_args()
+
+    if args.input:
+        with open(args.input, "r", encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = generate_text(args.chars)
+
+    warm_up()
+    segments = TextSegmenter().segment_by_meaning(text)
+    tagger = TextTagger()
+    print(f"文本: {len(text)} 字符，{len(segments)} 个分段，CPU核数: {os.cpu_count()}")
+
+    loop_time, expected = timed(lambda: [tagger.extract_tags(segment) for segment in segments], args.repeat)
+    print(f"逐段提取:           {loop_time:.3f}秒")
+
+    batch_time, result = timed(lambda: tagger.extract_tags_batch(segments, workers=1), args.repeat)
+    print(f"批量提取（单进程）: {batch_time:.3f}秒，加速 {loop_time / batch_time:.2f}x，结果一致: {result == expected}")
+
+    if args.workers > 1:
+        parallel_time, result = timed(lambda: tagger.extract_tags_batch(segments, workers=args.workers), args.repeat)
+        print(f"批量提取（{args.workers}进程）: {parallel_time:.3f}秒，加速 {loop_time / parallel_time:.2f}x，结果一致: {result == expected}")
+
+    # 按TAGGING_WORKERS和阈值配置自动选择时，这个批次实际使用的进程数
+    auto_workers = tagger.tokenize_workers(segments)
+    print(f"按配置自动选择:     {auto_workers}进程"
+          f"（TAGGING_WORKERS={TAGGING_WORKERS}，阈值 {TAGGING_PARALLEL_MIN_SEGMENTS} 个分段且 {TAGGING_PARALLEL_MIN_CHARS} 字符）")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,11 @@ import sys
 import json
 import argparse
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from dotenv import load_dotenv
 
-from ai_generation.content_creator import ContentCreator
+from ai_generation.content_creator import get_content_creator
 
 def parse_args():
     """解析命令行参数"""
@@ -19,6 +20,66 @@ def parse_args():
     parser.add_argument('--num', '-n', type=int, help='生成的话术数量', default=10)
     return parser.parse_args()
 
+def generate_scripts(text, num, output_file, creator=None, on_progress=None):
+    """
+    并发生成多份话术并定期保存（并发数和请求速率受共享生成客户端限制）
+    
+    Args:
+        text: 原始文本
+        num: 生成的话术数量
+        output_file: 输出文件路径
+        creator: 内容创作器，None表示使用进程内共享的创作器
+        on_progress: 每完成一份后的回调，参数为(已完成数量, 总数)
+        
+    Returns:
+        话术列表，第一项为原始文本
+    """
+    creator = creator or get_content_creator()
+    
+    # 添加原始文本作为第一项
+    original = {
+        "id": 0,
+        "type": "原始文本",
+        "content": text
+    }
+    generated = {}
+    
+    def save():
+        scripts = [original] + [generated[i] for i in sorted(generated)]
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(scripts, f, ensure_ascii=False, indent=2)
+        return scripts
+    
+    max_workers = max(1, min(num, getattr(creator.client, "max_concurrency", num)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # 同一提示词重复请求是为了得到不同的话术，不能使用生成结果缓存
+        futures = {executor.submit(creator.generate_script, text, use_cache=False): i for i in range(num)}
+        
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            try:
+                generated[i] = {
+                    "id": i + 1,
+                    "type": f"生成话术 {i+1}",
+                    "content": future.result()
+                }
+                
+                # 输出进度
+                print(f"已生成话术 {done}/{num}")
+                
+            except Exception as e:
+                print(f"生成第{i+1}份话术时出错: {str(e)}")
+            
+            if on_progress:
+                on_progress(done, num)
+            
+            # 每完成5份保存一次
+            if done % 5 == 0 or done == num:
+                save()
+                print(f"已保存当前进度到 {output_file}")
+    
+    return save()
+
 def main():
     # 加载环境变量
     load_dotenv()
@@ -65,44 +126,9 @@ def main():
     print(f"将生成 {args.num} 份话术")
     print(f"输出文件: {args.output}")
     
-    # 创建内容创作器
+    # 使用共享的内容创作器生成话术
     try:
-        creator = ContentCreator()
-        
-        # 生成话术
-        scripts = []
-        
-        # 添加原始文本作为第一项
-        scripts.append({
-            "id": 0,
-            "type": "原始文本",
-            "content": text
-        })
-        
-        for i in range(args.num):
-            try:
-                # 生成话术
-                script = creator.generate_script(text)
-                
-                # 添加到结果列表
-                scripts.append({
-                    "id": i + 1,
-                    "type": f"生成话术 {i+1}",
-                    "content": script
-                })
-                
-                # 输出进度
-                print(f"已生成话术 {i+1}/{args.num}")
-                
-                # 每生成5份保存一次
-                if (i + 1) % 5 == 0 or i + 1 == args.num:
-                    # 保存到输出文件
-                    with open(args.output, 'w', encoding='utf-8') as f:
-                        json.dump(scripts, f, ensure_ascii=False, indent=2)
-                    print(f"已保存当前进度到 {args.output}")
-                    
-            except Exception as e:
-                print(f"生成第{i+1}份话术时出错: {str(e)}")
+        scripts = generate_scripts(text, args.num, args.output)
         
         print(f"\n成功生成 {len(scripts)-1} 份话术:")
         for i, script in enumerate(scripts):
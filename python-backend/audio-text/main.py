@@ -48,9 +48,9 @@ try:
     from utils.config import check_config
     from audio_processing.recorder import AudioRecorder
     from audio_processing.speech_to_text import SpeechToText
-    from text_processing.segmenter import TextSegmenter
+    from text_processing.segmenter import TextSegmenter, StreamingSegmenter
     from text_processing.tagger import TextTagger
-    from ai_generation.content_creator import ContentCreator
+    from ai_generation.content_creator import get_content_creator
 except ImportError as e:
     print(f"导入模块失败: {str(e)}")
     print("请确保已安装所有依赖: pip install -r requirements.txt")
@@ -126,7 +126,7 @@ def create_content(args):
     with open(args.input, 'r', encoding='utf-8') as f:
         segments = json.load(f)
     
-    creator = ContentCreator()
+    creator = get_content_creator()
     results, output_file = creator.process_segments(segments, args.output)
     print(f"创作结果已保存到: {output_file}")
     return results, output_file
@@ -148,9 +148,15 @@ def process_all(args):
     recorder = AudioRecorder(output_dir=output_dir)
     audio_file = recorder.record_from_douyin(args.duration)
     
-    # 转写音频
+    # 转写音频，识别出的句子实时分段，确定的段落立即开始AI创作
     stt = SpeechToText()
-    text, text_file = stt.transcribe_file(audio_file, os.path.join(output_dir, "transcript.txt"))
+    segment_file = os.path.join(output_dir, "segments.json")
+    segmenter = StreamingSegmenter(output_file=segment_file)
+    transcription = segmenter.start(stt.transcribe_file, audio_file, os.path.join(output_dir, "transcript.txt"))
+    
+    creator = get_content_creator()
+    results, result_file = creator.process_segments(segmenter.iter_segments(), os.path.join(output_dir, "generated.json"))
+    text, text_file = transcription.result()
     
     # 检查转写结果是否有内容
     if not text or text.strip() == "":
@@ -158,21 +164,14 @@ def process_all(args):
         print(f"转写文件: {text_file}")
         return None, None
     
-    # 分段处理
-    segmenter = TextSegmenter()
-    segments, segment_file = segmenter.process_text(text, os.path.join(output_dir, "segments.json"))
-    
     # 检查分段结果是否有内容
+    segments = segmenter.segments
     if not segments or len(segments) == 0:
         print(f"\n警告：分段结果为空，无法进行内容创作")
         print(f"转写文件: {text_file}")
         print(f"分段文件: {segment_file}")
         return segments, segment_file
     
-    # AI创作
-    creator = ContentCreator()
-    results, result_file = creator.process_segments(segments, os.path.join(output_dir, "generated.json"))
-    
     print(f"\n处理完成！所有输出文件已保存到: {output_dir}")
     print(f"音频文件: {audio_file}")
     print(f"转写文件: {text_file}")
@@ -191,30 +190,29 @@ def process_from_file(args):
         if not os.path.exists(args.output_dir):
             os.makedirs(args.output_dir)
         
-        # 1. 语音转文字
+        # 1. 语音转文字，识别出的句子实时分段（2），确定的段落立即开始内容创作（3）
         transcriber = SpeechToText()
         transcript_file = os.path.join(args.output_dir, "transcript.txt")
-        transcript = transcriber.transcribe_file(args.input, transcript_file)
+        segments_file = os.path.join(args.output_dir, "segments.json")
+        segmenter = StreamingSegmenter(output_file=segments_file)
+        transcription = segmenter.start(transcriber.transcribe_file, args.input, transcript_file)
+        
+        print(f"🤖 转写、分段和内容创作同时进行...")
+        creator = get_content_creator()
+        results, output_file = creator.process_segments(
+            segmenter.iter_segments(),
+            os.path.join(args.output_dir, "generated.json"),
+            max_workers=getattr(args, "workers", None)
+        )
         
+        transcript, _ = transcription.result()
         if not transcript:
             print("处理失败: 语音转写结果为空")
             return False
         
         print(f"🔊 语音转写完成，共 {len(transcript)} 字符")
-        
-        # 2. 文本分段
-        print(f"📋 开始文本分段...")
-        segmenter = TextSegmenter()
-        segments, segments_file = segmenter.process_text(transcript, os.path.join(args.output_dir, "segments.json"))
-        
         print(f"分段结果已保存到: {segments_file}")
-        print(f"📋 文本分段完成，共 {len(segments)} 个段落")
-        
-        # 3. 内容创作
-        print(f"🤖 开始内容创作...")
-        creator = ContentCreator()
-        results, output_file = creator.process_segments(segments, os.path.join(args.output_dir, "generated.json"))
-        
+        print(f"📋 文本分段完成，共 {len(segmenter.segments)} 个段落")
         print(f"创作结果已保存到: {output_file}")
         print(f"🤖 内容创作完成，共生成 {len(results)} 个内容")
         
@@ -240,6 +238,7 @@ def main():
     process_parser = subparsers.add_parser("process-file", help="处理音频文件")
     process_parser.add_argument("--input", "-i", required=True, help="输入音频文件路径")
     process_parser.add_argument("--output-dir", "-o", help="输出目录")
+    process_parser.add_argument("--workers", "-w", type=int, help="同时创作的段落数，默认使用SEGMENT_WORKERS配置")
     
     # 分段子命令
     segment_parser = subparsers.add_parser("segment", help="对文本进行分段")
@@ -250,6 +249,7 @@ def main():
     create_parser = subparsers.add_parser("create", help="根据分段生成内容")
     create_parser.add_argument("--input", "-i", required=True, help="输入分段JSON文件路径")
     create_parser.add_argument("--output", "-o", required=True, help="输出创作JSON文件路径")
+    create_parser.add_argument("--workers", "-w", type=int, help="同时创作的段落数，默认使用SEGMENT_WORKERS配置")
     
     # 解析参数
     args = parser.parse_args()
@@ -292,8 +292,8 @@ def main():
         with open(args.input, 'r', encoding='utf-8') as f:
             segments = json.load(f)
         
-        creator = ContentCreator()
-        results = creator.process_segments(segments)
+        creator = get_content_creator()
+        results, _ = creator.process_segments(segments, max_workers=args.workers)
         
         # 保存创作结果
         with open(args.output, 'w', encoding='utf-8') as f:
@@ -66,161 +66,85 @@ def convert_mp4_to_wav(mp4_file, wav_file):
         return False
 
 def process_audio_file(audio_file, output_dir):
-    """处理音频文件（语音转文字、分段、创作）"""
-    cmd = [
-        sys.executable,
-        "main.py",
-        "process-file",
-        "--input", audio_file,
-        "--output-dir", output_dir
-    ]
+    """
+    处理音频文件（语音转文字、分段、创作）
+    
+    在当前进程内执行，jieba词典、NLS Token和生成客户端的连接池在各文件之间复用，
+    不再为每个文件启动一个main.py子进程重新加载
+    """
+    from audio_processing.speech_to_text import SpeechToText
+    from text_processing.segmenter import StreamingSegmenter
+    from ai_generation.content_creator import get_content_creator
     
     print(f"\n📝 处理文件: {os.path.basename(audio_file)}")
-    print(f"1️⃣ 语音转写中... ", end="", flush=True)
+    os.makedirs(output_dir, exist_ok=True)
+    transcript_file = os.path.join(output_dir, "transcript.txt")
+    stage = "语音转写"
     
     try:
-        # 使用Popen捕获实时输出
-        process = subprocess.Popen(
-            cmd, 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.PIPE,
-            text=True, 
-            bufsize=1,
-            universal_newlines=True
-        )
+        # 语音转写的同时实时分段，确定的段落立即开始内容创作
+        print(f"🔄 语音转写、文本分段和内容创作中... ", end="", flush=True)
+        segmenter = StreamingSegmenter(output_file=os.path.join(output_dir, "segments.json"))
+        transcription = segmenter.start(SpeechToText().transcribe_file, audio_file, transcript_file)
+        stage = "内容创作"
+        get_content_creator().process_segments(segmenter.iter_segments(), os.path.join(output_dir, "generated.json"))
         
-        # 实时处理输出
-        for line in process.stdout:
-            # 如果是进度信息，直接输出到终端
-            if "音频转写进度" in line:
-                print(f"\r1️⃣ {line.strip()}", end="", flush=True)
-            # 如果是分段信息
-            elif "文本分段" in line:
-                print(f"\r2️⃣ 文本分段中... ", end="", flush=True)
-            # 如果是创作信息
-            elif "内容创作" in line:
-                print(f"\r3️⃣ 内容创作中... ", end="", flush=True)
+        # 1. 语音转文字
+        stage = "语音转写"
+        transcript, _ = transcription.result()
+        if not transcript:
+            raise ValueError("语音转写结果为空")
+        print(f"\r1️⃣ 语音转写完成，共 {len(transcript)} 字符 ✅")
         
-        # 等待进程结束
-        process.wait()
+        # 2. 文本分段
+        print(f"2️⃣ 文本分段完成，共 {len(segmenter.segments)} 个段落 ✅")
+        
+        # 3. 内容创作
+        print(f"3️⃣ 内容创作完成 ✅")
+        
+        print(f"✅ 文件 {os.path.basename(audio_file)} 处理成功")
+        return True
         
-        # 检查返回码
-        if process.returncode == 0:
-            print("\r1️⃣ 语音转写完成 ✅")
-            print(f"2️⃣ 文本分段完成 ✅")
-            print(f"3️⃣ 内容创作完成 ✅")
-            print(f"✅ 文件 {os.path.basename(audio_file)} 处理成功")
-            return True
-        else:
-            stderr = process.stderr.read()
-            print("\r1️⃣ 语音转写失败 ❌")
-            
-            # 将错误信息写入日志文件
-            error_log = os.path.join(output_dir, "error.log")
-            with open(error_log, 'w', encoding='utf-8') as f:
-                f.write(f"命令: {' '.join(cmd)}\n")
-                f.write(f"错误码: {process.returncode}\n")
-                f.write(f"标准输出:\n{' '.join([line for line in process.stdout])}\n")
-                f.write(f"错误输出:\n{stderr}\n")
-            
-            print(f"❌ 文件 {os.path.basename(audio_file)} 处理失败")
-            print(f"错误日志已保存到: {error_log}")
-            
-            # 检查是否有部分处理结果
-            transcript_file = os.path.join(output_dir, "transcript.txt")
-            if os.path.exists(transcript_file) and os.path.getsize(transcript_file) > 0:
-                print(f"注意: 转写结果已保存到 {transcript_file}，但后续处理失败")
-                
-                # 尝试继续处理
-                try:
-                    print("尝试继续处理转写结果...")
-                    with open(transcript_file, 'r', encoding='utf-8') as f:
-                        text = f.read()
-                    
-                    if text and len(text) > 0:
-                        # 手动调用分段和创作
-                        print(f"2️⃣ 文本分段中... ", end="", flush=True)
-                        segment_cmd = [
-                            sys.executable,
-                            "main.py",
-                            "segment",
-                            "--input", transcript_file,
-                            "--output", os.path.join(output_dir, "segments.json")
-                        ]
-                        
-                        try:
-                            subprocess.run(segment_cmd, check=True)
-                            print("✅")
-                            
-                            # 继续处理创作
-                            print(f"3️⃣ 内容创作中... ", end="", flush=True)
-                            create_cmd = [
-                                sys.executable,
-                                "main.py",
-                                "create",
-                                "--input", os.path.join(output_dir, "segments.json"),
-                                "--output", os.path.join(output_dir, "generated.json")
-                            ]
-                            
-                            subprocess.run(create_cmd, check=True)
-                            print("✅")
-                            print(f"✅ 内容创作成功")
-                            return True
-                        except subprocess.CalledProcessError as e2:
-                            print("❌")
-                            print(f"❌ 继续处理失败: {str(e2)}")
-                except Exception as e3:
-                    print("❌")
-                    print(f"❌ 尝试继续处理时出错: {str(e3)}")
-            
-            return False
     except Exception as e:
-        print("❌")
-        print(f"❌ 处理失败: {str(e)}")
+        import traceback
+        print(f"\r❌ {stage}失败: {str(e)}")
+        
+        # 将错误信息写入日志文件
+        error_log = os.path.join(output_dir, "error.log")
+        with open(error_log, 'w', encoding='utf-8') as f:
+            f.write(f"文件: {audio_file}\n")
+            f.write(f"失败阶段: {stage}\n")
+            f.write(f"错误详情:\n{traceback.format_exc()}\n")
+        
+        print(f"❌ 文件 {os.path.basename(audio_file)} 处理失败")
+        print(f"错误日志已保存到: {error_log}")
+        
+        # 转写成功但后续处理失败时，转写结果仍然可以用来生成话术
+        if stage != "语音转写" and os.path.exists(transcript_file):
+            print(f"注意: 转写结果已保存到 {transcript_file}，但后续处理失败")
         return False
 
 def generate_multiple_scripts(transcript_file, output_file, num_scripts=10):
-    """生成多份话术"""
-    cmd = [
-        sys.executable,
-        "generate_multiple_scripts.py",
-        "--input", transcript_file,
-        "--output", output_file,
-        "--num", str(num_scripts)
-    ]
+    """生成多份话术（在当前进程中执行，所有文件共用一个生成客户端和连接池）"""
+    from generate_multiple_scripts import generate_scripts
     
     print(f"\n🔄 生成{num_scripts}份话术...")
     
     try:
+        with open(transcript_file, 'r', encoding='utf-8') as f:
+            text = f.read().strip()
+        if not text:
+            print("❌ 生成话术失败: 转写结果为空")
+            return False
+        
         # 显示进度条
         with tqdm.tqdm(total=num_scripts, desc="生成话术", unit="份") as pbar:
-            # 创建进程
-            process = subprocess.Popen(
-                cmd, 
-                stdout=subprocess.PIPE, 
-                stderr=subprocess.PIPE, 
-                text=True,
-                bufsize=1,
-                universal_newlines=True
+            generate_scripts(
+                text,
+                num_scripts,
+                output_file,
+                on_progress=lambda done, total: pbar.update(done - pbar.n)
             )
-            
-            # 实时更新进度条
-            for line in process.stdout:
-                if "已生成话术" in line:
-                    try:
-                        current = int(line.split("已生成话术")[1].split("/")[0].strip())
-                        pbar.update(current - pbar.n)
-                    except:
-                        pass
-            
-            # 等待进程结束
-            process.wait()
-            
-            # 检查返回码
-            if process.returncode != 0:
-                stderr = process.stderr.read()
-                print(f"❌ 生成话术失败: {stderr}")
-                return False
                 
         print(f"✅ 成功生成{num_scripts}份话术")
         return True
@@ -271,6 +195,10 @@ def main():
     """主函数"""
     args = parse_args()
     
+    # 在转写第一个文件的同时后台加载jieba词典
+    from text_processing.jieba_loader import warm_up_in_background
+    warm_up_in_background()
+    
     # 设置输出目录
     output_dir = args.output_dir or "output"
     if not os.path.exists(output_dir):
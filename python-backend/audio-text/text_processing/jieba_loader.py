@@ -0,0 +1,75 @@
+"""
+jieba预加载模块 - 将前缀词典序列化缓存到固定位置，并在服务启动时预热，避免首次分词/提取标签时加载词典的延迟
+"""
+import os
+import time
+import logging
+import threading
+
+import jieba
+import jieba.analyse
+import jieba.posseg
+
+from utils.config import JIEBA_CACHE_FILE
+
+# 配置日志
+logger = logging.getLogger('jieba_loader')
+
+# 预热用的文本，覆盖分词、词性标注和TF-IDF关键词提取
+WARM_UP_TEXT = "今天直播间给大家带来一款好用的产品，限时优惠，欢迎大家下单。"
+
+_warmed_up = False
+_warm_up_lock = threading.Lock()
+
+
+def configure_cache(cache_file=JIEBA_CACHE_FILE):
+    """
+    指定jieba前缀词典的缓存文件（默认位于系统临时目录，可能被清理或在容器间不共享）
+
+    Args:
+        cache_file: 缓存文件路径，为空时使用jieba默认位置
+    """
+    if not cache_file:
+        return
+    cache_dir = os.path.dirname(os.path.abspath(cache_file))
+    os.makedirs(cache_dir, exist_ok=True)
+    jieba.dt.tmp_dir = cache_dir
+    jieba.dt.cache_file = os.path.basename(cache_file)
+
+
+def warm_up():
+    """
+    加载jieba词典并预热分词、词性标注和关键词提取，只执行一次（线程安全）
+
+    在多进程Worker中应在fork子进程之前调用，使子进程通过写时复制共享词典内存
+
+    Returns:
+        本次预热耗时（秒），已预热过时返回0
+    """
+    global _warmed_up
+    with _warm_up_lock:
+        if _warmed_up:
+            return 0.0
+
+        start_time = time.time()
+        configure_cache()
+        jieba.initialize()
+        jieba.analyse.extract_tags(WARM_UP_TEXT, topK=5)
+        list(jieba.posseg.cut(WARM_UP_TEXT))
+        _warmed_up = True
+
+    elapsed = time.time() - start_time
+    logger.info(f"jieba预热完成，耗时 {elapsed:.2f}秒")
+    return elapsed
+
+
+def warm_up_in_background():
+    """
+    在后台线程中预热，不阻塞服务启动
+
+    Returns:
+        预热线程
+    """
+    thread = threading.Thread(target=warm_up, name="jieba-warm-up", daemon=True)
+    thread.start()
+    return thread
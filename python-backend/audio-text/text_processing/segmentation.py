@@ -1,144 +1,350 @@
 """
-文本分段处理模块
+文本分段处理模块 - 基于下标区间的线性时间分句和分段（text_processing.segmenter 中的TextSegmenter即本模块的实现）
 """
 import re
 import os
 import json
-import jieba
-import jieba.analyse
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+
+from text_processing.tagger import TextTagger
+
+# 配置日志
+logger = logging.getLogger('segmentation')
+
+# 句末标点（连续的标点归入同一句；数字之间的"."视为小数点，不断句）
+SENTENCE_END_PATTERN = re.compile(r'(?:[。！？…!?]|(?<!\d)\.(?!\d))+')
+
+
+def iter_sentence_spans(text, start=0, end=None):
+    """
+    按句末标点切分句子，返回句子在原文中的下标区间，不复制字符串
+
+    Args:
+        text: 待分句文本
+        start: 起始下标
+        end: 结束下标，None表示文本末尾
+
+    Yields:
+        (句子起始下标, 句子结束下标)，句子包含句末标点
+    """
+    end = len(text) if end is None else end
+    for match in SENTENCE_END_PATTERN.finditer(text, start, end):
+        yield start, match.end()
+        start = match.end()
+    # 没有句末标点的最后一句
+    if start < end:
+        yield start, end
+
 
 class TextSegmenter:
     """文本分段处理类"""
-    
+
     def __init__(self, min_segment_length=50, max_segment_length=500):
         """
         初始化文本分段器
-        
+
         Args:
-            min_segment_length: 最小分段长度
-            max_segment_length: 最大分段长度
+            min_segment_length: 最小分段长度（字符数），较短的分段会被丢弃
+            max_segment_length: 最大分段长度（字符数）
         """
         self.min_segment_length = min_segment_length
         self.max_segment_length = max_segment_length
-        
-        # 加载结巴分词词典
-        jieba.initialize()
-    
-    def segment_by_meaning(self, text):
+
+    def iter_segment_spans(self, text):
         """
-        按照语义进行文本分段
-        
+        将句子合并为分段，返回分段在原文中的下标区间
+
+        连续的句子合并到不超过最大长度；单个句子超过最大长度时按最大长度切分；
+        短于最小长度的分段被丢弃
+
         Args:
             text: 待分段文本
-            
-        Returns:
-            分段后的文本列表
+
+        Yields:
+            (分段起始下标, 分段结束下标)
+        """
+        max_length = self.max_segment_length
+        min_length = self.min_segment_length
+        seg_start = seg_end = None
+
+        for start, end in iter_sentence_spans(text):
+            if seg_start is None:
+                if end - start <= max_length:
+                    seg_start, seg_end = start, end
+                    continue
+            elif end - seg_start <= max_length:
+                seg_end = end
+                continue
+            else:
+                if seg_end - seg_start >= min_length:
+                    yield seg_start, seg_end
+                seg_start = seg_end = None
+
+            if end - start > max_length:
+                # 单个句子超过最大长度，按字符数切分
+                for piece_start in range(start, end, max_length):
+                    piece_end = min(piece_start + max_length, end)
+                    if piece_end - piece_start >= min_length:
+                        yield piece_start, piece_end
+            else:
+                seg_start, seg_end = start, end
+
+        # 最后一个分段
+        if seg_start is not None and seg_end - seg_start >= min_length:
+            yield seg_start, seg_end
+
+    def iter_segments(self, text):
         """
-        # 首先按句子分割
-        sentences = self._split_into_sentences(text)
-        
-        segments = []
-        current_segment = ""
-        
-        for sentence in sentences:
-            # 如果当前分段加上新句子超过最大长度，则保存当前分段
-            if len(current_segment) + len(sentence) > self.max_segment_length and len(current_segment) >= self.min_segment_length:
-                segments.append(current_segment.strip())
-                current_segment = ""
-            
-            current_segment += sentence
-            
-            # 检查是否是段落结束（如果句子以句号、问号、感叹号结束，且当前分段长度已达到最小长度）
-            if (sentence.strip().endswith(("。", "！", "？", ".", "!", "?")) and 
-                len(current_segment) >= self.min_segment_length):
-                segments.append(current_segment.strip())
-                current_segment = ""
-        
-        # 添加最后一个分段（如果有）
-        if current_segment.strip():
-            segments.append(current_segment.strip())
-        
-        return segments
-    
-    def _split_into_sentences(self, text):
-        """
-        将文本分割为句子
-        
+        逐个返回分段文本（惰性计算）
+
+        Args:
+            text: 待分段文本
+
+        Yields:
+            分段文本
+        """
+        for start, end in self.iter_segment_spans(text):
+            yield text[start:end]
+
+    def segment_by_meaning(self, text):
+        """
+        按意思分段文本
+
         Args:
-            text: 待分割文本
-            
+            text: 要分段的文本
+
         Returns:
-            句子列表
-        """
-        # 使用正则表达式分割句子
-        pattern = r'([。！？\.!?])'
-        sentences = []
-        
-        # 分割文本
-        parts = re.split(pattern, text)
-        
-        # 重新组合句子（保留标点符号）
-        for i in range(0, len(parts), 2):
-            if i + 1 < len(parts):
-                sentences.append(parts[i] + parts[i+1])
-            else:
-                sentences.append(parts[i])
-        
-        return sentences
-    
+            分段后的文本列表
+        """
+        return list(self.iter_segments(text))
+
+    # 兼容旧的调用方式
+    segment = segment_by_meaning
+
     def add_tags(self, segments):
         """
-        为分段文本添加标签
-        
+        为分段添加标签
+
         Args:
             segments: 分段文本列表
-            
+
         Returns:
-            带标签的分段文本列表，格式为[{text: "...", tags: ["tag1", "tag2", ...]}]
-        """
-        tagged_segments = []
-        
-        for segment in segments:
-            # 使用结巴分词提取关键词作为标签
-            tags = jieba.analyse.extract_tags(segment, topK=5)
-            
-            tagged_segments.append({
-                "text": segment,
-                "tags": tags
-            })
-        
-        return tagged_segments
-    
+            带标签的分段列表，格式为[{text: "...", tags: ["tag1", "tag2", ...]}]
+        """
+        # 批量提取：并行分词，整个批次一次性计算TF-IDF
+        return TextTagger(topK=5).tag_segments(segments)
+
     def process_text(self, text, output_file=None):
         """
         处理文本：分段并添加标签
-        
+
         Args:
-            text: 待处理文本
+            text: 要处理的文本
             output_file: 输出文件路径，None表示自动生成
-            
+
         Returns:
-            (处理后的分段文本, 输出文件路径)
+            (处理结果, 输出文件路径)
         """
         # 分段
         segments = self.segment_by_meaning(text)
-        
+
         # 添加标签
         tagged_segments = self.add_tags(segments)
-        
+
         # 如果未指定输出文件，则自动生成
         if output_file is None:
             output_dir = "segments"
-            
+
             # 确保输出目录存在
             if not os.path.exists(output_dir):
                 os.makedirs(output_dir)
-                
-            output_file = os.path.join(output_dir, f"segments_{int(os.path.getmtime(output_dir))}.json")
-        
+
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_file = os.path.join(output_dir, f"segments_{timestamp}.json")
+
         # 保存处理结果
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(tagged_segments, f, ensure_ascii=False, indent=2)
-        
+
         print(f"分段结果已保存到: {output_file}")
         return tagged_segments, output_file
+
+
+class StreamingSegmenter:
+    """
+    流式分段器：逐句接收语音识别结果，分段一旦确定（再加入下一句会超过最大长度）就立即添加标签并输出，
+    使前面分段的标签提取和内容创作与后面音频的转写同时进行
+
+    分段规则与TextSegmenter相同，输入的句子按空格拼接后，得到的分段与对完整转写文本调用segment_by_meaning一致
+    """
+
+    def __init__(self, segmenter=None, tagger=None, on_segment=None, output_file=None):
+        """
+        初始化流式分段器
+
+        Args:
+            segmenter: 提供分段长度规则的TextSegmenter，None表示使用默认参数
+            tagger: 为分段提取标签的TextTagger，None表示使用TextTagger(topK=5)
+            on_segment: 每输出一个分段时调用的回调，参数为(分段序号, {text, tags})
+            output_file: 结束时保存全部分段的文件路径，None表示不保存
+        """
+        self.segmenter = segmenter or TextSegmenter()
+        self.tagger = tagger or TextTagger(topK=5)
+        self.on_segment = on_segment
+        self.output_file = output_file
+        self.segments = []  # 已输出的带标签分段
+
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._closed = False
+        # 待处理的文本只保留当前未完成的分段和未结束的句子，下标均相对于_text
+        self._text = ""
+        self._received = False  # 是否已收到过句子（之前的文本可能已全部输出并丢弃）
+        self._scan = 0  # 下一个未处理句子的起始下标
+        self._seg_start = self._seg_end = None
+
+    def add_sentence(self, text):
+        """
+        加入一句识别结果（可作为SpeechToText.transcribe的on_sentence回调），输出因此确定的分段
+
+        Args:
+            text: 句子文本，可以包含多句或没有句末标点
+        """
+        if not text:
+            return
+        with self._lock:
+            if self._closed:
+                logger.warning("流式分段器已结束，忽略新的句子")
+                return
+            # 与RecognitionSession.transcript相同，句子之间以空格拼接
+            self._text = f"{self._text} {text}" if self._received else text
+            self._received = True
+            self._advance(final=False)
+
+    def close(self, flush=True):
+        """
+        结束输入，输出最后一个分段并保存结果
+
+        Args:
+            flush: 是否输出尚未结束的最后一个分段；转写失败时传False，只保留已确定的分段
+
+        Returns:
+            全部带标签的分段列表
+        """
+        with self._lock:
+            if self._closed:
+                return self.segments
+            if flush:
+                self._advance(final=True)
+                min_length = self.segmenter.min_segment_length
+                if self._seg_start is not None and self._seg_end - self._seg_start >= min_length:
+                    self._emit(self._seg_start, self._seg_end)
+            self._closed = True
+            self._queue.put(None)
+
+        if self.output_file:
+            with open(self.output_file, 'w', encoding='utf-8') as f:
+                json.dump(self.segments, f, ensure_ascii=False, indent=2)
+            logger.info(f"分段结果已保存到: {self.output_file}")
+        return self.segments
+
+    def iter_segments(self):
+        """
+        逐个返回已确定的带标签分段，没有新分段时阻塞等待，调用close后结束
+
+        Yields:
+            {text: "...", tags: [...]}
+        """
+        while True:
+            segment = self._queue.get()
+            if segment is None:
+                return
+            yield segment
+
+    def start(self, producer, *args, **kwargs):
+        """
+        在后台线程中运行产生句子的函数（如SpeechToText.transcribe_file），结束后自动close
+
+        Args:
+            producer: 以on_sentence关键字参数接收句子回调的函数
+            *args: 传给producer的位置参数
+            **kwargs: 传给producer的关键字参数
+
+        Returns:
+            producer返回值的Future
+        """
+        future = Future()
+
+        def run():
+            try:
+                result = producer(*args, on_sentence=self.add_sentence, **kwargs)
+            except BaseException as e:
+                self.close(flush=False)
+                future.set_exception(e)
+                return
+            try:
+                self.close()
+            except BaseException as e:
+                future.set_exception(e)
+                return
+            future.set_result(result)
+
+        threading.Thread(target=run, name="streaming-segmenter", daemon=True).start()
+        return future
+
+    def _advance(self, final):
+        """按TextSegmenter.iter_segment_spans的规则处理已结束的句子，输出确定的分段"""
+        text = self._text
+        max_length = self.segmenter.max_segment_length
+        min_length = self.segmenter.min_segment_length
+
+        for start, end in iter_sentence_spans(text, self._scan):
+            # 没有句末标点的最后一句可能还会被后续识别结果延续，等待更多输入
+            if not final and end == len(text) and not SENTENCE_END_PATTERN.match(text, end - 1):
+                break
+            self._scan = end
+
+            if self._seg_start is None:
+                if end - start <= max_length:
+                    self._seg_start, self._seg_end = start, end
+                    continue
+            elif end - self._seg_start <= max_length:
+                self._seg_end = end
+                continue
+            else:
+                if self._seg_end - self._seg_start >= min_length:
+                    self._emit(self._seg_start, self._seg_end)
+                self._seg_start = self._seg_end = None
+
+            if end - start > max_length:
+                # 单个句子超过最大长度，按字符数切分
+                for piece_start in range(start, end, max_length):
+                    piece_end = min(piece_start + max_length, end)
+                    if piece_end - piece_start >= min_length:
+                        self._emit(piece_start, piece_end)
+            else:
+                self._seg_start, self._seg_end = start, end
+
+        # 丢弃已输出的文本，只保留当前分段和未处理的句子
+        keep = self._scan if self._seg_start is None else self._seg_start
+        if keep:
+            self._text = text[keep:]
+            self._scan -= keep
+            if self._seg_start is not None:
+                self._seg_start -= keep
+                self._seg_end -= keep
+
+    def _emit(self, start, end):
+        """为分段添加标签并输出"""
+        segment_text = self._text[start:end]
+        segment = {"text": segment_text, "tags": self.tagger.extract_tags(segment_text)}
+        index = len(self.segments)
+        self.segments.append(segment)
+        self._queue.put(segment)
+        logger.info(f"输出第 {index + 1} 个分段，{len(segment_text)} 字符")
+        if self.on_segment:
+            self.on_segment(index, segment)
@@ -1,8 +1,28 @@
 """
 文本标签生成模块
 """
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import jieba
 import jieba.analyse
 
+from utils.config import TAGGING_WORKERS, TAGGING_PARALLEL_MIN_SEGMENTS, TAGGING_PARALLEL_MIN_CHARS
+from text_processing.jieba_loader import warm_up
+
+# 配置日志
+logger = logging.getLogger('tagger')
+
+
+def _tokenize(text):
+    """分词（在子进程中执行，需为模块级函数）"""
+    return list(jieba.cut(text))
+
+
 class TextTagger:
     """文本标签生成类"""
     
@@ -25,6 +45,9 @@ class TextTagger:
         Returns:
             标签列表
         """
+        # 确保词典已加载（进程内只加载一次，使用持久化的词典缓存）
+        warm_up()
+        
         # 使用TF-IDF算法提取关键词
         tags = jieba.analyse.extract_tags(text, topK=self.topK)
         
@@ -39,6 +62,103 @@ class TextTagger:
         
         return tags
     
+    def extract_tags_batch(self, texts, workers=None):
+        """
+        批量提取多段文本的关键词，结果与逐段调用extract_tags一致
+        
+        TF-IDF按整个批次的词表一次性查询IDF，再用NumPy计算每段的权重。
+        分词默认在当前进程执行；配置了TAGGING_WORKERS且批次足够大时才使用多进程
+        （启动进程和传回分词结果的开销较大，10万字的转写文本上没有测得加速）
+        
+        Args:
+            texts: 文本列表
+            workers: 分词进程数，None表示按tokenize_workers的规则决定
+            
+        Returns:
+            与texts顺序一致的标签列表
+        """
+        warm_up()
+        if not texts:
+            return []
+        
+        token_lists = self._tokenize_batch(texts, workers)
+        
+        # 建立整个批次的词表，每个词只查询一次IDF和停用词
+        tfidf = jieba.analyse.default_tfidf
+        vocab = {}
+        idf = []
+        token_ids = []
+        for tokens in token_lists:
+            ids = []
+            for word in tokens:
+                index = vocab.get(word)
+                if index is None:
+                    if len(word.strip()) < 2 or word.lower() in tfidf.stop_words:
+                        index = -1
+                    else:
+                        index = len(idf)
+                        idf.append(tfidf.idf_freq.get(word, tfidf.median_idf))
+                    vocab[word] = index
+                if index >= 0:
+                    ids.append(index)
+            token_ids.append(np.array(ids, dtype=np.int64))
+        
+        words = np.empty(len(idf), dtype=object)
+        for word, index in vocab.items():
+            if index >= 0:
+                words[index] = word
+        idf = np.array(idf, dtype=np.float64)
+        
+        results = []
+        for text, ids in zip(texts, token_ids):
+            if len(ids) == 0:
+                # 提取不到关键词时按单段逻辑回退到TextRank和词性过滤
+                results.append(self.extract_tags(text))
+                continue
+            unique, first_index, counts = np.unique(ids, return_index=True, return_counts=True)
+            weights = counts * (idf[unique] / len(ids))
+            # 权重降序，权重相同时按首次出现顺序（与jieba的稳定排序一致）
+            order = np.lexsort((first_index, -weights))[:self.topK]
+            results.append(words[unique[order]].tolist())
+        
+        return results
+    
+    @staticmethod
+    def tokenize_workers(texts, workers=None):
+        """
+        批量分词实际使用的进程数
+        
+        Args:
+            texts: 文本列表
+            workers: 指定的进程数，None表示使用TAGGING_WORKERS配置（0表示按CPU核数），
+                     且分段数不少于TAGGING_PARALLEL_MIN_SEGMENTS、总字数不少于TAGGING_PARALLEL_MIN_CHARS时才启用多进程
+            
+        Returns:
+            进程数，1表示在当前进程分词
+        """
+        if workers is None:
+            workers = TAGGING_WORKERS or os.cpu_count() or 1
+            # 批次较小时启动进程和传回结果的开销大于并行带来的收益
+            if len(texts) < TAGGING_PARALLEL_MIN_SEGMENTS or sum(len(text) for text in texts) < TAGGING_PARALLEL_MIN_CHARS:
+                workers = 1
+        
+        # 多线程进程（如API服务）中fork可能继承其他线程持有的锁，此时在当前进程分词
+        if workers <= 1 or len(texts) <= 1 \
+                or "fork" not in multiprocessing.get_all_start_methods() or threading.active_count() > 1:
+            return 1
+        return min(workers, len(texts))
+    
+    def _tokenize_batch(self, texts, workers=None):
+        """分词，进程数大于1时使用多进程"""
+        workers = self.tokenize_workers(texts, workers)
+        if workers <= 1:
+            return [_tokenize(text) for text in texts]
+        
+        # fork启动的子进程直接继承已加载的词典
+        chunksize = max(1, len(texts) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as executor:
+            return list(executor.map(_tokenize, texts, chunksize=chunksize))
+    
     def tag_segments(self, segments):
         """
         为多个文本分段添加标签
@@ -49,13 +169,9 @@ class TextTagger:
         Returns:
             带标签的分段列表，格式为[{text: "...", tags: ["tag1", "tag2", ...]}]
         """
-        tagged_segments = []
-        
-        for segment in segments:
-            tags = self.extract_tags(segment)
-            tagged_segments.append({
-                "text": segment,
-                "tags": tags
-            })
+        tags_list = self.extract_tags_batch(segments)
         
-        return tagged_segments
+        return [
+            {"text": segment, "tags": tags}
+            for segment, tags in zip(segments, tags_list)
+        ]
@@ -0,0 +1,31 @@
+"""
+原子写入模块 - 先写同目录下的临时文件再重命名，读取方不会读到写了一半的文件
+"""
+import os
+import json
+import tempfile
+
+
+def atomic_write_json(path, data, file_mode=None):
+    """
+    原子写入JSON文件
+
+    Args:
+        path: 目标文件路径，所在目录需已存在
+        data: 可以JSON序列化的数据
+        file_mode: 文件权限（如0o600），None表示使用默认权限
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        if file_mode is not None:
+            os.chmod(tmp_path, file_mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
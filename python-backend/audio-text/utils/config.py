@@ -52,6 +52,94 @@ ALIYUN_APPKEY = os.getenv('ALIYUN_APPKEY')
 # 阿里云DeepSeek模型配置
 ALIYUN_DASHSCOPE_API_KEY = os.getenv('ALIYUN_DASHSCOPE_API_KEY')
 
+# 任务执行并发配置（每个阶段同时运行的最大任务数）
+TRANSCRIBE_CONCURRENCY = int(os.getenv('TRANSCRIBE_CONCURRENCY', '2'))
+TAGGING_CONCURRENCY = int(os.getenv('TAGGING_CONCURRENCY', '2'))
+GENERATION_CONCURRENCY = int(os.getenv('GENERATION_CONCURRENCY', '4'))
+
+# 音频处理流水线：转写、标签、脚本生成三个阶段通过有界队列串联，一个任务生成脚本时下一个任务可以同时转写
+# （各阶段的工作线程数是流水线中同时进行的任务数，实际执行仍受上面各阶段并发数的限制）
+AUDIO_PIPELINE_ENABLED = os.getenv('AUDIO_PIPELINE_ENABLED', 'true').lower() == 'true'
+PIPELINE_TRANSCRIBE_WORKERS = int(os.getenv('PIPELINE_TRANSCRIBE_WORKERS', str(TRANSCRIBE_CONCURRENCY)))
+PIPELINE_TAG_WORKERS = int(os.getenv('PIPELINE_TAG_WORKERS', str(TAGGING_CONCURRENCY)))
+PIPELINE_GENERATE_WORKERS = int(os.getenv('PIPELINE_GENERATE_WORKERS', str(GENERATION_CONCURRENCY)))
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '2'))  # 每个阶段等待处理的任务数上限
+
+# 文本生成客户端配置（进程内共享连接池）
+DASHSCOPE_BASE_URL = os.getenv('DASHSCOPE_BASE_URL', 'https://dashscope.aliyuncs.com/api/v1')
+GENERATION_MAX_CONCURRENCY = int(os.getenv('GENERATION_MAX_CONCURRENCY', '8'))  # 同时进行的生成请求数上限
+GENERATION_POOL_SIZE = int(os.getenv('GENERATION_POOL_SIZE', '16'))
+GENERATION_TIMEOUT = int(os.getenv('GENERATION_TIMEOUT', '120'))
+GENERATION_RATE_LIMIT = float(os.getenv('GENERATION_RATE_LIMIT', '2'))  # 每秒最多发起的生成请求数，0表示不限流
+GENERATION_RATE_BURST = int(os.getenv('GENERATION_RATE_BURST', '10'))  # 允许的突发请求数
+GENERATION_RATE_MIN = float(os.getenv('GENERATION_RATE_MIN', '0.2'))  # 被限流后自动降低速率的下限
+GENERATION_MAX_RETRIES = int(os.getenv('GENERATION_MAX_RETRIES', '4'))  # 限流、服务端错误或网络错误时的重试次数
+GENERATION_BACKOFF_BASE = float(os.getenv('GENERATION_BACKOFF_BASE', '1'))  # 重试退避的初始时间（秒），每次加倍并随机抖动
+GENERATION_BACKOFF_MAX = float(os.getenv('GENERATION_BACKOFF_MAX', '30'))
+# 多脚本生成模式：fanout 每个脚本单独请求并发生成；single 一次请求生成全部脚本后按"---"拆分
+SCRIPT_GENERATION_MODE = os.getenv('SCRIPT_GENERATION_MODE', 'fanout')
+# 段落批量创作：同时处理的段落数、单个段落失败后的重试次数、批次内每秒最多发起的请求数（0表示只受生成客户端全局限流约束）
+SEGMENT_WORKERS = int(os.getenv('SEGMENT_WORKERS', '4'))
+SEGMENT_MAX_RETRIES = int(os.getenv('SEGMENT_MAX_RETRIES', '2'))
+SEGMENT_RATE_LIMIT = float(os.getenv('SEGMENT_RATE_LIMIT', '0'))
+# 长文本摘要（map-reduce）：转写文本超过阈值时先分段并发摘要，再基于摘要生成脚本（阈值为0表示不摘要）
+SUMMARY_THRESHOLD_CHARS = int(os.getenv('SUMMARY_THRESHOLD_CHARS', '8000'))
+SUMMARY_CHUNK_CHARS = int(os.getenv('SUMMARY_CHUNK_CHARS', '3000'))
+SUMMARY_MAX_TOKENS = int(os.getenv('SUMMARY_MAX_TOKENS', '400'))
+
+# 持久化任务队列配置
+EMBEDDED_WORKERS = int(os.getenv('EMBEDDED_WORKERS', '1'))  # API进程内运行的Worker线程数，0表示只入队
+QUEUE_LEASE_SECONDS = int(os.getenv('QUEUE_LEASE_SECONDS', '300'))
+QUEUE_MAX_ATTEMPTS = int(os.getenv('QUEUE_MAX_ATTEMPTS', '3'))
+# 启动时重新扫描输出目录重建任务索引（补录旧版本Worker写入、未进入索引的任务）
+JOB_INDEX_REBUILD_ON_START = os.getenv('JOB_INDEX_REBUILD_ON_START', 'false').lower() == 'true'
+
+# 任务状态存储：状态保存在内存中，间隔STATUS_FLUSH_INTERVAL秒合并写入status.json（0表示每次立即写入）
+STATUS_FLUSH_INTERVAL = float(os.getenv('STATUS_FLUSH_INTERVAL', '0.2'))
+STATUS_CACHE_MAX_JOBS = int(os.getenv('STATUS_CACHE_MAX_JOBS', '1000'))  # 内存中保留的已结束任务数上限
+
+# 事件推送（/api/events）：保留最近的事件供断线重连补发，无事件时定期发送心跳避免连接被代理断开
+EVENTS_HISTORY_SIZE = int(os.getenv('EVENTS_HISTORY_SIZE', '200'))
+EVENTS_KEEPALIVE_SECONDS = float(os.getenv('EVENTS_KEEPALIVE_SECONDS', '15'))
+
+# 转写结果缓存配置（相同音频重复上传时直接返回缓存的转写结果）
+TRANSCRIPT_CACHE_ENABLED = os.getenv('TRANSCRIPT_CACHE_ENABLED', 'true').lower() == 'true'
+TRANSCRIPT_CACHE_DIR = os.getenv('TRANSCRIPT_CACHE_DIR', os.path.join(OUTPUT_DIR, ".transcript_cache"))
+TRANSCRIPT_CACHE_MAX_MB = int(os.getenv('TRANSCRIPT_CACHE_MAX_MB', '512'))
+
+# jieba词典配置：前缀词典缓存文件（多个进程和重启之间复用），服务启动时是否预热
+JIEBA_CACHE_FILE = os.getenv('JIEBA_CACHE_FILE', os.path.join(OUTPUT_DIR, ".jieba.cache"))
+JIEBA_WARMUP = os.getenv('JIEBA_WARMUP', 'true').lower() == 'true'
+# 批量提取标签：分词使用的进程数（默认1即不启用多进程，0表示按CPU核数），
+# 分段数和总字数都达到阈值时才启用多进程
+TAGGING_WORKERS = int(os.getenv('TAGGING_WORKERS', '1'))
+TAGGING_PARALLEL_MIN_SEGMENTS = int(os.getenv('TAGGING_PARALLEL_MIN_SEGMENTS', '1000'))
+TAGGING_PARALLEL_MIN_CHARS = int(os.getenv('TAGGING_PARALLEL_MIN_CHARS', '500000'))
+
+# 生成结果缓存配置（相同模型、提示词和参数的请求直接返回缓存结果，需要新的变体时可跳过缓存）
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+RESPONSE_CACHE_DIR = os.getenv('RESPONSE_CACHE_DIR', os.path.join(OUTPUT_DIR, ".response_cache"))
+RESPONSE_CACHE_MAX_MB = int(os.getenv('RESPONSE_CACHE_MAX_MB', '256'))
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', str(7 * 24 * 3600)))  # 有效期（秒），0表示永不过期
+
+# NLS Token配置：距过期多少秒时后台刷新；缓存文件用于多个Worker进程共享Token（留空表示不缓存到文件）
+NLS_TOKEN_REFRESH_MARGIN = int(os.getenv('NLS_TOKEN_REFRESH_MARGIN', '600'))
+NLS_TOKEN_DEFAULT_TTL = int(os.getenv('NLS_TOKEN_DEFAULT_TTL', '3600'))  # 无法获得过期时间时假定的有效期
+NLS_TOKEN_CACHE_FILE = os.getenv('NLS_TOKEN_CACHE_FILE', os.path.join(OUTPUT_DIR, ".nls_token.json"))
+
+# 音频发送完毕后等待识别结果的超时时间（秒）
+TRANSCRIBE_TIMEOUT_SECONDS = int(os.getenv('TRANSCRIBE_TIMEOUT_SECONDS', '600'))
+
+# 音频发送配置：每帧字节数（6400字节约为16kHz单声道的200ms），发送速度为实时的倍数（0表示不限速）
+ASR_FRAME_BYTES = int(os.getenv('ASR_FRAME_BYTES', '6400'))
+ASR_SEND_SPEED = float(os.getenv('ASR_SEND_SPEED', '0'))
+
+# 长音频并行转写配置（在静音处切分后多会话同时识别，1表示关闭）
+PARALLEL_TRANSCRIBE_SESSIONS = int(os.getenv('PARALLEL_TRANSCRIBE_SESSIONS', '2'))
+PARALLEL_TRANSCRIBE_MIN_SECONDS = int(os.getenv('PARALLEL_TRANSCRIBE_MIN_SECONDS', '600'))  # 超过该时长才切分
+PARALLEL_CHUNK_SECONDS = int(os.getenv('PARALLEL_CHUNK_SECONDS', '300'))
+SILENCE_SEARCH_SECONDS = int(os.getenv('SILENCE_SEARCH_SECONDS', '20'))  # 在目标切分点前后搜索静音的范围
+
 def check_config(strict=False):
     """
     检查配置是否完整
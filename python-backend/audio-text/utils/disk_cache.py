@@ -0,0 +1,176 @@
+"""
+磁盘缓存模块 - 按键分片存储JSON条目，原子写入，支持有效期和按最近访问时间（LRU）淘汰，
+转写结果缓存和生成结果缓存均基于此实现
+"""
+import os
+import json
+import time
+import logging
+import threading
+
+from utils.atomic_write import atomic_write_json
+
+# 配置日志
+logger = logging.getLogger('disk_cache')
+
+# 距上次扫描超过此时间（秒）时重新扫描缓存目录，以计入其他进程写入的条目
+RESCAN_INTERVAL = 300
+
+
+class DiskCache:
+    """
+    JSON条目的磁盘缓存
+
+    每个条目一个文件（缓存目录/键的前两位/键.json），文件修改时间即最近访问时间。
+    写入时只累加估计的总大小，超过上限或距上次扫描已久时才扫描目录淘汰条目，
+    不必每次写入都遍历整个缓存目录。
+    """
+
+    def __init__(self, cache_dir, max_bytes, ttl=0, label="缓存"):
+        """
+        初始化磁盘缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 缓存总大小上限（字节）
+            ttl: 条目有效期（秒），<=0 表示永不过期
+            label: 日志中的缓存名称
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.label = label
+        self._lock = threading.Lock()
+        self._size = None  # 估计的总大小，None表示尚未扫描
+        self._scanned_at = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        """条目文件路径"""
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _expired(self, created_at):
+        return self.ttl > 0 and time.time() - created_at > self.ttl
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        """
+        读取条目
+
+        Returns:
+            条目字典，未命中或已过期返回None
+        """
+        path = self.path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            self._count(False)
+            return None
+        except Exception as e:
+            logger.warning(f"读取{self.label}失败，忽略: {path}, 错误: {str(e)}")
+            self._count(False)
+            return None
+
+        if self._expired(entry.get("created_at", 0)):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            self._count(False)
+            return None
+
+        # 更新访问时间，用于LRU淘汰
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        self._count(True)
+        logger.info(f"命中{self.label}: {key[:12]}")
+        return entry
+
+    def put(self, key, entry):
+        """
+        写入条目（原子替换，自动记录created_at），必要时淘汰条目
+
+        Args:
+            key: 缓存键
+            entry: 条目字典
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+        atomic_write_json(path, {**entry, "created_at": time.time()})
+        new_size = os.path.getsize(path)
+
+        with self._lock:
+            if self._size is not None:
+                self._size += new_size - old_size
+            need_scan = (self._size is None or self._size > self.max_bytes
+                         or time.time() - self._scanned_at > RESCAN_INTERVAL)
+        if need_scan:
+            self.evict()
+
+    def evict(self):
+        """扫描缓存目录，删除过期条目，再按最近访问时间淘汰，直到总大小不超过上限"""
+        with self._lock:
+            entries = []
+            total = 0
+            now = time.time()
+            for shard in os.scandir(self.cache_dir):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    if not entry.name.endswith(".json"):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    # 最近访问时间早于有效期的条目一定已过期（写入时间不晚于访问时间）
+                    if self.ttl > 0 and now - stat.st_mtime > self.ttl:
+                        try:
+                            os.unlink(entry.path)
+                        except FileNotFoundError:
+                            pass
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+
+            if total > self.max_bytes:
+                entries.sort()
+                for _, size, path in entries:
+                    if total <= self.max_bytes:
+                        break
+                    try:
+                        os.unlink(path)
+                        total -= size
+                        logger.info(f"淘汰{self.label}: {os.path.basename(path)}")
+                    except FileNotFoundError:
+                        pass
+
+            self._size = total
+            self._scanned_at = now
+
+    def stats(self):
+        """
+        获取缓存统计信息
+
+        Returns:
+            {hits, misses}
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
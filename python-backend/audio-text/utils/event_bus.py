@@ -0,0 +1,158 @@
+"""
+事件总线模块 - 进程内发布任务状态变化、转写进度和直播录制事件，推送给 /api/events 的订阅者
+"""
+import time
+import asyncio
+import threading
+from collections import deque
+
+from utils.config import EVENTS_HISTORY_SIZE
+
+
+class Subscription:
+    """一个订阅者，事件在事件循环中放入有界队列，队列满时丢弃最早的事件"""
+
+    def __init__(self, bus, loop, types=None, job_id=None, queue_size=1000):
+        """
+        初始化订阅
+
+        Args:
+            bus: 所属的事件总线
+            loop: 订阅者所在的事件循环
+            types: 只接收指定类型的事件，None表示全部
+            job_id: 只接收指定任务的事件（不带job_id的事件不受影响），None表示全部
+            queue_size: 未读取事件的上限
+        """
+        self.bus = bus
+        self.loop = loop
+        self.types = set(types) if types else None
+        self.job_id = job_id
+        self.queue = asyncio.Queue(maxsize=max(1, queue_size))
+        self.dropped = 0
+
+    def matches(self, event):
+        """事件是否符合订阅条件"""
+        if self.types is not None and event["type"] not in self.types:
+            return False
+        if self.job_id is not None and event["data"].get("job_id") not in (None, self.job_id):
+            return False
+        return True
+
+    def deliver(self, event):
+        """从任意线程投递事件"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # 事件循环已关闭
+            self.bus.unsubscribe(self)
+
+    def _put(self, event):
+        """在事件循环中放入队列，读取过慢时丢弃最早的事件"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """
+        等待下一个事件
+
+        Args:
+            timeout: 超时时间（秒），None表示一直等待
+
+        Returns:
+            事件字典，超时返回None
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        """取消订阅"""
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    """线程安全的进程内事件总线，保留最近的事件供断线重连的订阅者补发"""
+
+    def __init__(self, history_size=200):
+        """
+        初始化事件总线
+
+        Args:
+            history_size: 保留的最近事件数
+        """
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._history = deque(maxlen=max(0, history_size))
+        self._next_id = 1
+        self._published = 0
+
+    def publish(self, event_type, data):
+        """
+        发布事件（可在任意线程调用，没有订阅者时只记录到历史中）
+
+        Args:
+            event_type: 事件类型，如 job、transcription、recording
+            data: 事件数据（需要可以JSON序列化）
+        """
+        with self._lock:
+            event = {
+                "id": self._next_id,
+                "type": event_type,
+                "time": time.time(),
+                "data": data
+            }
+            self._next_id += 1
+            self._published += 1
+            self._history.append(event)
+            subscribers = [sub for sub in self._subscribers if sub.matches(event)]
+
+        for subscriber in subscribers:
+            subscriber.deliver(event)
+
+    def subscribe(self, types=None, job_id=None, last_event_id=None, queue_size=1000):
+        """
+        订阅事件，需要在事件循环中调用
+
+        Args:
+            types: 只接收指定类型的事件，None表示全部
+            job_id: 只接收指定任务的事件，None表示全部
+            last_event_id: 断线重连时客户端收到的最后一个事件ID，之后的历史事件会先补发
+            queue_size: 未读取事件的上限
+
+        Returns:
+            Subscription
+        """
+        subscription = Subscription(self, asyncio.get_running_loop(), types, job_id, queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+            if last_event_id is not None:
+                for event in self._history:
+                    if event["id"] > last_event_id and subscription.matches(event):
+                        subscription._put(event)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """取消订阅"""
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stats(self):
+        """
+        获取事件总线统计
+
+        Returns:
+            {subscribers, published, last_event_id}
+        """
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "published": self._published,
+                "last_event_id": self._next_id - 1
+            }
+
+
+# 创建单例实例
+event_bus = EventBus(EVENTS_HISTORY_SIZE)
@@ -0,0 +1,204 @@
+"""
+任务索引模块 - 使用SQLite维护任务列表，避免每次请求都扫描输出目录
+"""
+import os
+import json
+import sqlite3
+import logging
+import threading
+
+# 配置日志
+logger = logging.getLogger('job_index')
+
+# 索引数据库文件名（存放在输出目录下）
+INDEX_FILENAME = ".jobs_index.db"
+
+# 索引格式版本，记录在数据库的user_version中；低于此版本的索引（包括旧版本API创建的）启动时重新扫描输出目录
+INDEX_VERSION = 1
+
+
+class JobIndex:
+    """任务索引类，与每次status.json写入保持同步"""
+
+    def __init__(self, output_dir, db_path=None):
+        """
+        初始化任务索引
+
+        Args:
+            output_dir: 任务输出目录，每个任务一个子目录
+            db_path: 索引数据库路径，None表示使用输出目录下的默认文件
+        """
+        self.output_dir = output_dir
+        self.db_path = db_path or os.path.join(output_dir, INDEX_FILENAME)
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT,
+                created_at TEXT,
+                updated_at TEXT,
+                data TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_updated_at ON jobs (updated_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_updated_at ON jobs (status, updated_at)")
+        self._conn.commit()
+
+    def upsert(self, job_id, status):
+        """
+        写入或更新任务记录
+
+        Args:
+            job_id: 任务ID
+            status: 任务状态字典（与status.json内容一致）
+        """
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO jobs (job_id, status, created_at, updated_at, data)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(job_id) DO UPDATE SET
+                    status = excluded.status,
+                    created_at = COALESCE(jobs.created_at, excluded.created_at),
+                    updated_at = excluded.updated_at,
+                    data = excluded.data
+                """,
+                (
+                    job_id,
+                    status.get("status"),
+                    status.get("created_at"),
+                    status.get("updated_at"),
+                    json.dumps(status, ensure_ascii=False),
+                ),
+            )
+            self._conn.commit()
+
+    def get(self, job_id):
+        """
+        获取单个任务记录
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            任务状态字典，不存在时返回None
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if not row:
+            return None
+        status = json.loads(row[0])
+        status["job_id"] = job_id
+        return status
+
+    def delete(self, job_id):
+        """删除任务记录"""
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+            self._conn.commit()
+
+    def list(self, status=None, limit=50, offset=0, descending=True):
+        """
+        分页查询任务列表，按updated_at排序
+
+        Args:
+            status: 按状态过滤，None表示不过滤
+            limit: 每页数量
+            offset: 偏移量
+            descending: 是否按更新时间倒序
+
+        Returns:
+            (任务列表, 符合条件的任务总数)
+        """
+        where = ""
+        params = []
+        if status:
+            where = "WHERE status = ?"
+            params.append(status)
+
+        order = "DESC" if descending else "ASC"
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM jobs {where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT job_id, data FROM jobs {where} ORDER BY updated_at {order}, job_id {order} LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+
+        jobs = []
+        for job_id, data in rows:
+            item = json.loads(data)
+            item["job_id"] = job_id
+            jobs.append(item)
+        return jobs, total
+
+    def count(self):
+        """返回索引中的任务数量"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def rebuild(self):
+        """
+        扫描输出目录重建索引（以status.json为准覆盖已有记录）
+
+        Returns:
+            导入的任务数量
+        """
+        logger.info(f"重建任务索引: {self.output_dir}")
+        imported = 0
+        rows = []
+        for entry in os.scandir(self.output_dir):
+            if not entry.is_dir():
+                continue
+            status_file = os.path.join(entry.path, "status.json")
+            if not os.path.exists(status_file):
+                continue
+            try:
+                with open(status_file, "r") as f:
+                    status = json.load(f)
+            except Exception as e:
+                logger.warning(f"读取任务状态失败，跳过: {status_file}, 错误: {str(e)}")
+                continue
+            rows.append((
+                entry.name,
+                status.get("status"),
+                status.get("created_at"),
+                status.get("updated_at"),
+                json.dumps(status, ensure_ascii=False),
+            ))
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO jobs (job_id, status, created_at, updated_at, data) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            imported = len(rows)
+
+        logger.info(f"任务索引重建完成，共 {imported} 个任务")
+        return imported
+
+    def version(self):
+        """索引数据库记录的格式版本，完整扫描过输出目录后才会写入"""
+        with self._lock:
+            return self._conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def ensure_built(self, force=False):
+        """
+        索引从未完整扫描过输出目录（新建的索引或旧版本创建的索引）时，扫描输出目录补全索引
+
+        Args:
+            force: 是否无条件重新扫描（用于补录未同步索引的旧版本Worker写入的任务）
+        """
+        if not force and self.version() >= INDEX_VERSION:
+            return
+        self.rebuild()
+        with self._lock:
+            self._conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+            self._conn.commit()
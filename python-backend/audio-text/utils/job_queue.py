@@ -0,0 +1,300 @@
+"""
+持久化任务队列模块 - 基于SQLite，支持多进程Worker领取任务和崩溃后恢复
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+# 配置日志
+logger = logging.getLogger('job_queue')
+
+# 队列数据库文件名（存放在输出目录下）
+QUEUE_FILENAME = ".job_queue.db"
+
+# 租约过期且已达最大尝试次数的任务的错误信息
+DEAD_TASK_ERROR = "Worker异常退出，已达最大尝试次数"
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+ERROR = "error"
+
+
+class JobQueue:
+    """持久化任务队列，任务领取后带有租约，Worker崩溃后租约过期即可被重新领取"""
+
+    def __init__(self, db_path, lease_seconds=300, max_attempts=3):
+        """
+        初始化任务队列
+
+        Args:
+            db_path: 队列数据库路径
+            lease_seconds: 任务租约时长（秒），Worker需在到期前续约
+            max_attempts: 任务最大尝试次数
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                id TEXT PRIMARY KEY,
+                job_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                worker_id TEXT,
+                lease_expires_at REAL,
+                created_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT,
+                error TEXT
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_state_created ON tasks (state, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_job_id ON tasks (job_id)")
+        conn.commit()
+
+    def _connect(self):
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, job_id, kind, payload=None, max_attempts=None):
+        """
+        添加任务到队列
+
+        Args:
+            job_id: 所属任务（output目录下的job）ID
+            kind: 任务类型，如 process_audio、generate_scripts
+            payload: 任务参数字典
+            max_attempts: 最大尝试次数，None表示使用队列默认值
+
+        Returns:
+            队列任务ID
+        """
+        task_id = str(uuid.uuid4())
+        self._connect().execute(
+            """
+            INSERT INTO tasks (id, job_id, kind, payload, state, attempts, max_attempts, created_at)
+            VALUES (?, ?, ?, ?, ?, 0, ?, ?)
+            """,
+            (
+                task_id,
+                job_id,
+                kind,
+                json.dumps(payload or {}, ensure_ascii=False),
+                QUEUED,
+                max_attempts or self.max_attempts,
+                datetime.now().isoformat(),
+            ),
+        )
+        logger.info(f"任务已入队: {kind} (job_id={job_id}, task_id={task_id})")
+        return task_id
+
+    def claim(self, worker_id, kinds=None, on_dead=None):
+        """
+        领取一个待执行任务（包括租约已过期的运行中任务）
+
+        Args:
+            worker_id: Worker标识
+            kinds: 只领取指定类型的任务，None表示不限
+            on_dead: 租约过期且已达最大尝试次数的任务被标记为失败后调用 on_dead(任务字典)，
+                用于同步更新任务状态（事务提交后调用）
+
+        Returns:
+            任务字典，没有可领取的任务时返回None
+        """
+        conn = self._connect()
+        now = time.time()
+        kind_filter = ""
+        params = [QUEUED, RUNNING, now]
+        if kinds:
+            kind_filter = f"AND kind IN ({', '.join('?' for _ in kinds)})"
+            params.extend(kinds)
+
+        dead = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            while True:
+                row = conn.execute(
+                    f"""
+                    SELECT * FROM tasks
+                    WHERE (state = ? OR (state = ? AND lease_expires_at < ?)) {kind_filter}
+                    ORDER BY created_at
+                    LIMIT 1
+                    """,
+                    params,
+                ).fetchone()
+                if row is None:
+                    break
+
+                if row["state"] != RUNNING:
+                    break
+
+                # 租约过期说明原Worker已崩溃，超过最大尝试次数的任务不再重试
+                if row["attempts"] >= row["max_attempts"]:
+                    logger.error(f"任务租约过期且已达最大尝试次数，标记为失败: {row['id']}")
+                    finished_at = datetime.now().isoformat()
+                    conn.execute(
+                        "UPDATE tasks SET state = ?, lease_expires_at = NULL, finished_at = ?, error = ? WHERE id = ?",
+                        (ERROR, finished_at, DEAD_TASK_ERROR, row["id"]),
+                    )
+                    dead.append({
+                        **self._row_to_dict(row),
+                        "state": ERROR,
+                        "lease_expires_at": None,
+                        "finished_at": finished_at,
+                        "error": DEAD_TASK_ERROR,
+                    })
+                    continue
+
+                logger.warning(f"任务租约已过期，重新领取: {row['id']} (原Worker: {row['worker_id']})")
+                break
+
+            if row is not None:
+                conn.execute(
+                    """
+                    UPDATE tasks
+                    SET state = ?, worker_id = ?, lease_expires_at = ?, attempts = attempts + 1, started_at = ?
+                    WHERE id = ?
+                    """,
+                    (RUNNING, worker_id, now + self.lease_seconds, datetime.now().isoformat(), row["id"]),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if on_dead:
+            for task in dead:
+                try:
+                    on_dead(task)
+                except Exception as e:
+                    logger.error(f"处理失败任务回调出错: {task['id']}, 错误: {str(e)}")
+
+        return self.get(row["id"]) if row is not None else None
+
+    def heartbeat(self, task_id, worker_id):
+        """
+        续约任务租约
+
+        Returns:
+            续约是否成功（任务已被其他Worker接管时返回False）
+        """
+        cursor = self._connect().execute(
+            "UPDATE tasks SET lease_expires_at = ? WHERE id = ? AND worker_id = ? AND state = ?",
+            (time.time() + self.lease_seconds, task_id, worker_id, RUNNING),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, task_id, worker_id):
+        """
+        标记任务完成（只有仍持有租约的Worker可以完成任务）
+
+        Args:
+            task_id: 队列任务ID
+            worker_id: Worker标识
+
+        Returns:
+            是否已标记；租约已过期并被其他Worker重新领取时返回False
+        """
+        cursor = self._connect().execute(
+            """
+            UPDATE tasks SET state = ?, lease_expires_at = NULL, finished_at = ?, error = NULL
+            WHERE id = ? AND worker_id = ? AND state = ?
+            """,
+            (COMPLETED, datetime.now().isoformat(), task_id, worker_id, RUNNING),
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, task_id, worker_id, error, retry=True):
+        """
+        标记任务失败，未超过最大尝试次数时重新入队（只有仍持有租约的Worker可以标记）
+
+        Args:
+            task_id: 队列任务ID
+            worker_id: Worker标识
+            error: 错误信息
+            retry: 是否允许重试
+
+        Returns:
+            是否已重新入队
+        """
+        task = self.get(task_id)
+        if task is None:
+            return False
+
+        requeue = retry and task["attempts"] < task["max_attempts"]
+        cursor = self._connect().execute(
+            """
+            UPDATE tasks SET state = ?, worker_id = NULL, lease_expires_at = NULL, finished_at = ?, error = ?
+            WHERE id = ? AND worker_id = ? AND state = ?
+            """,
+            (QUEUED if requeue else ERROR, None if requeue else datetime.now().isoformat(), str(error),
+             task_id, worker_id, RUNNING),
+        )
+        if cursor.rowcount != 1:
+            logger.warning(f"任务租约已失效，不再标记失败: {task_id} (Worker: {worker_id})")
+            return False
+        if requeue:
+            logger.warning(f"任务失败，重新入队 ({task['attempts']}/{task['max_attempts']}): {task_id}, 错误: {error}")
+        else:
+            logger.error(f"任务最终失败: {task_id}, 错误: {error}")
+        return requeue
+
+    def get(self, task_id):
+        """获取任务详情"""
+        row = self._connect().execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def list(self, limit=50, states=None):
+        """
+        按创建时间倒序列出任务
+
+        Args:
+            limit: 最大返回数量
+            states: 只返回指定状态的任务，None表示不限
+        """
+        where = ""
+        params = []
+        if states:
+            where = f"WHERE state IN ({', '.join('?' for _ in states)})"
+            params.extend(states)
+        rows = self._connect().execute(
+            f"SELECT * FROM tasks {where} ORDER BY created_at DESC LIMIT ?",
+            params + [limit],
+        ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def counts(self):
+        """获取各状态的任务数量"""
+        rows = self._connect().execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall()
+        result = {QUEUED: 0, RUNNING: 0, COMPLETED: 0, ERROR: 0}
+        result.update({state: count for state, count in rows})
+        return result
+
+    @staticmethod
+    def _row_to_dict(row):
+        task = dict(row)
+        task["payload"] = json.loads(task["payload"])
+        return task
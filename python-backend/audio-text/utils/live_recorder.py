@@ -7,6 +7,8 @@ import json
 import threading
 from datetime import datetime
 
+from utils.event_bus import event_bus
+
 class LiveStreamRecorder:
     def __init__(self):
         self.recording_processes = {}  # 存储正在运行的录制进程
@@ -232,7 +234,10 @@ class LiveStreamRecorder:
             "-segment_time", str(segment_duration),
             "-c:a", "libmp3lame",
             "-q:a", "4",
-            "-vn"  # 不包含视频
+            "-vn",  # 不包含视频
+            # 每完成一个片段，在标准输出打印片段文件名，用于推送录制片段事件
+            "-segment_list", "pipe:1",
+            "-segment_list_type", "flat"
         ]
         
         # 设置录制总时长限制
@@ -252,7 +257,7 @@ class LiveStreamRecorder:
         
         try:
             # 执行ffmpeg命令
-            process = subprocess.Popen(cmd)
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
             
             # 存储进程和录制信息
             self.recording_processes[task_id] = process
@@ -263,8 +268,13 @@ class LiveStreamRecorder:
                 "stream_url": stream_url,
                 "duration_minutes": duration_minutes,
                 "segment_duration": segment_duration,
+                "segments": 0,
                 "status": "recording"
             }
+            event_bus.publish("recording", {"task_id": task_id, **self.recording_info[task_id]})
+            
+            # 读取ffmpeg输出的片段列表，推送片段完成和录制结束事件
+            threading.Thread(target=self._watch_segments, args=(task_id, process), daemon=True).start()
             
             # 如果设置了录制时长，启动一个线程来等待并终止进程
             if duration_minutes:
@@ -288,6 +298,26 @@ class LiveStreamRecorder:
             print(f"录制过程中出错: {e}")
             return None
 
+    def _watch_segments(self, task_id, process):
+        """读取ffmpeg在标准输出打印的已完成片段，进程结束后推送最终状态"""
+        info = self.recording_info[task_id]
+        for line in process.stdout:
+            filename = line.strip()
+            if not filename:
+                continue
+            info["segments"] += 1
+            event_bus.publish("recording_segment", {
+                "task_id": task_id,
+                "index": info["segments"],
+                "file": os.path.join(info["output_dir"], filename)
+            })
+        
+        process.wait()
+        if info["status"] == "recording":
+            info["status"] = "completed"
+        info.setdefault("end_time", datetime.now().isoformat())
+        event_bus.publish("recording", {"task_id": task_id, **info})
+
     def stop_recording(self, task_id):
         """停止指定的录制任务"""
         if task_id in self.recording_processes:
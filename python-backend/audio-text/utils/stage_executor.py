@@ -0,0 +1,99 @@
+"""
+阶段执行器模块 - 为转写、标签、脚本生成等阻塞阶段提供有界线程池
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.config import (
+    TRANSCRIBE_CONCURRENCY,
+    TAGGING_CONCURRENCY,
+    GENERATION_CONCURRENCY
+)
+
+# 配置日志
+logger = logging.getLogger('stage_executor')
+
+
+class StageExecutor:
+    """按阶段划分的执行器，每个阶段使用独立的线程池并限制并发数"""
+
+    def __init__(self, limits):
+        """
+        初始化阶段执行器
+
+        Args:
+            limits: 阶段名称到最大并发数的映射，如 {"transcribe": 2}
+        """
+        self.limits = dict(limits)
+        self._executors = {
+            stage: ThreadPoolExecutor(max_workers=limit, thread_name_prefix=f"stage-{stage}")
+            for stage, limit in self.limits.items()
+        }
+        self._lock = threading.Lock()
+        self._active = {stage: 0 for stage in self.limits}
+        self._pending = {stage: 0 for stage in self.limits}
+        self._completed = {stage: 0 for stage in self.limits}
+
+        logger.info(f"初始化阶段执行器，并发限制: {self.limits}")
+
+    def submit(self, stage, func, *args, **kwargs):
+        """
+        提交阻塞函数到指定阶段的线程池
+
+        Args:
+            stage: 阶段名称
+            func: 要执行的函数
+
+        Returns:
+            concurrent.futures.Future
+        """
+        if stage not in self._executors:
+            raise ValueError(f"未知的执行阶段: {stage}")
+
+        with self._lock:
+            self._pending[stage] += 1
+
+        def wrapper():
+            with self._lock:
+                self._pending[stage] -= 1
+                self._active[stage] += 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._active[stage] -= 1
+                    self._completed[stage] += 1
+
+        return self._executors[stage].submit(wrapper)
+
+    def stats(self):
+        """
+        获取各阶段的运行状态
+
+        Returns:
+            {阶段名称: {max_workers, active, pending, completed}}
+        """
+        with self._lock:
+            return {
+                stage: {
+                    "max_workers": self.limits[stage],
+                    "active": self._active[stage],
+                    "pending": self._pending[stage],
+                    "completed": self._completed[stage]
+                }
+                for stage in self.limits
+            }
+
+    def shutdown(self, wait=False):
+        """关闭所有阶段的线程池"""
+        for executor in self._executors.values():
+            executor.shutdown(wait=wait)
+
+
+# 创建单例实例
+stage_executor = StageExecutor({
+    "transcribe": TRANSCRIBE_CONCURRENCY,
+    "tag": TAGGING_CONCURRENCY,
+    "generate": GENERATION_CONCURRENCY
+})
@@ -0,0 +1,161 @@
+"""
+阶段流水线模块 - 多个处理阶段通过有界队列串联，各阶段有独立的工作线程，不同任务的不同阶段可以同时进行
+"""
+import queue
+import logging
+import threading
+
+# 配置日志
+logger = logging.getLogger('stage_pipeline')
+
+# 通知工作线程退出的标记
+_STOP = object()
+
+
+class StagePipeline:
+    """
+    有界队列串联的阶段流水线
+
+    每个阶段有一个有界输入队列和若干工作线程，阶段函数接收上一阶段的返回值，
+    返回值交给下一阶段。下游队列已满时上游工作线程阻塞等待（背压），
+    因此积压的任务数不超过各阶段队列容量与工作线程数之和。
+    """
+
+    def __init__(self, stages, queue_size=2, name="pipeline"):
+        """
+        初始化流水线并启动各阶段的工作线程
+
+        Args:
+            stages: 阶段列表 [(阶段名称, 阶段函数, 工作线程数)]，按执行顺序排列
+            queue_size: 每个阶段输入队列的容量
+            name: 流水线名称，用于线程名和日志
+        """
+        self.name = name
+        self.stages = [(stage, func, max(1, workers)) for stage, func, workers in stages]
+        self.queue_size = queue_size
+        self._queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in self.stages]
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._active = {stage: 0 for stage, _, _ in self.stages}
+        self._completed = {stage: 0 for stage, _, _ in self.stages}
+        self._failed = {stage: 0 for stage, _, _ in self.stages}
+        self._threads = []
+
+        for index, (stage, _, workers) in enumerate(self.stages):
+            for i in range(workers):
+                thread = threading.Thread(
+                    target=self._run_stage,
+                    args=(index,),
+                    name=f"{name}-{stage}-{i}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+        logger.info(f"初始化流水线 {name}: " + ", ".join(f"{stage}×{workers}" for stage, _, workers in self.stages)
+                    + f"，队列容量 {queue_size}")
+
+    def has_capacity(self):
+        """第一阶段的输入队列是否还有空位"""
+        return not self._queues[0].full()
+
+    def submit(self, item, callback=None):
+        """
+        提交任务到第一阶段，队列已满时阻塞等待
+
+        Args:
+            item: 传给第一阶段函数的参数
+            callback: 任务结束时调用 callback(最后一阶段的返回值, 错误)，成功时错误为None，
+                失败时返回值为None，任务在出错的阶段结束
+        """
+        with self._lock:
+            self._in_flight += 1
+        self._queues[0].put((item, callback))
+
+    def wait_idle(self, timeout=None):
+        """
+        等待已提交的任务全部结束
+
+        Args:
+            timeout: 超时时间（秒），None表示一直等待
+
+        Returns:
+            是否已全部结束
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._in_flight == 0, timeout)
+
+    def stats(self):
+        """
+        获取各阶段的运行状态
+
+        Returns:
+            {阶段名称: {workers, active, queued, completed, failed}}
+        """
+        with self._lock:
+            return {
+                stage: {
+                    "workers": workers,
+                    "active": self._active[stage],
+                    "queued": self._queues[index].qsize(),
+                    "completed": self._completed[stage],
+                    "failed": self._failed[stage]
+                }
+                for index, (stage, _, workers) in enumerate(self.stages)
+            }
+
+    def shutdown(self):
+        """通知各阶段的工作线程在处理完手头的任务后退出（不等待）"""
+        for index, (_, _, workers) in enumerate(self.stages):
+            for _ in range(workers):
+                try:
+                    self._queues[index].put_nowait(_STOP)
+                except queue.Full:
+                    pass
+
+    def _run_stage(self, index):
+        """阶段工作线程：从输入队列取任务执行，结果放入下一阶段的队列"""
+        stage, func, _ = self.stages[index]
+        input_queue = self._queues[index]
+        last = index == len(self.stages) - 1
+
+        while True:
+            entry = input_queue.get()
+            if entry is _STOP:
+                return
+            item, callback = entry
+
+            with self._lock:
+                self._active[stage] += 1
+            try:
+                result = func(item)
+            except Exception as e:
+                with self._lock:
+                    self._active[stage] -= 1
+                    self._failed[stage] += 1
+                logger.error(f"流水线 {self.name} 阶段 {stage} 出错: {str(e)}")
+                self._finish(callback, None, e)
+                continue
+
+            with self._lock:
+                self._active[stage] -= 1
+                self._completed[stage] += 1
+
+            if last:
+                self._finish(callback, result, None)
+            else:
+                # 下一阶段队列已满时在此阻塞，不再领取新任务
+                self._queues[index + 1].put((result, callback))
+
+    def _finish(self, callback, result, error):
+        """调用任务结束回调并更新在途任务数"""
+        try:
+            if callback:
+                callback(result, error)
+        except Exception as e:
+            logger.error(f"流水线 {self.name} 任务回调出错: {str(e)}")
+        finally:
+            with self._idle:
+                self._in_flight -= 1
+                self._idle.notify_all()
@@ -0,0 +1,252 @@
+"""
+任务状态存储模块 - 内存中保存任务状态，后台线程合并短时间内的多次更新后原子写入status.json并同步任务索引
+"""
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+
+from utils.atomic_write import atomic_write_json
+
+# 配置日志
+logger = logging.getLogger('status_store')
+
+# 每个任务目录下的状态文件名
+STATUS_FILENAME = "status.json"
+
+# 已结束的任务状态
+FINISHED_STATES = ("completed", "error")
+
+
+class _Entry:
+    """缓存中的一条任务状态"""
+
+    __slots__ = ("status", "version", "flushed_version", "mtime_ns")
+
+    def __init__(self, status, mtime_ns=None):
+        self.status = status
+        self.version = 0
+        self.flushed_version = 0
+        self.mtime_ns = mtime_ns  # 最近一次写入或读取时status.json的修改时间，用于发现其他进程的更新
+
+    @property
+    def dirty(self):
+        """是否有尚未写入磁盘的更新"""
+        return self.version != self.flushed_version
+
+
+class JobStatusStore:
+    """
+    任务状态存储
+
+    内存中的状态是进行中任务的准确来源：save立即更新内存，读取不需要打开文件；
+    后台线程每隔flush_interval秒把有变化的任务写入磁盘（同一任务的多次更新只写最后一次），
+    写入时先写临时文件再原子重命名，读取方不会读到写了一半的文件。
+    其他进程（独立Worker）写入的status.json通过文件修改时间发现，读取时重新加载。
+    """
+
+    def __init__(self, output_dir, index=None, flush_interval=0.2, max_cached=1000):
+        """
+        初始化状态存储并启动后台写入线程
+
+        Args:
+            output_dir: 任务输出目录，每个任务一个子目录
+            index: 同步更新的任务索引（JobIndex），None表示不更新索引
+            flush_interval: 合并写入的间隔（秒），<=0 表示每次保存都立即写入
+            max_cached: 缓存的已写入任务数上限，超过时淘汰最久未访问的
+        """
+        self.output_dir = output_dir
+        self.index = index
+        self.flush_interval = flush_interval
+        self.max_cached = max_cached
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._writes = 0
+        self._coalesced = 0
+
+        if flush_interval > 0:
+            threading.Thread(target=self._run, name="status-writer", daemon=True).start()
+        # 进程退出前写入尚未落盘的状态（multiprocessing的fork子进程通过os._exit退出，不执行atexit，需要显式调用flush）
+        atexit.register(self.flush)
+
+    def status_file(self, job_id):
+        """任务状态文件路径"""
+        return os.path.join(self.output_dir, job_id, STATUS_FILENAME)
+
+    def save(self, job_id, status):
+        """
+        更新任务状态
+
+        与已有状态合并：保留原有的created_at和其他字段（如content_hash、size），用新值覆盖同名字段
+
+        Args:
+            job_id: 任务ID
+            status: 新的状态字段
+
+        Returns:
+            合并后的完整状态（副本）
+        """
+        with self._lock:
+            entry = self._cache.get(job_id)
+            if entry is not None and not entry.dirty and entry.mtime_ns != self._mtime_ns(job_id):
+                # 其他进程更新过状态文件，以文件内容为准再合并
+                entry = None
+            if entry is None:
+                current = self._read_file(job_id)
+                entry = _Entry(current[0] if current else {}, current[1] if current else None)
+                self._cache[job_id] = entry
+
+            merged = {**entry.status, **status}
+            if entry.status.get("created_at"):
+                merged["created_at"] = entry.status["created_at"]
+            if entry.dirty:
+                self._coalesced += 1
+            entry.status = merged
+            entry.version += 1
+            self._cache.move_to_end(job_id)
+
+        if self.flush_interval > 0:
+            self._wake.set()
+        else:
+            self.flush()
+        return dict(merged)
+
+    def get(self, job_id):
+        """
+        获取任务状态（返回副本）
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            任务状态字典，任务不存在时返回None
+        """
+        with self._lock:
+            entry = self._cache.get(job_id)
+            if entry is not None and entry.dirty:
+                self._cache.move_to_end(job_id)
+                return dict(entry.status)
+
+        # 已写入磁盘的状态只检查文件修改时间，其他进程更新后才重新读取
+        mtime_ns = self._mtime_ns(job_id)
+
+        with self._lock:
+            entry = self._cache.get(job_id)
+            if entry is not None and (entry.dirty or entry.mtime_ns == mtime_ns):
+                self._cache.move_to_end(job_id)
+                return dict(entry.status)
+
+        if mtime_ns is None:
+            return None
+        current = self._read_file(job_id)
+        if current is None:
+            return None
+
+        with self._lock:
+            entry = self._cache.get(job_id)
+            # 读取期间本进程又有更新时以内存为准
+            if entry is None or not entry.dirty:
+                entry = _Entry(current[0], current[1])
+                self._cache[job_id] = entry
+                self._evict()
+            self._cache.move_to_end(job_id)
+            return dict(entry.status)
+
+    def flush(self):
+        """立即写入所有尚未落盘的状态"""
+        with self._flush_lock:
+            with self._lock:
+                pending = [
+                    (job_id, entry, entry.version, dict(entry.status))
+                    for job_id, entry in self._cache.items()
+                    if entry.dirty
+                ]
+
+            for job_id, entry, version, status in pending:
+                try:
+                    mtime_ns = self._write_file(job_id, status)
+                    if self.index is not None:
+                        self.index.upsert(job_id, status)
+                except Exception as e:
+                    logger.error(f"写入任务状态失败: {job_id}, 错误: {str(e)}")
+                    continue
+
+                with self._lock:
+                    self._writes += 1
+                    entry.flushed_version = version
+                    entry.mtime_ns = mtime_ns
+
+            with self._lock:
+                self._evict()
+
+    def stats(self):
+        """
+        获取缓存和写入统计
+
+        Returns:
+            {cached, dirty, writes, coalesced}
+        """
+        with self._lock:
+            return {
+                "cached": len(self._cache),
+                "dirty": sum(1 for entry in self._cache.values() if entry.dirty),
+                "writes": self._writes,
+                "coalesced": self._coalesced
+            }
+
+    def _run(self):
+        """后台写入线程：有更新时等待flush_interval秒收集更多更新后一起写入"""
+        while True:
+            self._wake.wait()
+            time.sleep(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _evict(self):
+        """淘汰最久未访问的已落盘任务（调用方需持有锁）"""
+        excess = len(self._cache) - self.max_cached
+        if excess <= 0:
+            return
+        for job_id in list(self._cache):
+            if excess <= 0:
+                break
+            entry = self._cache[job_id]
+            # 进行中的任务保留在内存中
+            if entry.dirty or entry.status.get("status") not in FINISHED_STATES:
+                continue
+            del self._cache[job_id]
+            excess -= 1
+
+    def _mtime_ns(self, job_id):
+        """status.json的修改时间，文件不存在时返回None"""
+        try:
+            return os.stat(self.status_file(job_id)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _read_file(self, job_id):
+        """读取status.json，返回(状态, 修改时间)，不存在或无法解析时返回None"""
+        status_file = self.status_file(job_id)
+        try:
+            mtime_ns = os.stat(status_file).st_mtime_ns
+            with open(status_file, "r") as f:
+                return json.load(f), mtime_ns
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"读取任务状态失败: {status_file}, 错误: {str(e)}")
+            return None
+
+    def _write_file(self, job_id, status):
+        """原子写入status.json（先写临时文件再重命名），返回写入后的修改时间"""
+        status_file = self.status_file(job_id)
+        job_folder = os.path.dirname(status_file)
+        if not os.path.isdir(job_folder):
+            raise FileNotFoundError(f"任务目录不存在: {job_folder}")
+        atomic_write_json(status_file, status)
+        return os.stat(status_file).st_mtime_ns
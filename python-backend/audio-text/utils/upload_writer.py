@@ -0,0 +1,261 @@
+"""
+上传写入模块 - 将上传数据流式写入磁盘，边写边计算内容哈希，支持断点续传的分片上传
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+# 配置日志
+logger = logging.getLogger('upload_writer')
+
+# 累积到该大小后才写一次磁盘，减少线程切换
+DEFAULT_BUFFER_SIZE = 4 * 1024 * 1024
+# 重新计算哈希时的读取块大小
+HASH_READ_SIZE = 8 * 1024 * 1024
+
+
+class UploadWriter:
+    """流式写入上传数据，边写边计算SHA-256并统计写入速度"""
+
+    def __init__(self, path, append=False, hasher=None, buffer_size=DEFAULT_BUFFER_SIZE):
+        """
+        初始化写入器
+
+        Args:
+            path: 目标文件路径
+            append: 是否追加写入（断点续传）
+            hasher: 已有内容的哈希对象，追加写入时用于继续计算
+            buffer_size: 写盘缓冲区大小
+        """
+        self.path = path
+        self.buffer_size = buffer_size
+        self.hasher = hasher or hashlib.sha256()
+        self.bytes_written = 0
+        self._buffer = bytearray()
+        self._file = open(path, "ab" if append else "wb")
+        self._started_at = time.monotonic()
+        self._finished_at = None
+
+    async def write(self, data):
+        """写入一块数据（在线程中落盘，不阻塞事件循环）"""
+        if not data:
+            return
+        self.hasher.update(data)
+        self.bytes_written += len(data)
+        self._buffer += data
+        if len(self._buffer) >= self.buffer_size:
+            await self._flush()
+
+    async def write_stream(self, chunks):
+        """
+        写入异步数据流
+
+        Args:
+            chunks: 异步可迭代对象，如 request.stream()
+
+        Returns:
+            本次写入的字节数
+        """
+        start = self.bytes_written
+        async for chunk in chunks:
+            await self.write(chunk)
+        return self.bytes_written - start
+
+    async def write_upload_file(self, upload_file, chunk_size=1024 * 1024):
+        """
+        从FastAPI的UploadFile分块读取并写入
+
+        Returns:
+            本次写入的字节数
+        """
+        start = self.bytes_written
+        while True:
+            chunk = await upload_file.read(chunk_size)
+            if not chunk:
+                break
+            await self.write(chunk)
+        return self.bytes_written - start
+
+    async def close(self):
+        """写入剩余缓冲并关闭文件"""
+        await self._flush()
+        await asyncio.to_thread(self._file.close)
+        self._finished_at = time.monotonic()
+
+    async def _flush(self):
+        if not self._buffer:
+            return
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        await asyncio.to_thread(self._file.write, data)
+
+    @property
+    def hexdigest(self):
+        """内容哈希（十六进制）"""
+        return self.hasher.hexdigest()
+
+    @property
+    def elapsed(self):
+        """写入耗时（秒）"""
+        end = self._finished_at or time.monotonic()
+        return max(end - self._started_at, 1e-6)
+
+    @property
+    def bytes_per_sec(self):
+        """平均写入速度（字节/秒）"""
+        return self.bytes_written / self.elapsed
+
+
+def hash_file(path, hasher=None):
+    """计算文件的SHA-256哈希对象（用于续传时恢复哈希状态）"""
+    hasher = hasher or hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(HASH_READ_SIZE)
+            if not block:
+                break
+            hasher.update(block)
+    return hasher
+
+
+class UploadSessionStore:
+    """分片上传会话管理，会话信息保存在上传目录下，服务重启后仍可续传"""
+
+    def __init__(self, uploads_dir):
+        """
+        初始化会话管理
+
+        Args:
+            uploads_dir: 上传目录
+        """
+        self.uploads_dir = uploads_dir
+        self.sessions_dir = os.path.join(uploads_dir, ".sessions")
+        os.makedirs(self.sessions_dir, exist_ok=True)
+        # upload_id -> (已哈希的字节数, 哈希对象)，进程重启后会从分片文件重新计算
+        self._hashers = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _meta_path(self, upload_id):
+        return os.path.join(self.sessions_dir, f"{upload_id}.json")
+
+    def part_path(self, upload_id):
+        """分片数据文件路径"""
+        return os.path.join(self.sessions_dir, f"{upload_id}.part")
+
+    def _lock(self, upload_id):
+        with self._locks_guard:
+            return self._locks.setdefault(upload_id, asyncio.Lock())
+
+    def create(self, filename, total_size=None):
+        """
+        创建上传会话
+
+        Args:
+            filename: 原始文件名
+            total_size: 文件总大小（字节），未知时为None
+
+        Returns:
+            会话信息字典
+        """
+        upload_id = str(uuid.uuid4())
+        session = {
+            "upload_id": upload_id,
+            "filename": os.path.basename(filename),
+            "total_size": total_size,
+            "created_at": datetime.now().isoformat()
+        }
+        with open(self._meta_path(upload_id), "w") as f:
+            json.dump(session, f, ensure_ascii=False)
+        open(self.part_path(upload_id), "wb").close()
+        self._hashers[upload_id] = (0, hashlib.sha256())
+        logger.info(f"创建上传会话: {upload_id} ({filename}, {total_size} 字节)")
+        return self.get(upload_id)
+
+    def get(self, upload_id):
+        """
+        获取上传会话信息
+
+        Returns:
+            会话信息字典（含当前已接收的offset），不存在时返回None
+        """
+        meta_path = self._meta_path(upload_id)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, "r") as f:
+            session = json.load(f)
+        session["offset"] = os.path.getsize(self.part_path(upload_id))
+        return session
+
+    async def append(self, upload_id, offset, chunks):
+        """
+        追加一个分片
+
+        Args:
+            upload_id: 会话ID
+            offset: 分片起始位置，必须等于已接收的字节数
+            chunks: 分片数据的异步可迭代对象
+
+        Returns:
+            (写入后的offset, 本次写入速度 字节/秒)
+        """
+        async with self._lock(upload_id):
+            session = self.get(upload_id)
+            if session is None:
+                raise KeyError(upload_id)
+            if offset != session["offset"]:
+                raise ValueError(f"分片位置不匹配，期望 {session['offset']}，收到 {offset}")
+
+            hasher = await self._get_hasher(upload_id, session["offset"])
+            writer = UploadWriter(self.part_path(upload_id), append=True, hasher=hasher)
+            try:
+                await writer.write_stream(chunks)
+            finally:
+                await writer.close()
+                self._hashers[upload_id] = (session["offset"] + writer.bytes_written, writer.hasher)
+
+            new_offset = session["offset"] + writer.bytes_written
+            if session["total_size"] is not None and new_offset > session["total_size"]:
+                # 丢弃超出的分片，会话回到写入前的状态
+                os.truncate(self.part_path(upload_id), session["offset"])
+                self._hashers.pop(upload_id, None)
+                raise ValueError(f"上传数据超过声明的文件大小: {new_offset} > {session['total_size']}")
+            return new_offset, writer.bytes_per_sec
+
+    async def complete(self, upload_id, target_path):
+        """
+        完成上传，将分片文件移动到目标路径
+
+        Returns:
+            (文件大小, SHA-256)
+        """
+        async with self._lock(upload_id):
+            session = self.get(upload_id)
+            if session is None:
+                raise KeyError(upload_id)
+            if session["total_size"] is not None and session["offset"] != session["total_size"]:
+                raise ValueError(f"上传未完成: {session['offset']}/{session['total_size']} 字节")
+
+            hasher = await self._get_hasher(upload_id, session["offset"])
+            os.replace(self.part_path(upload_id), target_path)
+            os.remove(self._meta_path(upload_id))
+            self._hashers.pop(upload_id, None)
+
+        with self._locks_guard:
+            self._locks.pop(upload_id, None)
+        logger.info(f"上传会话完成: {upload_id} -> {target_path}")
+        return session["offset"], hasher.hexdigest()
+
+    async def _get_hasher(self, upload_id, offset):
+        """获取与当前分片文件一致的哈希对象，必要时从磁盘重新计算"""
+        hashed, hasher = self._hashers.get(upload_id, (None, None))
+        if hashed != offset:
+            logger.info(f"重新计算分片文件哈希: {upload_id}")
+            hasher = await asyncio.to_thread(hash_file, self.part_path(upload_id))
+        return hasher.copy()
@@ -0,0 +1,97 @@
+"""
+任务Worker入口 - 从持久化队列领取转写、标签、脚本生成任务
+
+使用方法:
+    python run_worker.py [--processes N] [--kinds process_audio,generate_scripts]
+
+API服务设置 EMBEDDED_WORKERS=0 时只负责入队，任务全部由本程序处理；
+可在多台机器或多个终端同时运行以扩展处理能力。Worker崩溃后，任务租约过期会被其他Worker重新领取。
+"""
+import os
+import sys
+import signal
+import argparse
+import logging
+import threading
+import multiprocessing
+
+# 添加项目根目录到Python路径
+current_dir = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, current_dir)
+sys.path.insert(0, os.path.join(current_dir, "audio-text"))
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('worker')
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="音频处理任务Worker")
+    parser.add_argument("--processes", "-p", type=int, default=1, help="Worker进程数，默认1")
+    parser.add_argument("--kinds", "-k", help="只处理指定类型的任务，逗号分隔，默认处理所有类型")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="队列为空时的轮询间隔（秒），默认1")
+    return parser.parse_args()
+
+
+def run_worker(kinds, poll_interval):
+    """在当前进程中运行Worker，直到收到终止信号"""
+    from api.pipeline import JobWorker
+
+    stop_event = threading.Event()
+
+    def handle_signal(signum, frame):
+        logger.info(f"收到信号 {signum}，处理完当前任务后退出")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    JobWorker(kinds=kinds, poll_interval=poll_interval).run_forever(stop_event)
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    kinds = [kind.strip() for kind in args.kinds.split(",")] if args.kinds else None
+
+    # 在fork子进程之前加载jieba词典，子进程通过写时复制共享词典内存，无需各自加载
+    # （这里不能导入api.pipeline，其中的数据库连接不能跨进程共享）
+    from utils.config import JIEBA_WARMUP
+    if JIEBA_WARMUP:
+        from text_processing.jieba_loader import warm_up
+        warm_up()
+
+    if args.processes <= 1:
+        run_worker(kinds, args.poll_interval)
+        return
+
+    logger.info(f"启动 {args.processes} 个Worker进程")
+    # 优先使用fork启动子进程，以共享已加载的词典
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    processes = []
+    for i in range(args.processes):
+        process = context.Process(
+            target=run_worker,
+            args=(kinds, args.poll_interval),
+            name=f"worker-{i}"
+        )
+        process.start()
+        processes.append(process)
+
+    def handle_signal(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 'use client';
 
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { 
   Typography, 
   Table, 
@@ -36,7 +36,7 @@ import {
 } from '@ant-design/icons';
 import axios from 'axios';
 import AppLayout from '../../components/layout/AppLayout';
-import { fetchJobs, fetchJobTranscript, fetchJobTags, fetchJobScripts, generateScripts, generateTags, retryJob } from '../../services/api';
+import { fetchJobsPage, fetchJobTranscript, fetchJobTags, fetchJobScripts, generateScripts, generateTags, retryJob, subscribeEvents } from '../../services/api';
 
 const { Title, Paragraph, Text } = Typography;
 const { TabPane } = Tabs;
@@ -79,6 +79,13 @@ export default function JobsPage() {
   const [jobs, setJobs] = useState<Job[]>([]);
   const [loading, setLoading] = useState<boolean>(false);
   const [apiError, setApiError] = useState<string | null>(null);
+  const [page, setPage] = useState<number>(1);
+  const [pageSize, setPageSize] = useState<number>(10);
+  const [total, setTotal] = useState<number>(0);
+  // 事件回调中使用当前页码和每页条数
+  const pageRef = useRef({ page: 1, pageSize: 10 });
+  const jobsRef = useRef<Job[]>([]);
+  const refreshTimerRef = useRef<ReturnType<typeof setTimeout> | null>(null);
   const [transcriptModalVisible, setTranscriptModalVisible] = useState<boolean>(false);
   const [currentTranscript, setCurrentTranscript] = useState<string>('');
   const [loadingTranscript, setLoadingTranscript] = useState<boolean>(false);
@@ -94,19 +101,18 @@ export default function JobsPage() {
   
   const tagColors = ['blue', 'green', 'purple', 'magenta', 'cyan', 'orange'];
 
-  // 获取任务列表
-  const fetchJobsList = async () => {
+  // 获取任务列表（服务端分页，按更新时间降序）
+  const fetchJobsList = async (targetPage: number = pageRef.current.page, targetPageSize: number = pageRef.current.pageSize) => {
     try {
       setLoading(true);
       setApiError(null);
-      const response = await fetchJobs();
+      const response = await fetchJobsPage(targetPage, targetPageSize);
       
-      // 按创建时间降序排序
-      const sortedJobs = (response || []).sort((a: Job, b: Job) => 
-        new Date(b.created_at).getTime() - new Date(a.created_at).getTime()
-      );
-      
-      setJobs(sortedJobs);
+      pageRef.current = { page: targetPage, pageSize: targetPageSize };
+      setPage(targetPage);
+      setPageSize(targetPageSize);
+      setJobs(response.jobs as Job[]);
+      setTotal(response.total);
     } catch (error) {
       console.error('获取任务列表失败:', error);
       setApiError('无法连接到后端服务器，请确保服务已启动。');
@@ -115,6 +121,24 @@ export default function JobsPage() {
     }
   };
 
+  // 出现当前页以外的任务时，稍后在后台重新获取当前页和总数（短时间内的多次事件只刷新一次）
+  const scheduleRefresh = () => {
+    if (refreshTimerRef.current) {
+      return;
+    }
+    refreshTimerRef.current = setTimeout(async () => {
+      refreshTimerRef.current = null;
+      try {
+        const { page: currentPage, pageSize: currentPageSize } = pageRef.current;
+        const response = await fetchJobsPage(currentPage, currentPageSize);
+        setJobs(response.jobs as Job[]);
+        setTotal(response.total);
+      } catch (error) {
+        console.error('刷新任务列表失败:', error);
+      }
+    }, 1000);
+  };
+
   // 查看转写结果
   const handleViewTranscript = async (jobId: string) => {
     try {
@@ -273,15 +297,31 @@ export default function JobsPage() {
     }
   };
 
+  useEffect(() => {
+    jobsRef.current = jobs;
+  }, [jobs]);
+
   // 组件挂载时获取任务列表
   useEffect(() => {
     fetchJobsList();
     
-    // 每10秒自动刷新一次
-    // const intervalId = setInterval(fetchJobsList, 10000);
+    // 订阅任务状态事件，状态变化时由服务端推送，不再定时刷新
+    const unsubscribe = subscribeEvents(['job'], ({ data }) => {
+      if (jobsRef.current.some((item) => item.job_id === data.job_id)) {
+        setJobs((current) => current.map((item) => (item.job_id === data.job_id ? { ...item, ...data } : item)));
+      } else if (pageRef.current.page === 1) {
+        // 新任务或其他页的任务有更新时，第一页的内容和任务总数可能变化
+        scheduleRefresh();
+      }
+    });
     
-    // // 组件卸载时清除定时器
-    // return () => clearInterval(intervalId);
+    // 组件卸载时取消订阅
+    return () => {
+      unsubscribe();
+      if (refreshTimerRef.current) {
+        clearTimeout(refreshTimerRef.current);
+      }
+    };
   }, []);
 
   // 获取状态标签
@@ -410,7 +450,7 @@ export default function JobsPage() {
               <Button 
                 type="primary" 
                 icon={<ReloadOutlined />} 
-                onClick={fetchJobsList}
+                onClick={() => fetchJobsList()}
                 loading={loading}
               >
                 刷新
@@ -432,7 +472,7 @@ export default function JobsPage() {
               <div style={{ textAlign: 'center', padding: '50px' }}>
                 <Spin size="large" />
               </div>
-            ) : jobs.length === 0 ? (
+            ) : total === 0 ? (
               <Empty description="暂无任务" />
             ) : (
               <Table
@@ -440,8 +480,12 @@ export default function JobsPage() {
                 dataSource={jobs}
                 rowKey="job_id"
                 pagination={{
-                  hideOnSinglePage: true,
-                  pageSize: 10,
+                  current: page,
+                  pageSize,
+                  total,
+                  showSizeChanger: true,
+                  showTotal: (count) => `共 ${count} 个任务`,
+                  onChange: (nextPage, nextPageSize) => fetchJobsList(nextPage, nextPageSize),
                 }}
               />
             )}
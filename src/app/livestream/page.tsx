@@ -19,7 +19,7 @@ import {
 } from 'antd';
 import { PlayCircleOutlined, StopOutlined, DeleteOutlined, ReloadOutlined } from '@ant-design/icons';
 import AppLayout from '@/src/components/layout/AppLayout';
-import { startRecording, getRecordingStatus, getAllRecordingTasks, stopRecording } from '../../services/api';
+import { startRecording, getRecordingStatus, getAllRecordingTasks, stopRecording, subscribeEvents } from '../../services/api';
 import { LiveStreamRequest, RecordingStatus } from '../../types';
 
 const { Title, Text } = Typography;
@@ -40,6 +40,7 @@ interface RecordingTask {
     output_dir: string;
     stream_url: string;
     end_time?: string;
+    segments?: number;
 }
 
 const LiveStreamPage: React.FC = () => {
@@ -72,9 +73,23 @@ const LiveStreamPage: React.FC = () => {
     useEffect(() => {
         fetchTasks();
 
-        // 设置定时刷新 (每30秒)
-        const interval = setInterval(fetchTasks, 30000);
-        return () => clearInterval(interval);
+        // 订阅录制事件，录制状态变化和片段完成时由服务端推送，不再定时刷新
+        const unsubscribe = subscribeEvents(['recording', 'recording_segment'], ({ type, data }) => {
+            setTasks((current) => {
+                const index = current.findIndex((task) => task.task_id === data.task_id);
+                if (type === 'recording') {
+                    if (index === -1) {
+                        return [...current, data as RecordingTask];
+                    }
+                    return current.map((item, i) => (i === index ? { ...item, ...data } : item));
+                }
+                if (index === -1) {
+                    return current;
+                }
+                return current.map((item, i) => (i === index ? { ...item, segments: data.index } : item));
+            });
+        });
+        return unsubscribe;
     }, []);
 
     // 提交表单开始录制
@@ -24,7 +24,7 @@ import {
 import type { UploadFile } from 'antd/es/upload/interface';
 import axios from 'axios';
 import AppLayout from '../components/layout/AppLayout';
-import { fetchJobs } from '../services/api';
+import { fetchJobsPage } from '../services/api';
 
 const { Title, Paragraph } = Typography;
 const { Dragger } = Upload;
@@ -48,13 +48,15 @@ export default function HomePage() {
     try {
       setLoading(true);
       setApiError(null);
-      // 获取任务列表
-      const jobs = await fetchJobs();
-      const completedJobs = jobs.filter(job => job.status === 'completed');
+      // 只需要任务总数（X-Total-Count），每次取一条即可
+      const [allJobs, completedJobs] = await Promise.all([
+        fetchJobsPage(1, 1),
+        fetchJobsPage(1, 1, 'completed'),
+      ]);
       
       setStats({
-        totalJobs: jobs.length,
-        completedJobs: completedJobs.length,
+        totalJobs: allJobs.total,
+        completedJobs: completedJobs.total,
       });
     } catch (error) {
       console.error('获取统计数据失败:', error);
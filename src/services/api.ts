@@ -77,7 +77,7 @@ export const stopRecording = async (taskId: string): Promise<{ success: boolean;
   }
 };
 
-// 获取任务列表
+// 获取最近的任务列表（第一页）
 export const fetchJobs = async (): Promise<Job[]> => {
   try {
     const response = await api.get('/api/jobs');
@@ -88,6 +88,25 @@ export const fetchJobs = async (): Promise<Job[]> => {
   }
 };
 
+// 分页获取任务列表（按更新时间倒序，总数来自X-Total-Count响应头）
+export const fetchJobsPage = async (
+  page: number = 1,
+  pageSize: number = 50,
+  status?: string
+): Promise<{ jobs: Job[]; total: number }> => {
+  try {
+    const response = await api.get('/api/jobs', {
+      params: { page, page_size: pageSize, status },
+    });
+    const jobs = response.data || [];
+    const total = parseInt(response.headers['x-total-count'], 10);
+    return { jobs, total: Number.isNaN(total) ? jobs.length : total };
+  } catch (error) {
+    console.error('获取任务列表失败:', error);
+    throw error;
+  }
+};
+
 // 获取任务详情
 export const fetchJobDetails = async (jobId: string): Promise<any> => {
   try {
@@ -182,11 +201,8 @@ export const generateScripts = async (
 // 获取所有脚本
 export const fetchAllScripts = async (): Promise<any> => {
   try {
-    // 获取所有任务
-    const jobs = await fetchJobs();
-    
-    // 筛选出已完成的任务
-    const completedJobs = jobs.filter((job: any) => job.status === 'completed');
+    // 获取最近的已完成任务（服务端按状态过滤）
+    const { jobs: completedJobs } = await fetchJobsPage(1, 50, 'completed');
     
     // 获取每个任务的脚本和标签
     const scriptGroupsData = [];
@@ -261,3 +277,35 @@ export const uploadAudio = async (
     throw error;
   }
 };
+
+// 服务端推送的事件（/api/events）
+export interface ServerEvent {
+  type: string;
+  data: any;
+}
+
+// 订阅服务端推送的事件，代替定时轮询；返回取消订阅的函数
+export const subscribeEvents = (
+  types: string[],
+  onEvent: (event: ServerEvent) => void,
+  jobId?: string
+): (() => void) => {
+  const params = new URLSearchParams({ types: types.join(',') });
+  if (jobId) {
+    params.append('job_id', jobId);
+  }
+
+  // 断线后浏览器会自动重连，并通过Last-Event-ID补发错过的事件
+  const source = new EventSource(`${API_BASE_URL}/api/events?${params.toString()}`, { withCredentials: true });
+  types.forEach((type) => {
+    source.addEventListener(type, (event) => {
+      try {
+        onEvent({ type, data: JSON.parse((event as MessageEvent).data) });
+      } catch (error) {
+        console.error('解析服务端事件失败:', error);
+      }
+    });
+  });
+
+  return () => source.close();
+};